@@ -1,27 +1,172 @@
-# ...existing code...
+"""
+Headless market structure scan over a local bar store.
 
-def analyze_market_structure(data, timeframes=['M1', 'M5', 'M15', 'H1', 'H4', 'D1']):
+    python analysis.py --data-dir data --json report.json --html report.html
+    python analysis.py --data-dir data --symbols EURUSD GBPUSD --timeframes H4 H1 --workers 8
+
+Runs the same pivot/trend/break rules as the live bot (structure.py) in a
+process pool, one task per symbol, and never connects to the terminal.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import dashboard
+import data_loader
+import structure
+
+MIN_BARS = 10
+
+
+def determine_market_structure(timeframe_data, depth=1, lookback=100, buffer=0.0, retest_enabled=True, replay=300):
+    """
+    Determine if market structure is bullish or bearish.
+
+    The last `replay` bars are stepped through one at a time with a
+    `lookback` window, as the live loop would have seen them. This is
+    needed because retest state depends on the order of breaks.
+
+    Returns:
+        dict: direction ('Bull', 'Bear' or 'none'), trend, last pivots,
+        last signal and any retest still being waited for
+    """
+    bars = timeframe_data
+    ms = structure.MarketStructure()
+    last_signal, last_signal_time = None, None
+    # With fewer than `lookback` bars the replay still ends on the full series
+    start = max(min(lookback, len(bars)), len(bars) - replay)
+    for end in range(start, len(bars) + 1):
+        window = bars[max(0, end - lookback):end]
+        highs, lows = structure.find_pivots(window, depth)
+        structure.update_trend(ms, highs, lows)
+        signal = structure.detect_break(ms, window, buffer, retest_enabled)
+        if signal:
+            last_signal, last_signal_time = signal, int(window[-1]['time'])
+
+    window = bars[-lookback:]
+    highs, lows = structure.find_pivots(window, depth)
+
+    # A pending retest says where price is expected to go next; otherwise use the trend
+    if ms.waiting_for_retest:
+        direction = 'Bull' if ms.retest_direction == 'bull' else 'Bear'
+    elif ms.last_trend == 'uptrend':
+        direction = 'Bull'
+    elif ms.last_trend == 'downtrend':
+        direction = 'Bear'
+    else:
+        direction = 'none'
+
+    def pivot(points):
+        if not points:
+            return None
+        idx, price = points[-1]
+        return {'price': price, 'time': int(window[idx]['time'])}
+
+    return {
+        'direction': direction,
+        'trend': ms.last_trend,
+        'last_pivot_high': pivot(highs),
+        'last_pivot_low': pivot(lows),
+        'higher_high': ms.last_hh,
+        'higher_low': ms.last_hl,
+        'lower_high': ms.last_lh,
+        'lower_low': ms.last_ll,
+        'last_signal': last_signal,
+        'last_signal_time': last_signal_time,
+        'waiting_for_retest': ms.waiting_for_retest,
+        'retest_level': ms.retest_level if ms.waiting_for_retest else None,
+        'retest_direction': ms.retest_direction if ms.waiting_for_retest else None,
+        'close': float(bars[-1]['close']),
+        'bar_time': int(bars[-1]['time']),
+        'bars': len(bars),
+    }
+
+
+def analyze_market_structure(data, timeframes=data_loader.DEFAULT_TIMEFRAMES, **params):
     """Analyze market structure across multiple timeframes."""
     results = {}
-    
+
     for timeframe in timeframes:
-        if timeframe in data:
-            # Make sure we have enough data for this timeframe
-            if len(data[timeframe]) > 10:  # Ensure minimum data points
-                results[timeframe] = determine_market_structure(data[timeframe])
-            else:
-                results[timeframe] = "none"
+        bars = data.get(timeframe)
+        # Make sure we have enough data for this timeframe
+        if bars is not None and len(bars) > MIN_BARS:
+            results[timeframe] = determine_market_structure(bars, **params)
         else:
-            results[timeframe] = "none"
-    
+            results[timeframe] = {'direction': 'none', 'bars': 0 if bars is None else len(bars)}
+
+    return results
+
+
+# Process pool task: load and analyze every timeframe of one symbol
+def scan_symbol(symbol, timeframes, data_dir, params):
+    errors = {}
+    count = params['lookback'] + params['replay']
+    data = data_loader.load_all_timeframes(symbol, timeframes, data_dir, count, errors)
+    results = analyze_market_structure(data, timeframes, **params)
+    for timeframe, error in errors.items():
+        results[timeframe]['error'] = error
+    return symbol, results
+
+
+def scan(symbols, timeframes, data_dir, params, workers=None):
+    """Scan a symbol universe in a process pool; returns {symbol: {timeframe: result}}."""
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(scan_symbol, s, timeframes, data_dir, params) for s in symbols]
+        for future in futures:
+            symbol, result = future.result()
+            results[symbol] = result
     return results
 
-def determine_market_structure(timeframe_data):
-    """Determine if market structure is bullish or bearish."""
-    # ...existing code...
-    
-    # Make sure we're returning a value for every timeframe
-    # This should return "Bull", "Bear", or "none" for each timeframe
-    # Ensure the logic here works correctly
-    
-    # ...existing code...
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--data-dir', default='data', help='bar store directory')
+    parser.add_argument('--symbols', nargs='*', help='symbols to scan (default: everything in --data-dir)')
+    parser.add_argument('--timeframes', nargs='*', default=data_loader.DEFAULT_TIMEFRAMES)
+    parser.add_argument('--lookback', type=int, default=100, help='bars per analysis window, as in config.json')
+    parser.add_argument('--depth', type=int, default=1, help='pivot depth, as pivot_depth in config.json')
+    parser.add_argument('--buffer', type=float, default=0.0, help='break buffer in price units')
+    parser.add_argument('--no-retest', action='store_true', help='analyze with retest_enabled off')
+    parser.add_argument('--replay', type=int, default=300, help='bars replayed to rebuild retest state')
+    parser.add_argument('--workers', type=int, default=None, help='analysis processes (default: CPU count)')
+    parser.add_argument('--json', help='write the JSON report here')
+    parser.add_argument('--html', help='write the HTML report here')
+    args = parser.parse_args(argv)
+
+    if not os.path.isdir(args.data_dir):
+        parser.error(f"data directory {args.data_dir} does not exist")
+    symbols = args.symbols or data_loader.discover_symbols(args.data_dir)
+    if not symbols:
+        parser.error(f"no bar files found in {args.data_dir}")
+
+    params = {
+        'depth': args.depth,
+        'lookback': args.lookback,
+        'buffer': args.buffer,
+        'retest_enabled': not args.no_retest,
+        'replay': args.replay,
+    }
+    start = time.perf_counter()
+    results = scan(symbols, args.timeframes, args.data_dir, params, args.workers)
+    elapsed = time.perf_counter() - start
+
+    report = dashboard.build_report(results, args.timeframes, params, {
+        'generated_at': datetime.now().isoformat(timespec='seconds'),
+        'data_dir': os.path.abspath(args.data_dir),
+        'elapsed_seconds': round(elapsed, 3),
+    })
+    if args.json:
+        dashboard.write_json_report(report, args.json)
+    if args.html:
+        dashboard.write_html_report(report, args.html)
+    dashboard.update_dashboard(report)
+    print(f"Scanned {len(symbols)} symbols x {len(args.timeframes)} timeframes in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,34 +1,52 @@
 import threading
-import json
+import time
 import datetime
 import csv
 import os
-import ast
 from flask import Flask, render_template, request, redirect, url_for, jsonify
 import bot as trading_bot
 import MetaTrader5 as mt5
+from performance import PerformanceTracker
+from structure import FingerprintCache, bar_fingerprint
+from history import HistoryStore
+from config_store import ConfigStore, ConfigError, VersionConflict
+import http_cache
+from log_service import LogService
 
 app = Flask(__name__)
+# ETags and 304s for API polls, compression, fingerprinted static URLs
+http_cache.init_app(app)
 bot_thread = None
 stop_event = threading.Event()
+performance_tracker = PerformanceTracker()
+PERFORMANCE_HISTORY_DAYS = 90
+# Parsed config.json, cached until the file changes; all writes go through it
+config_store = ConfigStore('config.json')
+# Direction and pivots per timeframe, reused until the timeframe's last bar changes
+structure_cache = FingerprintCache()
+# Deals synced from the terminal into a local indexed store
+history_store = HistoryStore(trading_bot.config.get('history_db', 'history.db'),
+                             int(trading_bot.config.get('history_sync_days', 365)),
+                             session=trading_bot.broker_session)
+# Memory-mapped, indexed bot log files for the logging screen
+log_service = LogService(trading_bot.config.get('log_files', 'bot_*.log'))
+# Caches owned by the web side, included in the diagnostics trend
+trading_bot.diagnostics.watch('dashboard_cache', lambda: len(structure_cache.entries))
+trading_bot.diagnostics.watch('compressed_bodies', lambda: len(http_cache._compressed))
+trading_bot.diagnostics.watch('log_files', lambda: len(log_service._files))
 
 # Check and fix timeframes format in config
 def check_and_fix_config():
     try:
-        with open('config.json', 'r') as f:
-            config = json.load(f)
+        config = config_store.get()
         
         # Check if timeframes is a string instead of a list
         if isinstance(config.get('timeframes'), str):
             try:
-                # Try to evaluate it as a Python literal
-                timeframes_list = ast.literal_eval(config['timeframes'])
-                if isinstance(timeframes_list, list):
-                    config['timeframes'] = timeframes_list
-                    with open('config.json', 'w') as f:
-                        json.dump(config, f, indent=4)
-                    print("Fixed timeframes format in config file")
-            except (SyntaxError, ValueError) as e:
+                # The store parses the list literal and writes atomically
+                config_store.update({'timeframes': config['timeframes']})
+                print("Fixed timeframes format in config file")
+            except ConfigError as e:
                 print(f"Error fixing timeframes format: {e}")
     except Exception as e:
         print(f"Error checking config: {e}")
@@ -44,10 +62,9 @@ def start_bot():
 
 # Get open positions
 def get_positions():
-    if not mt5.initialize():
+    if not trading_bot.broker_session.ensure():
         return []
-    with open('config.json', 'r') as f:
-        cfg = json.load(f)
+    cfg = config_store.get()
     symbol = cfg['symbol']
     magic = cfg['magic']
     all_pos = mt5.positions_get() or []
@@ -57,40 +74,13 @@ def get_positions():
 
 # Get trade history
 def get_history(limit=10):
-    if not mt5.initialize():
-        return []
-    with open('config.json', 'r') as f:
-        cfg = json.load(f)
-    magic = cfg['magic']
-    # last 2 weeks
-    to_date = datetime.datetime.now()
-    from_date = to_date - datetime.timedelta(days=14)
-    deals = mt5.history_deals_get(from_date, to_date) or []
-    # filter by magic
-    my_deals = [d for d in deals if getattr(d, 'magic', None) == magic]
-    trades = process_history(my_deals)
-    return trades[:limit]
-
-# Process history deals into completed trades
-def process_history(deals):
-    # This is a simplified version - in reality you would need to match
-    # opening and closing deals for each position
-    trades = []
-    for deal in deals:
-        trades.append({
-            'ticket': deal.ticket,
-            'symbol': deal.symbol,
-            'type': 'BUY' if deal.type == mt5.DEAL_TYPE_BUY else 'SELL',
-            'volume': deal.volume,
-            'price_open': deal.price,
-            'price_close': deal.price,  # This should be the closing price
-            'profit': deal.profit
-        })
-    return trades
+    cfg = config_store.get()
+    history_store.sync()
+    return history_store.page(magic=cfg['magic'], limit=limit)['deals']
 
 # Get account information
 def get_account_info():
-    if not mt5.initialize():
+    if not trading_bot.broker_session.ensure():
         return None
     
     account_info = mt5.account_info()
@@ -129,77 +119,98 @@ def get_trade_journal(limit=20):
         print(f"Error reading trade journal: {e}")
     return journal_data
 
+# Journal rows keyed by ticket, reloaded only when the file changes
+_journal_index = {'stamp': None, 'rows': {}}
+
+def get_journal_index():
+    try:
+        st = os.stat(trading_bot.JOURNAL_FILE)
+    except OSError:
+        return {}
+    stamp = (st.st_mtime_ns, st.st_size)
+    if _journal_index['stamp'] != stamp:
+        with open(trading_bot.JOURNAL_FILE, 'r') as f:
+            _journal_index['rows'] = {row.get('ticket'): row for row in csv.DictReader(f)}
+        _journal_index['stamp'] = stamp
+    return _journal_index['rows']
+
+# Feed trades closed since the last sync into the performance tracker
+def sync_performance():
+    cfg = config_store.get()
+    # Positions still open were only partly closed, so their signal's result is not final yet.
+    # Listed before the deals are synced, so a position closing in between keeps its last deal for later
+    open_positions = mt5.positions_get()
+    if open_positions is None:
+        return
+    open_tickets = {p.ticket for p in open_positions}
+    history_store.sync()
+    if performance_tracker.last_close_time:
+        since = performance_tracker.last_close_time
+    else:
+        since = time.time() - PERFORMANCE_HISTORY_DAYS * 86400
+    closes = history_store.closes_since(cfg['magic'], since)
+    if not closes:
+        return
+    journal = get_journal_index()
+    results = {}  # position -> (profit of its new closing deals, timeframe)
+    for deal in closes:
+        row = journal.get(str(deal['position_id']), {})
+        profit = deal['profit'] + (deal['commission'] or 0.0) + (deal['swap'] or 0.0)
+        risk = float(row.get('risk_amount') or 0)
+        # A closing sell deal closes a buy position
+        direction = 'bull' if deal['type'] == mt5.DEAL_TYPE_SELL else 'bear'
+        added = performance_tracker.add_trade(deal['ticket'], deal['time'], profit,
+                                              timeframe=row.get('timeframe') or None,
+                                              direction=direction,
+                                              r_multiple=profit / risk if risk > 0 else None)
+        if added:
+            total, _ = results.get(deal['position_id'], (0.0, None))
+            results[deal['position_id']] = (total + profit, row.get('timeframe') or None)
+    for position, (profit, timeframe) in results.items():
+        trading_bot.signal_store.record_result(position, profit, timeframe, closed=position not in open_tickets)
+
 # Calculate performance metrics
 def get_performance_metrics():
-    metrics = {
-        'win_rate': 0,
-        'avg_win': 0,
-        'avg_loss': 0,
-        'profit_factor': 0,
-        'total_trades': 0,
-        'winning_trades': 0,
-        'losing_trades': 0
-    }
-    
-    # Get closed trades from history
-    history = get_history(100)  # Last 100 trades
-    if not history:
-        return metrics
-    
-    # Calculate metrics
-    metrics['total_trades'] = len(history)
-    winning_trades = [t for t in history if t['profit'] > 0]
-    losing_trades = [t for t in history if t['profit'] < 0]
-    
-    metrics['winning_trades'] = len(winning_trades)
-    metrics['losing_trades'] = len(losing_trades)
-    
-    if metrics['total_trades'] > 0:
-        metrics['win_rate'] = (metrics['winning_trades'] / metrics['total_trades']) * 100
-    
-    if metrics['winning_trades'] > 0:
-        metrics['avg_win'] = sum(t['profit'] for t in winning_trades) / metrics['winning_trades']
-    
-    if metrics['losing_trades'] > 0:
-        metrics['avg_loss'] = abs(sum(t['profit'] for t in losing_trades) / metrics['losing_trades'])
-    
-    total_profit = sum(t['profit'] for t in winning_trades)
-    total_loss = abs(sum(t['profit'] for t in losing_trades))
-    
-    if total_loss > 0:
-        metrics['profit_factor'] = total_profit / total_loss
-    
-    return metrics
+    sync_performance()
+    # Last 100 closed trades
+    return performance_tracker.stats('all', last=100)
 
 # Get market structures data
 def get_market_structures():
-    if not mt5.initialize():
+    if not trading_bot.broker_session.ensure():
         return None, []
-    with open('config.json', 'r') as f:
-        cfg = json.load(f)
+    cfg = config_store.get()
     symbol = cfg['symbol']
     lookback = int(cfg['lookback'])
-    symbol_info = mt5.symbol_info(symbol)
+    symbol_info = trading_bot.symbol_registry.get(symbol)
+    if symbol_info is None:
+        return None, []
     structures = []
+    tick = mt5.symbol_info_tick(symbol)
+    current_price = (tick.bid + tick.ask) / 2
     for name, tf in zip(trading_bot.TIMEFRAME_NAMES, trading_bot.TIMEFRAMES):
-        # Fix the NumPy array boolean context issue
-        bars = mt5.copy_rates_from_pos(symbol, tf, 0, lookback)
-        if bars is None:
-            bars = []
-        highs, lows = trading_bot.find_pivots(bars)
-        direction = trading_bot.check_break(bars, highs, lows, symbol_info)
-        tick = mt5.symbol_info_tick(symbol)
-        current_price = (tick.bid + tick.ask) / 2
-        ph, pht = None, None
-        if highs:
-            idx, price = highs[-1]
-            ph = price
-            pht = datetime.datetime.fromtimestamp(bars[idx]['time']).strftime('%H:%M:%S')
-        pl, plt = None, None
-        if lows:
-            idx, price = lows[-1]
-            pl = price
-            plt = datetime.datetime.fromtimestamp(bars[idx]['time']).strftime('%H:%M:%S')
+        key = (symbol, name, lookback)
+        cached = structure_cache.lookup(key, bar_fingerprint(mt5.copy_rates_from_pos(symbol, tf, 0, 1)))
+        if cached is None:
+            # Fix the NumPy array boolean context issue
+            bars = mt5.copy_rates_from_pos(symbol, tf, 0, lookback)
+            if bars is None:
+                bars = []
+            highs, lows = trading_bot.find_pivots(bars)
+            direction = trading_bot.check_break(bars, highs, lows, symbol_info)
+            ph, pht = None, None
+            if highs:
+                idx, price = highs[-1]
+                ph = price
+                pht = datetime.datetime.fromtimestamp(bars[idx]['time']).strftime('%H:%M:%S')
+            pl, plt = None, None
+            if lows:
+                idx, price = lows[-1]
+                pl = price
+                plt = datetime.datetime.fromtimestamp(bars[idx]['time']).strftime('%H:%M:%S')
+            cached = (direction, ph, pht, pl, plt)
+            structure_cache.store(key, bar_fingerprint(bars), cached)
+        direction, ph, pht, pl, plt = cached
         structures.append({
             'timeframe': name.replace('TIMEFRAME_', ''),
             'market_direction': direction,
@@ -244,8 +255,7 @@ def get_market_structures():
 
 @app.route('/')
 def index():
-    with open('config.json', 'r') as f:
-        config = json.load(f)
+    config = config_store.get()
     status = 'running' if bot_thread and bot_thread.is_alive() else 'stopped'
     
     # Get monitoring data
@@ -307,41 +317,20 @@ def stop():
 
 @app.route('/update_config', methods=['POST'])
 def update_config():
-    new_conf = {}
-    for key, val in request.form.items():
-        # Handle boolean values from form
-        if val.lower() == 'true':
-            new_conf[key] = True
-        elif val.lower() == 'false':
-            new_conf[key] = False
-        # try to cast to int or float
-        elif val.isdigit():
-            new_conf[key] = int(val)
-        else:
-            try:
-                new_conf[key] = float(val)
-            except:
-                # Handle timeframes specially if it's an array in string form
-                if key == 'timeframes' and val.startswith('[') and val.endswith(']'):
-                    try:
-                        timeframes_list = ast.literal_eval(val)
-                        new_conf[key] = timeframes_list
-                    except:
-                        new_conf[key] = val
-                else:
-                    new_conf[key] = val
-                
-    # Load current config to preserve array values that might not be in form
-    with open('config.json', 'r') as f:
-        current_config = json.load(f)
-        
-    # Merge configs (this keeps arrays like timeframes)
-    for key, val in current_config.items():
-        if key not in new_conf:
-            new_conf[key] = val
-            
-    with open('config.json', 'w') as f:
-        json.dump(new_conf, f, indent=4)
+    form = request.form.to_dict()
+    expected = form.pop('config_version', '')
+    try:
+        expected = int(expected) if expected else None
+        version, diff = config_store.update(form, expected_version=expected)
+    except VersionConflict as e:
+        return jsonify({'error': 'config changed since the form was loaded', 'errors': e.errors}), 409
+    except ConfigError as e:
+        return jsonify({'error': 'invalid config values', 'errors': e.errors}), 400
+    except ValueError:
+        return jsonify({'error': 'config_version must be an integer'}), 400
+    if diff:
+        changes = ', '.join(f"{key}: {old!r} -> {new!r}" for key, (old, new) in diff.items())
+        print(f"Config updated to version {version}: {changes}")
     return redirect(url_for('index'))
 
 # New API endpoint for AJAX updates
@@ -358,6 +347,99 @@ def api_data():
         'account': account
     })
 
+# Rolling performance for any trailing window, with chart series
+@app.route('/api/performance')
+def api_performance():
+    sync_performance()
+    group = request.args.get('group', 'all')
+    last = request.args.get('last', type=int)
+    since = request.args.get('since', type=int)
+    points = request.args.get('points', 500, type=int)
+    return jsonify({
+        'group': group,
+        'groups': performance_tracker.groups(),
+        'metrics': performance_tracker.stats(group, last=last, since=since),
+        'r_distribution': performance_tracker.r_distribution(group),
+        'series': performance_tracker.equity_series(group, max_points=points, since=since),
+    })
+
+# Parse an epoch-seconds or ISO date query parameter
+def parse_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.datetime.fromisoformat(value).timestamp())
+
+# Counters showing how much work change detection and retries saved or cost
+@app.route('/api/metrics')
+def api_metrics():
+    return jsonify({
+        'analysis_cache': trading_bot.analysis_cache.stats(),
+        'dashboard_cache': structure_cache.stats(),
+        'execution': dict(trading_bot.execution_engine.stats),
+        'broker': trading_bot.broker_session.status(),
+        'risk': trading_bot.risk_engine.snapshot(),
+        'ticks': trading_bot.tick_monitor.stats(),
+        'http': dict(http_cache.stats),
+        'strategies': trading_bot.strategy_engine.stats,
+        'scheduler': trading_bot.cycle_scheduler.report(),
+    })
+
+# Deal history, newest first, paged with a keyset cursor
+@app.route('/api/history')
+def api_history():
+    cfg = config_store.get()
+    try:
+        date_from, date_to = parse_time_arg('from'), parse_time_arg('to')
+    except ValueError:
+        return jsonify({'error': 'from/to must be epoch seconds or ISO dates'}), 400
+    history_store.sync()
+    return jsonify(history_store.page(magic=cfg['magic'], date_from=date_from, date_to=date_to,
+                                      cursor=request.args.get('cursor'),
+                                      limit=request.args.get('limit', 50, type=int)))
+
+# Bot log search and tailing; poll with next_cursor to receive only new entries
+@app.route('/api/logs')
+def api_logs():
+    try:
+        since = parse_time_arg('since')
+    except ValueError:
+        return jsonify({'error': 'since must be epoch seconds or an ISO date'}), 400
+    try:
+        log = log_service.get(request.args.get('file'))
+        if log is None:
+            return jsonify({'entries': [], 'next_cursor': 0, 'size': 0, 'file': None, 'files': []})
+        result = log.query(since=since, level=request.args.get('level') or None, q=request.args.get('q') or None,
+                           cursor=request.args.get('cursor', type=int),
+                           limit=request.args.get('limit', 200, type=int))
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    result['file'] = os.path.basename(log.path)
+    result['files'] = log_service.files()
+    return jsonify(result)
+
+# Memory trend, top allocation growth and GC pauses; local requests only
+@app.route('/api/admin/diagnostics')
+def api_diagnostics():
+    if request.remote_addr not in ('127.0.0.1', '::1'):
+        return jsonify({'error': 'diagnostics are only served to local requests'}), 403
+    if request.args.get('snapshot'):
+        trading_bot.diagnostics.maybe_snapshot(force=True)
+    return jsonify(trading_bot.diagnostics.report())
+
+# Evaluated signals and per-timeframe hit rates
+@app.route('/api/signals')
+def api_signals():
+    timeframe = request.args.get('timeframe')
+    return jsonify({
+        'hit_rates': trading_bot.signal_store.hit_rates(timeframe),
+        'recent': trading_bot.signal_store.recent(request.args.get('limit', 100, type=int),
+                                                  timeframe, request.args.get('outcome')),
+    })
+
 if __name__ == '__main__':
     # Check and fix config on startup
     check_and_fix_config()
@@ -0,0 +1,318 @@
+"""
+Benchmarks for the strategy hot paths, run against the fake broker.
+
+    python benchmarks.py                              # run everything, print a table
+    python benchmarks.py --save bench_results.json    # store results as JSON
+    python benchmarks.py --baseline bench_baseline.json --tolerance 0.25
+
+With --baseline the run exits with status 1 when any benchmark's median is
+more than --tolerance slower than the stored one. Use --bars to benchmark
+recorded data (a .npy rates array) instead of generated bars.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import fake_broker
+fake_broker.install()
+import bot  # noqa: E402  (must import after the fake broker is installed)
+import structure  # noqa: E402
+
+LOOKBACKS = [100, 500, 2000]
+SYMBOL_COUNTS = [1, 10, 100]
+CONCURRENCY = [1, 8, 32]
+
+
+def measure(fn, repeat=7, number=None, min_time=0.05):
+    """
+    Time fn() and return per-call statistics in microseconds.
+
+    number is picked so one sample takes at least min_time seconds.
+    """
+    if number is None:
+        number = 1
+        while True:
+            start = time.perf_counter()
+            for _ in range(number):
+                fn()
+            if time.perf_counter() - start >= min_time or number >= 1 << 20:
+                break
+            number *= 2
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) / number * 1e6)
+    samples.sort()
+    return {
+        'median_us': statistics.median(samples),
+        'min_us': samples[0],
+        'max_us': samples[-1],
+        'number': number,
+        'repeat': repeat,
+    }
+
+
+@contextlib.contextmanager
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_functions(bars_source, repeat):
+    results = {}
+    symbol_info = fake_broker.symbol_info(bot.SYMBOL)
+    with quiet():
+        bot.risk_engine.refresh()
+    for lookback in LOOKBACKS:
+        bars = bars_source(lookback)
+        highs, lows = bot.find_pivots(bars)
+        results[f'find_pivots[{lookback}]'] = measure(lambda: bot.find_pivots(bars), repeat)
+        results[f'calculate_atr[{lookback}]'] = measure(lambda: bot.calculate_atr(bars, bot.ATR_PERIOD), repeat)
+        results[f'identify_trend_structure[{lookback}]'] = measure(
+            lambda: bot.identify_trend_structure(bars, '_bench'), repeat)
+        with quiet():
+            results[f'check_structure_break[{lookback}]'] = measure(
+                lambda: bot.check_structure_break(bars, symbol_info, '_bench'), repeat)
+        with quiet():
+            results[f'check_break[{lookback}]'] = measure(
+                lambda: bot.check_break(bars, highs, lows, symbol_info), repeat)
+    entry = float(bars['close'][-1])
+    with quiet():
+        results['calculate_position_size'] = measure(
+            lambda: bot.calculate_position_size('bull', entry, entry - 1.0, symbol_info), repeat)
+    bot.market_structures.pop('_bench', None)
+    return results
+
+
+def bench_cycles(repeat):
+    results = {}
+    symbol_info = fake_broker.symbol_info(bot.SYMBOL)
+    original_symbol = bot.SYMBOL
+    try:
+        for count in SYMBOL_COUNTS:
+            symbols = [f'BENCH{i}' for i in range(count)]
+            triggered = {s: {} for s in symbols}
+
+            def cycle(cached=False):
+                if not cached:
+                    # Full analysis every time; the cached path is timed separately below
+                    bot.analysis_cache.clear()
+                for s in symbols:
+                    # run_cycle works on bot.SYMBOL; point it at each simulated symbol in turn
+                    bot.SYMBOL = s
+                    bot.run_cycle(symbol_info, triggered[s])
+
+            with quiet():
+                cycle()  # warm up bar caches
+                results[f'run_cycle[{count} symbols]'] = measure(cycle, max(3, repeat // 2), number=1)
+                # Unchanged bars: only the one-bar probe per timeframe
+                results[f'run_cycle_cached[{count} symbols]'] = measure(lambda: cycle(cached=True),
+                                                                        max(3, repeat // 2), number=1)
+    finally:
+        bot.SYMBOL = original_symbol
+    return results
+
+
+def bench_api(requests_per_client, terminal_latency):
+    try:
+        import app as dashboard_app
+    except ImportError as e:
+        print(f"Skipping /api/data benchmarks: {e}")
+        return {}
+
+    results = {}
+    fake_broker.configure(latency=terminal_latency)
+    try:
+        for clients in CONCURRENCY:
+            latencies = []
+            errors = [0]
+            lock = threading.Lock()
+
+            def worker():
+                client = dashboard_app.app.test_client()
+                local = []
+                for _ in range(requests_per_client):
+                    start = time.perf_counter()
+                    resp = client.get('/api/data')
+                    local.append((time.perf_counter() - start) * 1e6)
+                    if resp.status_code != 200:
+                        with lock:
+                            errors[0] += 1
+                with lock:
+                    latencies.extend(local)
+
+            threads = [threading.Thread(target=worker) for _ in range(clients)]
+            start = time.perf_counter()
+            with quiet():
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+            elapsed = time.perf_counter() - start
+            latencies.sort()
+            results[f'api_data[{clients} clients]'] = {
+                'median_us': statistics.median(latencies),
+                'p95_us': latencies[int(len(latencies) * 0.95) - 1],
+                'max_us': latencies[-1],
+                'requests': len(latencies),
+                'errors': errors[0],
+                'throughput_rps': len(latencies) / elapsed,
+            }
+    finally:
+        fake_broker.configure(latency=0.0)
+    return results
+
+
+def deep_size(obj):
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__) + sum(sys.getsizeof(v) for v in obj.__dict__.values())
+    if hasattr(obj, '__slots__'):
+        size += sum(sys.getsizeof(getattr(obj, f)) for f in obj.__slots__ if not isinstance(getattr(obj, f), np.ndarray))
+        size += sum(getattr(obj, f).nbytes for f in obj.__slots__ if isinstance(getattr(obj, f), np.ndarray))
+    if isinstance(obj, (list, tuple)):
+        size += sum(deep_size(v) for v in obj)
+    return size
+
+
+def bench_memory(bars_source):
+    """Bytes per structure state and per pivot series, compact vs plain-object layout."""
+    ms = structure.MarketStructure()
+    ms.last_trend, ms.last_hh, ms.last_hl = 'uptrend', 101.25, 99.75
+    ms.retest_level, ms.retest_direction, ms.waiting_for_retest = 99.75, 'bear', True
+
+    # Same fields in a regular __dict__ instance, as MarketStructure used to be
+    legacy = type('DictMarketStructure', (), {})()
+    for field in structure.MarketStructure.__slots__:
+        setattr(legacy, field, getattr(ms, field))
+
+    results = {
+        'market_structure': {'compact_bytes': deep_size(ms), 'legacy_bytes': deep_size(legacy)},
+        'market_structure_record': {'compact_bytes': structure.STRUCTURE_DTYPE.itemsize,
+                                    'legacy_bytes': deep_size(legacy)},
+    }
+    for lookback in LOOKBACKS:
+        highs, _ = bot.find_pivots(bars_source(lookback))
+        results[f'pivots[{lookback}]'] = {'compact_bytes': deep_size(highs), 'legacy_bytes': deep_size(list(highs))}
+    for r in results.values():
+        r['reduction_pct'] = (1 - r['compact_bytes'] / r['legacy_bytes']) * 100
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for name, current in results.items():
+        base = baseline.get(name)
+        if not base:
+            continue
+        ratio = current['median_us'] / base['median_us'] if base['median_us'] else 1.0
+        current['baseline_median_us'] = base['median_us']
+        current['ratio'] = ratio
+        if ratio > 1 + tolerance:
+            regressions.append((name, ratio))
+    return regressions
+
+
+def print_table(results):
+    width = max(len(n) for n in results) + 2
+    print(f"{'benchmark':<{width}}{'median':>14}{'min/p95':>14}{'vs base':>10}")
+    for name, r in results.items():
+        second = r.get('p95_us', r.get('min_us', 0))
+        ratio = f"{r['ratio']:.2f}x" if 'ratio' in r else ''
+        print(f"{name:<{width}}{r['median_us']:>12.1f}us{second:>12.1f}us{ratio:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--save', help='write results JSON to this path')
+    parser.add_argument('--baseline', help='compare against a results JSON written by --save')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown vs baseline (0.25 = 25%%)')
+    parser.add_argument('--bars', help='recorded rates (.npy) to use for the function benchmarks')
+    parser.add_argument('--only', choices=['functions', 'cycle', 'api', 'memory'], action='append',
+                        help='run only these groups (repeatable)')
+    parser.add_argument('--repeat', type=int, default=7)
+    parser.add_argument('--api-requests', type=int, default=50, help='requests per simulated client')
+    parser.add_argument('--terminal-latency', type=float, default=0.0,
+                        help='seconds added to every fake terminal call in the API benchmark')
+    args = parser.parse_args(argv)
+
+    groups = args.only or ['functions', 'cycle', 'api', 'memory']
+    if args.bars:
+        recorded = np.load(args.bars)
+
+        def bars_source(n):
+            return recorded[-n:]
+    else:
+        def bars_source(n):
+            return fake_broker.generate_bars(n, seed=n)
+
+    # Keep journal writes out of the working tree
+    journal = tempfile.NamedTemporaryFile(suffix='.csv', delete=False)
+    journal.close()
+    bot.JOURNAL_FILE = journal.name
+    bot.signal_store.path = journal.name + '.signals'
+    bot.checkpoint.path = journal.name + '.snapshot'
+    fake_broker.reset()
+
+    results = {}
+    memory = {}
+    try:
+        if 'functions' in groups:
+            results.update(bench_functions(bars_source, args.repeat))
+        if 'cycle' in groups:
+            results.update(bench_cycles(args.repeat))
+        if 'api' in groups:
+            results.update(bench_api(args.api_requests, args.terminal_latency))
+        if 'memory' in groups:
+            memory = bench_memory(bars_source)
+    finally:
+        for path in (journal.name, bot.signal_store.path, bot.checkpoint.path):
+            if os.path.exists(path):
+                os.unlink(path)
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            regressions = compare(results, json.load(f)['results'], args.tolerance)
+
+    if results:
+        print_table(results)
+    for name, m in memory.items():
+        print(f"{name}: {m['compact_bytes']} bytes vs {m['legacy_bytes']} bytes ({m['reduction_pct']:.0f}% smaller)")
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'numpy': np.__version__,
+                    'platform': platform.platform(),
+                    'bars': args.bars or 'synthetic',
+                },
+                'results': results,
+                'memory': memory,
+            }, f, indent=4)
+
+    if regressions:
+        for name, ratio in regressions:
+            print(f"REGRESSION {name}: {ratio:.2f}x baseline")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,10 +1,24 @@
 import time
+import csv
 import json
 import threading
 import MetaTrader5 as mt5
 import numpy as np
 from datetime import datetime
 import os
+from risk import RiskEngine, stop_risk_amount
+from execution import ExecutionEngine
+import structure
+from structure import MarketStructure
+from snapshot import Checkpoint, reconcile
+from signals import SignalStore, TAKEN, SKIPPED
+from symbols import SymbolRegistry, pip_size
+from broker import BrokerSession, terminal_kwargs
+from ticks import TickRing, TickMonitor, TIMEFRAME_SECONDS
+from diagnostics import Diagnostics
+import scheduler
+from scheduler import CycleScheduler
+from strategies import StrategyEngine, StrategyContext, TimeframeData, Signal, load_strategies, DEFAULT_STRATEGY
 
 # Load configuration
 with open('config.json', 'r') as f:
@@ -52,144 +66,123 @@ DRAWDOWN_LIMIT_DAILY = float(config.get('drawdown_limit_daily', 5.0))  # Daily d
 RISK_PER_TRADE = float(config.get('risk_per_trade', 1.0))  # Risk percentage per trade
 SCALE_OUT_ENABLED = bool(config.get('scale_out_enabled', False))  # Enable scaling out
 SCALE_OUT_TARGET = float(config.get('scale_out_target', 1.0))  # First target for scaling out (R:R ratio)
+MAX_OPEN_RISK = float(config.get('max_open_risk_pct', 5.0))  # Combined stop risk of open positions, % of equity
+MAX_DIRECTION_RISK = float(config.get('max_direction_risk_pct', 3.0))  # Stop risk in one direction, % of equity
+
+JOURNAL_FILE = config.get('journal_file', 'trade_journal.csv')
+SNAPSHOT_FILE = config.get('snapshot_file', 'state_snapshot.bin')
+SIGNAL_LOG_FILE = config.get('signal_log_file', 'signals.jsonl')
+SIGNAL_MEMORY = int(config.get('signal_memory', 5000))  # signal events kept in memory
+ORDER_MAX_ATTEMPTS = int(config.get('order_max_attempts', 3))  # order_send calls per order, retries included
+SYMBOL_REFRESH_INTERVAL = float(config.get('symbol_refresh_interval', 3600))  # seconds between symbol_info reloads
+BROKER_HEALTH_INTERVAL = float(config.get('broker_health_interval', 30))  # seconds between terminal health probes
+BROKER_BACKOFF_MAX = float(config.get('broker_backoff_max', 300))  # cap on the reconnect delay, seconds
+BROKER_FAILURE_THRESHOLD = int(config.get('broker_failure_threshold', 5))  # consecutive failures that open the circuit
+BROKER_COOLDOWN = float(config.get('broker_circuit_cooldown', 60))  # seconds the open circuit fails fast
+TICK_MODE = bool(config.get('tick_mode', False))  # check ticks for breaks between bar cycles
+TICK_BUFFER_SIZE = int(config.get('tick_buffer_size', 65536))  # ticks kept in the ring buffer
+TICK_POLL_INTERVAL = float(config.get('tick_poll_interval', 0.25))  # seconds between tick fetches in tick mode
+DIAGNOSTICS_ENABLED = bool(config.get('diagnostics_enabled', False))  # trace allocations, GC pauses and RSS
+DIAGNOSTICS_INTERVAL = float(config.get('diagnostics_interval', 600))  # seconds between tracemalloc snapshots
+DIAGNOSTICS_ALERT_MB = float(config.get('diagnostics_growth_alert_mb', 50))  # memory growth that raises an alert
+STRATEGIES = config.get('strategies', [DEFAULT_STRATEGY])  # plugin names, 'module:Class' paths or dicts
+STRATEGY_WORKERS = int(config.get('strategy_workers', 0))  # threads evaluating plugins; 0 for one per plugin
+CYCLE_BUDGET = float(config.get('cycle_budget', UPDATE_INTERVAL * 0.5))  # seconds per cycle before work is shed; 0 disables
+MAX_DEFERRALS = int(config.get('max_deferrals', 3))  # cycles a timeframe may be postponed before it runs anyway
+ACCOUNTS = config.get('accounts', [])  # one executor per entry; empty trades the single terminal in-process
+
+# Terminal session shared by the bot loop and the dashboard
+def new_broker_session(**init_kwargs):
+    return BrokerSession(SYMBOL, BROKER_HEALTH_INTERVAL, backoff_max=BROKER_BACKOFF_MAX,
+                         failure_threshold=BROKER_FAILURE_THRESHOLD, cooldown=BROKER_COOLDOWN, **init_kwargs)
+
+broker_session = new_broker_session()
+# Account state and exposure shared by all pre-trade checks
+risk_engine = RiskEngine(DRAWDOWN_LIMIT_DAILY, MAX_OPEN_RISK, MAX_DIRECTION_RISK, RISK_PER_TRADE)
+# Order submission with retries and fill latency tracking
+execution_engine = ExecutionEngine(ORDER_MAX_ATTEMPTS)
+# Structure/trigger/risk state persisted across restarts
+checkpoint = Checkpoint(SNAPSHOT_FILE)
+# Every evaluated signal, its outcome and the ticket it produced
+signal_store = SignalStore(SIGNAL_LOG_FILE, SIGNAL_MEMORY)
+# Last analysis per timeframe, reused until a bar opens or the close moves
+analysis_cache = structure.FingerprintCache()
+# symbol_info and derived pip/lot values, loaded once per symbol
+symbol_registry = SymbolRegistry(SYMBOL_REFRESH_INTERVAL)
+# Recent ticks and the break/retest levels they are checked against in tick mode
+tick_ring = TickRing(TICK_BUFFER_SIZE)
+tick_monitor = TickMonitor(TIMEFRAME_NAMES)
+# Pivots and bars of the last analysis per timeframe, for entries taken on a tick
+tick_pivots = {}
+# Strategy plugins evaluated on the shared bars, pivots and indicators
+strategy_engine = StrategyEngine(load_strategies(STRATEGIES), STRATEGY_WORKERS or None)
+# Allocation, GC and memory trend tracking; idle unless started
+diagnostics = Diagnostics(DIAGNOSTICS_INTERVAL, DIAGNOSTICS_ALERT_MB)
+# Time budget of each cycle; positions and orders first, higher timeframes shed first
+cycle_scheduler = CycleScheduler(CYCLE_BUDGET, MAX_DEFERRALS)
+# Timeframes from the shortest bar to the longest, the order they are analyzed in
+ANALYSIS_ORDER = sorted(zip(TIMEFRAME_NAMES, TIMEFRAMES), key=lambda item: TIMEFRAME_SECONDS.get(item[0], 0))
+
+# Per-account settings an account executor may override: config key -> (module global, type)
+ACCOUNT_SETTINGS = {
+    'magic': ('MAGIC', int),
+    'max_positions': ('MAX_POS', int),
+    'lot_size': ('LOT_SIZE', float),
+    'risk_per_trade': ('RISK_PER_TRADE', float),
+    'drawdown_limit_daily': ('DRAWDOWN_LIMIT_DAILY', float),
+    'max_open_risk_pct': ('MAX_OPEN_RISK', float),
+    'max_direction_risk_pct': ('MAX_DIRECTION_RISK', float),
+}
+
+# Rebind settings and per-account state for one entry of ACCOUNTS (executor processes only)
+def configure_account(account):
+    global JOURNAL_FILE, risk_engine, checkpoint, signal_store, broker_session
+    name = account['name']
+    broker_session = new_broker_session(**terminal_kwargs(account))
+    for key, (attr, cast) in ACCOUNT_SETTINGS.items():
+        if key in account:
+            globals()[attr] = cast(account[key])
+    JOURNAL_FILE = account.get('journal_file', f'trade_journal_{name}.csv')
+    risk_engine = RiskEngine(DRAWDOWN_LIMIT_DAILY, MAX_OPEN_RISK, MAX_DIRECTION_RISK, RISK_PER_TRADE)
+    checkpoint = Checkpoint(account.get('snapshot_file', f'state_snapshot_{name}.bin'))
+    signal_store = SignalStore(account.get('signal_log_file', f'signals_{name}.jsonl'), SIGNAL_MEMORY)
+    migrate_journal(JOURNAL_FILE)
 
 # Convert pips to price units
 def pips_to_points(pips, symbol_info):
-    digits = symbol_info.digits
-    point = symbol_info.point
-    
-    pip_value = 0.0001
-    if digits == 5 or digits == 3:
-        pip_value = 10 * point
-    elif digits == 4 or digits == 2:
-        pip_value = point
-    else:
-        pip_value = point
-    
-    return pips * pip_value
+    # Registry entries carry the precomputed pip size
+    size = getattr(symbol_info, 'pip_size', None)
+    if size is None:
+        size = pip_size(symbol_info.digits, symbol_info.point)
+    return pips * size
 
 # Calculate ATR
 def calculate_atr(bars, period):
-    trs = []
-    for i in range(1, len(bars)):
-        high, low = bars[i]['high'], bars[i]['low']
-        prev = bars[i-1]['close']
-        tr = max(high - low, abs(high - prev), abs(low - prev))
-        trs.append(tr)
-    if len(trs) < period:
-        return sum(trs) / len(trs)
-    return sum(trs[-period:]) / period
+    return structure.average_true_range(bars, period)
 
 # Identify pivot highs and lows with depth
 def find_pivots(bars):
-    highs, lows = [], []
-    for i in range(PIVOT_DEPTH, len(bars) - PIVOT_DEPTH):
-        window = bars[i - PIVOT_DEPTH:i + PIVOT_DEPTH + 1]
-        highs_w = [b['high'] for b in window]
-        lows_w = [b['low'] for b in window]
-        if bars[i]['high'] == max(highs_w):
-            highs.append((i, bars[i]['high']))
-        if bars[i]['low'] == min(lows_w):
-            lows.append((i, bars[i]['low']))
-    return highs, lows
-
-# Structure for tracking identified market structures
-class MarketStructure:
-    def __init__(self):
-        self.last_trend = None  # 'uptrend' or 'downtrend'
-        self.last_hh = None     # Last higher high price
-        self.last_hl = None     # Last higher low price
-        self.last_lh = None     # Last lower high price
-        self.last_ll = None     # Last lower low price
-        self.break_detected = False   # Structure break detected
-        self.retest_level = None      # Price level for retest entry
-        self.retest_direction = None  # Direction after break ('bull' or 'bear')
-        self.waiting_for_retest = False  # Waiting for retest entry
+    return structure.find_pivots(bars, PIVOT_DEPTH)
 
 # Dictionary to store market structure data for each timeframe
 market_structures = {}
+# Open time of the newest bar analyzed on each timeframe
+last_bar_times = {}
 
 # Identify trend structure (higher highs/lows or lower highs/lows)
-def identify_trend_structure(bars, timeframe):
+def identify_trend_structure(bars, timeframe, pivots=None):
     # Get or create market structure tracker for this timeframe
     if timeframe not in market_structures:
         market_structures[timeframe] = MarketStructure()
     
-    ms = market_structures[timeframe]
-    
-    # We need at least 4 pivot points to identify a trend structure
-    highs, lows = find_pivots(bars)
-    
-    if len(highs) < 2 or len(lows) < 2:
-        return ms
-    
-    # Get the last two pivot highs and lows
-    last_two_highs = sorted(highs[-2:])
-    last_two_lows = sorted(lows[-2:])
-    
-    # Check for uptrend (higher highs and higher lows)
-    if highs[-1][1] > highs[-2][1] and lows[-1][1] > lows[-2][1]:
-        ms.last_trend = 'uptrend'
-        ms.last_hh = highs[-1][1]
-        ms.last_hl = lows[-1][1]
-    
-    # Check for downtrend (lower highs and lower lows)
-    elif highs[-1][1] < highs[-2][1] and lows[-1][1] < lows[-2][1]:
-        ms.last_trend = 'downtrend'
-        ms.last_lh = highs[-1][1]
-        ms.last_ll = lows[-1][1]
-        
-    return ms
+    highs, lows = pivots if pivots is not None else find_pivots(bars)
+    return structure.update_trend(market_structures[timeframe], highs, lows)
 
 # Enhanced check for market structure breaks with retest logic
-def check_structure_break(bars, symbol_info, timeframe):
-    ms = identify_trend_structure(bars, timeframe)
-    
-    if len(bars) == 0:
-        return None
-    
-    last_close = bars[-1]['close']
+def check_structure_break(bars, symbol_info, timeframe, pivots=None):
+    ms = identify_trend_structure(bars, timeframe, pivots)
     buffer = pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
-    
-    # If we're waiting for a retest, check if it happened
-    if ms.waiting_for_retest and ms.retest_level:
-        if ms.retest_direction == 'bull':
-            # For long entries, check if price came back near the retest level (former resistance now support)
-            if abs(last_close - ms.retest_level) < buffer:
-                # Check for bullish price action (close > open)
-                if bars[-1]['close'] > bars[-1]['open']:
-                    ms.waiting_for_retest = False
-                    return 'bull_retest'
-        elif ms.retest_direction == 'bear':
-            # For short entries, check if price came back near the retest level (former support now resistance)
-            if abs(last_close - ms.retest_level) < buffer:
-                # Check for bearish price action (close < open)
-                if bars[-1]['close'] < bars[-1]['open']:
-                    ms.waiting_for_retest = False
-                    return 'bear_retest'
-    
-    # Check for structure breaks
-    if ms.last_trend == 'downtrend' and ms.last_lh and last_close > ms.last_lh + buffer:
-        # Bullish break of structure (price broke above the last lower high)
-        if RETEST_ENABLED:
-            ms.retest_level = ms.last_lh
-            ms.retest_direction = 'bull'
-            ms.waiting_for_retest = True
-            return 'bull_break'
-        else:
-            return 'bull'
-            
-    elif ms.last_trend == 'uptrend' and ms.last_hl and last_close < ms.last_hl - buffer:
-        # Bearish break of structure (price broke below the last higher low)
-        if RETEST_ENABLED:
-            ms.retest_level = ms.last_hl
-            ms.retest_direction = 'bear'
-            ms.waiting_for_retest = True
-            return 'bear_break'
-        else:
-            return 'bear'
-    
-    return None
+    return structure.detect_break(ms, bars, buffer, RETEST_ENABLED)
 
 # Check for break of market structure with buffer
 def check_break(bars, highs, lows, symbol_info):
@@ -295,16 +288,16 @@ def partial_close(position):
     # Calculate volume to close
     close_volume = position.volume * (PARTIAL_CLOSE_PCT / 100.0)
     
+    # Round to the broker's volume step and lot limits
+    meta = symbol_registry.get(position.symbol)
+    if meta is not None:
+        close_volume = meta.round_volume(close_volume)
+    else:
+        close_volume = round(max(close_volume, 0.01), 2)
+    
     # Ensure we don't close more than the position size
     close_volume = min(close_volume, position.volume)
     
-    # MetaTrader minimum volume is usually 0.01
-    if close_volume < 0.01:
-        close_volume = 0.01
-    
-    # Round to 2 decimal places
-    close_volume = round(close_volume, 2)
-    
     # Create close request
     request = {
         "action": mt5.TRADE_ACTION_DEAL,
@@ -319,37 +312,32 @@ def partial_close(position):
         "type_filling": mt5.ORDER_FILLING_FOK,
     }
     
-    result = mt5.order_send(request)
-    if result.retcode != mt5.TRADE_RETCODE_DONE:
-        print(f"Error partially closing position {position.ticket}: {result.retcode}")
+    fill = execution_engine.send(request)
+    if not fill.filled:
+        print(f"Error partially closing position {position.ticket}: {fill.error}")
     else:
         print(f"Position {position.ticket} partially closed: {close_volume} lots")
-    return result
+        risk_engine.on_partial_close(position.ticket, fill.volume)
+    return fill
 
-# Fix the check_drawdown_limit function to work without parameters
+# Check the daily loss limit against the cached account state
 def check_drawdown_limit():
     """
-    Check if current account drawdown exceeds the configured limit.
+    Check if today's loss from start-of-day equity exceeds the configured limit.
     
     Returns:
         bool: True if drawdown limit has been reached, False otherwise
     """
-    if not mt5.initialize():
-        print("Failed to initialize MT5 when checking drawdown")
-        return True  # Default to not trading on error
-        
-    account_info = mt5.account_info()
-    if not account_info:
-        print("Failed to get account info")
+    if not risk_engine.ready and not risk_engine.refresh():
         return True  # Default to not trading on error
-        
-    # Calculate current drawdown percentage based on equity vs balance
-    balance = account_info.balance
-    equity = account_info.equity
-    current_drawdown_pct = 0
     
-    if balance > 0:
-        current_drawdown_pct = ((balance - equity) / balance) * 100
+    # Account state older than one cycle means the last refresh failed
+    age = (datetime.now() - risk_engine.updated_at).total_seconds()
+    if age > UPDATE_INTERVAL:
+        print(f"Account state is {age:.0f}s old, not trading until it refreshes")
+        return True
+    
+    current_drawdown_pct = risk_engine.daily_loss_pct()
     
     # Return True if drawdown exceeds limit (meaning we should NOT trade)
     if current_drawdown_pct >= DRAWDOWN_LIMIT_DAILY:
@@ -376,14 +364,13 @@ def calculate_position_size(direction, entry_price, stop_loss, symbol_info):
         print("Entry price equals stop loss - cannot calculate position size")
         return LOT_SIZE  # Use default lot size as fallback
     
-    # Get account info
-    account_info = mt5.account_info()
-    if not account_info:
-        print("Failed to get account info for position sizing")
+    # Use the cached account state
+    if not risk_engine.ready:
+        print("Account state not loaded for position sizing")
         return LOT_SIZE  # Use default lot size as fallback
     
     # Calculate risk amount based on account balance and risk percentage
-    account_balance = account_info.balance
+    account_balance = risk_engine.balance
     risk_amount = account_balance * (RISK_PER_TRADE / 100)
     
     # Get contract specifications
@@ -410,16 +397,12 @@ def calculate_position_size(direction, entry_price, stop_loss, symbol_info):
     else:
         position_size = LOT_SIZE  # Use default lot size as fallback
     
-    # Round to 2 decimal places (standard lot precision)
-    position_size = round(position_size, 2)
-    
-    # Ensure minimum lot size (usually 0.01)
-    if position_size < 0.01:
-        position_size = 0.01
-    
-    # Ensure maximum lot size doesn't exceed what's reasonable
-    if position_size > 10.0:  # Arbitrary maximum for safety
-        position_size = 10.0
+    # Round down to the broker's volume step and clamp to its lot limits
+    meta = symbol_registry.get(symbol_info.name)
+    if meta is not None:
+        position_size = meta.round_volume(position_size)
+    else:
+        position_size = min(max(round(position_size, 2), 0.01), 10.0)
     
     print(f"Calculated position size: {position_size} lots with risk: ${risk_amount:.2f}")
     return position_size
@@ -498,18 +481,63 @@ def check_trailing_stop(position, symbol_info):
     
     return False
 
+JOURNAL_COLUMNS = ['timestamp', 'symbol', 'direction', 'entry', 'stop_loss', 'take_profit', 'volume', 'ticket',
+                   'risk_reward', 'account_balance', 'fill_price', 'latency_ms', 'slippage', 'attempts',
+                   'timeframe', 'risk_amount']
+
+# Held while the journal is migrated or appended to
+journal_lock = threading.Lock()
+
+# Rewrite a journal whose header predates the current columns; returns True if it was migrated
+# Runs once at startup, before any trade is logged
+def migrate_journal(path):
+    with journal_lock:
+        return _migrate_journal(path)
+
+def _migrate_journal(path):
+    try:
+        with open(path, 'r', newline='') as f:
+            reader = csv.reader(f)
+            header = next(reader, None)
+            # Only the header is read while it is current
+            if header is None or header == JOURNAL_COLUMNS:
+                return False
+            rows = list(reader)
+    except OSError:
+        return False
+    with open(path + '.tmp', 'w', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(JOURNAL_COLUMNS)
+        for row in rows:
+            # Rows appended under the old header already have the current layout
+            if len(row) == len(JOURNAL_COLUMNS):
+                writer.writerow(row)
+            else:
+                values = dict(zip(header, row))
+                writer.writerow([values.get(column, '') for column in JOURNAL_COLUMNS])
+    if rows:
+        os.replace(path, path + '.bak')
+    os.replace(path + '.tmp', path)
+    print(f"Migrated {path} to the current journal columns ({len(rows)} trades)"
+          + (f", old file kept as {path}.bak" if rows else ""))
+    return True
+
 # Enhanced log trade function with more error handling
-def log_trade(direction, entry_price, stop_loss, take_profit, volume, result):
+def log_trade(direction, entry_price, stop_loss, take_profit, volume, result, timeframe='', risk_amount=0.0):
     try:
-        file_exists = os.path.exists('trade_journal.csv')
+        file_exists = os.path.exists(JOURNAL_FILE)
         
-        with open('trade_journal.csv', 'a') as f:
+        with journal_lock, open(JOURNAL_FILE, 'a') as f:
             # Write header if file is empty or doesn't exist
             if not file_exists or f.tell() == 0:
-                f.write("timestamp,symbol,direction,entry,stop_loss,take_profit,volume,ticket,risk_reward,account_balance\n")
+                f.write(','.join(JOURNAL_COLUMNS) + '\n')
             
             timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             ticket = result.order if hasattr(result, 'order') else 0
+            fill_price = getattr(result, 'price', entry_price)
+            latency_ms = round(getattr(result, 'latency_ms', 0.0), 2)
+            slippage = getattr(result, 'slippage', 0.0)
+            attempts = getattr(result, 'attempts', 1)
             
             # Calculate risk/reward ratio
             risk = abs(entry_price - stop_loss)
@@ -517,23 +545,17 @@ def log_trade(direction, entry_price, stop_loss, take_profit, volume, result):
             risk_reward = round(reward / risk, 2) if risk > 0 else 0
             
             # Get account balance
-            account_info = mt5.account_info()
-            balance = account_info.balance if account_info else 0
+            balance = risk_engine.balance
             
             # Write trade data
-            f.write(f"{timestamp},{SYMBOL},{direction},{entry_price},{stop_loss},{take_profit},{volume},{ticket},{risk_reward},{balance}\n")
+            f.write(f"{timestamp},{SYMBOL},{direction},{entry_price},{stop_loss},{take_profit},{volume},{ticket},{risk_reward},{balance},{fill_price},{latency_ms},{slippage},{attempts},{timeframe},{round(risk_amount, 2)}\n")
             
             print(f"Trade logged: {direction} {volume} lots on {SYMBOL}, R:R={risk_reward}")
     except Exception as e:
         print(f"Error logging trade: {e}")
 
 # Enhanced enter_trade function with better validation
-def enter_trade(direction, symbol_info, bars, highs, lows):
-    # Check for drawdown limit before entering trade
-    if check_drawdown_limit():
-        print(f"Daily drawdown limit reached. No new trades.")
-        return None
-    
+def enter_trade(direction, symbol_info, bars, highs, lows, stop_loss=None, take_profit=None, strategy=DEFAULT_STRATEGY):
     # Validate inputs
     if len(bars) < ATR_PERIOD + 1:
         print("Not enough bars for ATR calculation")
@@ -556,19 +578,22 @@ def enter_trade(direction, symbol_info, bars, highs, lows):
     # Determine price, SL, and TP
     atr = calculate_atr(bars, ATR_PERIOD)
     
+    # Strategies may supply their own stop and target prices
     if 'bull' in direction:
         # For long entries
         entry_price = tick.ask
         
         # Set stop loss below the recent HL (higher low) or last pivot low
-        if lows and len(lows) > 0:
-            stop_loss = lows[-1][1] - pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
-        else:
-            stop_loss = entry_price - atr * ATR_MULT_SL
+        if stop_loss is None:
+            if lows and len(lows) > 0:
+                stop_loss = lows[-1][1] - pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
+            else:
+                stop_loss = entry_price - atr * ATR_MULT_SL
             
         # Set take profit target based on risk-reward ratio
         sl_distance = entry_price - stop_loss
-        take_profit = entry_price + (sl_distance * ATR_MULT_TP)
+        if take_profit is None:
+            take_profit = entry_price + (sl_distance * ATR_MULT_TP)
         
         order_type = mt5.ORDER_TYPE_BUY
         
@@ -577,19 +602,26 @@ def enter_trade(direction, symbol_info, bars, highs, lows):
         entry_price = tick.bid
         
         # Set stop loss above the recent LH (lower high) or last pivot high
-        if highs and len(highs) > 0:
-            stop_loss = highs[-1][1] + pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
-        else:
-            stop_loss = entry_price + atr * ATR_MULT_SL
+        if stop_loss is None:
+            if highs and len(highs) > 0:
+                stop_loss = highs[-1][1] + pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
+            else:
+                stop_loss = entry_price + atr * ATR_MULT_SL
             
         # Set take profit target based on risk-reward ratio
         sl_distance = stop_loss - entry_price
-        take_profit = entry_price - (sl_distance * ATR_MULT_TP)
+        if take_profit is None:
+            take_profit = entry_price - (sl_distance * ATR_MULT_TP)
         
         order_type = mt5.ORDER_TYPE_SELL
     
     # Validate stop loss and take profit
-    if abs(entry_price - stop_loss) < symbol_info.point * 10:
+    # Respect the broker's stops level as well as the 10-point floor
+    min_distance = max(symbol_info.point * 10, getattr(symbol_info, 'stops_distance', 0.0))
+    if sl_distance <= 0:
+        print("Stop loss is on the wrong side of the entry price")
+        return None
+    if abs(entry_price - stop_loss) < min_distance:
         print("Stop loss too close to entry price")
         return None
         
@@ -601,7 +633,7 @@ def enter_trade(direction, symbol_info, bars, highs, lows):
         print("Invalid position size calculated")
         return None
     
-    # Place the trade
+    # Build every leg up front so they go out back to back
     request = {
         'action': mt5.TRADE_ACTION_DEAL,
         'symbol': SYMBOL,
@@ -611,62 +643,395 @@ def enter_trade(direction, symbol_info, bars, highs, lows):
         'sl': stop_loss,
         'tp': take_profit,
         'magic': MAGIC,
-        'comment': f'market structure {direction}',
+        'comment': f"{'market structure' if strategy == DEFAULT_STRATEGY else strategy} {direction}",
         'type_filling': mt5.ORDER_FILLING_FOK,
         'deviation': 10  # Allow some slippage
     }
+    requests = [request]
     
-    # Send the order
-    try:
-        result = mt5.order_send(request)
-        if result.retcode != mt5.TRADE_RETCODE_DONE:
-            print(f"Order send failed: {result.retcode}, {result.comment}")
-        else:
-            print(f"Order placed successfully: {direction} {volume} lots at {entry_price}, SL: {stop_loss}, TP: {take_profit}")
+    # If scaling out is enabled, set up second position with different TP
+    meta = symbol_registry.get(SYMBOL)
+    if SCALE_OUT_ENABLED and meta is not None and volume >= 2 * meta.volume_min:
+        # Calculate position size for the scale-out
+        scale_volume = meta.round_volume(volume * 0.5)  # 50% of original position
+        if scale_volume >= meta.volume_min:
+            # Calculate first target using scale out setting
+            sl_distance = abs(entry_price - stop_loss)
+            scale_tp = entry_price + (sl_distance * SCALE_OUT_TARGET) if 'bull' in direction else entry_price - (sl_distance * SCALE_OUT_TARGET)
             
-            # If scaling out is enabled, set up second position with different TP
-            if SCALE_OUT_ENABLED and volume >= 0.02:
-                # Calculate position size for the scale-out
-                scale_volume = round(volume * 0.5, 2)  # 50% of original position
-                if scale_volume >= 0.01:  # Minimum 0.01 lot
-                    # Calculate first target using scale out setting
-                    sl_distance = abs(entry_price - stop_loss)
-                    scale_tp = entry_price + (sl_distance * SCALE_OUT_TARGET) if 'bull' in direction else entry_price - (sl_distance * SCALE_OUT_TARGET)
-                    
-                    # Place the scaled position
-                    scale_request = request.copy()
-                    scale_request['volume'] = scale_volume
-                    scale_request['tp'] = scale_tp
-                    scale_request['comment'] = f'market structure {direction} scale-out'
-                    
-                    scale_result = mt5.order_send(scale_request)
-                    if scale_result.retcode == mt5.TRADE_RETCODE_DONE:
-                        print(f"Scale-out position placed: {scale_volume} lots, TP: {scale_tp}")
+            scale_request = request.copy()
+            scale_request['volume'] = scale_volume
+            scale_request['tp'] = scale_tp
+            scale_request['comment'] = f"{request['comment']} scale-out"
+            requests.append(scale_request)
+    
+    # Daily loss, open risk and exposure checks run against cached state
+    total_volume = sum(r['volume'] for r in requests)
+    allowed, reason = risk_engine.pre_trade_check(
+        direction, stop_risk_amount(entry_price, stop_loss, total_volume, symbol_info))
+    if not allowed:
+        print(f"Trade blocked by risk engine: {reason}")
+        return None
+    
+    # Send the orders
+    try:
+        fills = execution_engine.submit(requests)
     except Exception as e:
         print(f"Exception during order placement: {e}")
         return None
     
-    return result
+    for fill in fills:
+        req = fill.request
+        if not fill.filled:
+            print(f"Order send failed after {fill.attempts} attempt(s): {fill.error}")
+            continue
+        print(f"Order placed: {req['comment']} {fill.volume} lots at {fill.price} "
+              f"(requested {entry_price}), SL: {req['sl']}, TP: {req['tp']}, "
+              f"latency {fill.latency_ms:.1f}ms, slippage {fill.slippage:.5f}")
+        risk_engine.on_fill(fill.order, direction, fill.volume, fill.price, stop_loss, symbol_info)
+    
+    return fills
+
+# Break-even, trailing stop and partial close for open positions
+def manage_positions(positions, symbol_info):
+    for position in positions:
+        try:
+            # Check for break-even opportunity
+            new_sl = check_break_even(position, symbol_info)
+            if new_sl:
+                result = move_to_break_even(position, new_sl)
+                if result.retcode == mt5.TRADE_RETCODE_DONE:
+                    risk_engine.on_stop_moved(position.ticket, position.price_open, new_sl, symbol_info)
+
+            # Check for trailing stop opportunity (new)
+            trailing_sl = check_trailing_stop(position, symbol_info)
+            if trailing_sl:
+                result = move_to_break_even(position, trailing_sl)  # Reuse existing function
+                if result.retcode == mt5.TRADE_RETCODE_DONE:
+                    risk_engine.on_stop_moved(position.ticket, position.price_open, trailing_sl, symbol_info)
+
+            # Check for partial close opportunity
+            if check_partial_close(position, symbol_info):
+                partial_close(position)
+        except Exception as e:
+            print(f"Error managing position {position.ticket}: {e}")
+
+# Fetch bars and run structure analysis on every configured timeframe that fits in the cycle budget
+def analyze_timeframes(symbol_info):
+    dir_map = {}
+    pivot_map = {}
+    # Entries run after the analysis whatever the budget; keep their time free
+    reserve = cycle_scheduler.estimate('strategies') + cycle_scheduler.estimate('entries')
+
+    for name, tf in ANALYSIS_ORDER:
+        priority = scheduler.timeframe_priority(TIMEFRAME_SECONDS.get(name, 0))
+        # A shed timeframe is left out of this cycle's maps and analyzed on a later cycle
+        cycle_scheduler.run(f"analyze:{name}", priority, analyze_timeframe, name, tf, symbol_info, dir_map, pivot_map,
+                            reserve=reserve)
+    
+    return dir_map, pivot_map
+
+# Fetch bars of one timeframe and update its structure into dir_map and pivot_map
+def analyze_timeframe(name, tf, symbol_info, dir_map, pivot_map):
+    data_key = f"{SYMBOL}:{name}"
+    # A timeframe without data backs off on its own; the rest of the cycle goes on
+    if not broker_session.data_ready(data_key):
+        return
+    try:
+        # A one-bar fetch tells whether anything changed since the last analysis
+        probe = mt5.copy_rates_from_pos(SYMBOL, tf, 0, 1)
+        if probe is None:
+            broker_session.report_data_error(data_key, mt5.last_error())
+            return
+        broker_session.report_data_ok(data_key)
+        cached = analysis_cache.lookup((SYMBOL, name), structure.bar_fingerprint(probe))
+        if cached is not None:
+            dir_map[name], pivot_map[name] = cached
+            return
+
+        bars = mt5.copy_rates_from_pos(SYMBOL, tf, 0, LOOKBACK)
+        if bars is None:
+            broker_session.report_data_error(data_key, mt5.last_error())
+            return
+
+        if len(bars) < LOOKBACK:
+            print(f"Insufficient data for {name}: got {len(bars)}/{LOOKBACK}")
+            return
+
+        highs, lows = find_pivots(bars)
+        # Reuse the pivots for market structure tracking
+        direction = check_structure_break(bars, symbol_info, name, (highs, lows))
+
+        dir_map[name] = direction
+        pivot_map[name] = (highs, lows, bars)
+        last_bar_times[name] = int(bars[-1]['time'])
+        analysis_cache.store((SYMBOL, name), structure.bar_fingerprint(bars), (direction, pivot_map[name]))
+        if TICK_MODE:
+            update_tick_levels(name, pivot_map[name], symbol_info)
+    except Exception as e:
+        print(f"Error analyzing {name} timeframe: {e}")
+
+# Rebuild a timeframe's tick levels from its structure; a no-op unless the structure changed
+def update_tick_levels(name, pivots, symbol_info):
+    tick_pivots[name] = pivots
+    bars = pivots[2]
+    buffer = pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
+    return tick_monitor.set_levels(name, market_structures[name], buffer, bars[-1]['time'], bars[-1]['open'])
+
+# Run structure break detection on the ticks that cross a level, and enter on the result
+def process_ticks(times, bids, asks, symbol_info, triggered_timeframes):
+    tick_ring.extend(times, bids, asks)
+    buffer = pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
+    for j, names in tick_monitor.scan(times, bids):
+        dir_map, pivot_map = {}, {}
+        for name in names:
+            if name not in tick_pivots:
+                continue
+            # The crossing tick is the close of a bar still forming
+            bar = tick_monitor.bar_at(name, times, bids, j)
+            direction = structure.detect_break(market_structures[name], bar, buffer, RETEST_ENABLED)
+            if not update_tick_levels(name, tick_pivots[name], symbol_info):
+                tick_monitor.disarm(name)
+            # Structure state moved on; the next bar cycle must not reuse the cached result
+            analysis_cache.invalidate((SYMBOL, name))
+            if direction:
+                dir_map[name] = direction
+                pivot_map[name] = tick_pivots[name]
+        if not dir_map:
+            continue
+        print(f"Tick at {datetime.fromtimestamp(times[j] / 1000)} ({bids[j]}): {dir_map}")
+        # A fired break or retest must survive a restart before the next bar cycle
+        save_checkpoint(triggered_timeframes)
+        if check_drawdown_limit():
+            continue
+        # Only plugins that trade structure breaks react to ticks; none configured means no tick entries
+        signals = strategy_engine.evaluate(strategy_context(symbol_info, dir_map, pivot_map), ticks=True)
+        if not signals:
+            continue
+        positions = mt5.positions_get(symbol=SYMBOL, magic=MAGIC) or []
+        evaluate_entries(positions, symbol_info, dir_map, pivot_map, triggered_timeframes, signals)
+        save_checkpoint(triggered_timeframes)
+
+# Between bar cycles: poll new ticks until `until` and act on breaks as they happen
+def watch_ticks(symbol_info, triggered_timeframes, until, stop_event):
+    while not stop_event.is_set() and time.time() < until:
+        try:
+            tick_key = f"{SYMBOL}:ticks"
+            if broker_session.ensure() and broker_session.data_ready(tick_key):
+                since = tick_ring.last_time
+                if not since:
+                    tick = mt5.symbol_info_tick(SYMBOL)
+                    since = tick.time_msc if tick is not None else 0
+                ticks = mt5.copy_ticks_from(SYMBOL, since // 1000, TICK_BUFFER_SIZE, mt5.COPY_TICKS_INFO)
+                if ticks is None:
+                    broker_session.report_data_error(tick_key, mt5.last_error())
+                else:
+                    broker_session.report_data_ok(tick_key)
+                    ticks = ticks[ticks['time_msc'] > since]
+                    if len(ticks):
+                        process_ticks(ticks['time_msc'], ticks['bid'], ticks['ask'], symbol_info,
+                                      triggered_timeframes)
+        except Exception as e:
+            print(f"Error processing ticks: {e}")
+        stop_event.wait(min(TICK_POLL_INTERVAL, max(0.0, until - time.time())))
+
+# Pivots and structure state behind a signal, for the signal store
+def signal_context(name, pivot_map):
+    highs, lows, bars = pivot_map[name]
+    
+    def last_two(points):
+        return [{'index': i, 'time': int(bars[i]['time']), 'price': p} for i, p in points[-2:]]
+    
+    ms = market_structures.get(name)
+    context = None
+    if ms is not None:
+        context = {field: getattr(ms, field) for field in MarketStructure.__slots__}
+    return {'highs': last_two(highs), 'lows': last_two(lows)}, context
+
+# Shared per-cycle view of every analyzed timeframe for the strategy plugins
+def strategy_context(symbol_info, dir_map, pivot_map):
+    timeframes = {}
+    for name in TIMEFRAME_NAMES:
+        if name in pivot_map:
+            highs, lows, bars = pivot_map[name]
+            timeframes[name] = TimeframeData(name, bars, highs, lows, dir_map.get(name), market_structures.get(name))
+    return StrategyContext(SYMBOL, symbol_info, timeframes, pips_to_points(1, symbol_info))
+
+# Order router: enter on the first untriggered signal by timeframe precedence, then strategy order
+def evaluate_entries(positions, symbol_info, dir_map, pivot_map, triggered_timeframes, signals=None):
+    if signals is None:
+        signals = [Signal(DEFAULT_STRATEGY, name, direction) for name, direction in dir_map.items() if direction]
+    precedence = {name: i for i, name in enumerate(TIMEFRAME_NAMES)}
+    signals = sorted((s for s in signals if s.timeframe in precedence and s.timeframe in pivot_map),
+                     key=lambda s: (precedence[s.timeframe], strategy_engine.order.get(s.strategy, 0)))
+    current_positions = len(positions)
+    taken = None
+    for signal in signals:
+        name = signal.timeframe
+        direction = signal.direction
+        pivots, context = signal_context(name, pivot_map)
+        tf = name.replace('TIMEFRAME_', '')
+        # Market structure keeps its plain timeframe keys in journals, stats and the daily triggers
+        if signal.strategy != DEFAULT_STRATEGY:
+            tf = f"{signal.strategy}:{tf}"
+        trigger_key = name if signal.strategy == DEFAULT_STRATEGY else f"{signal.strategy}:{name}"
+        bar_time = int(pivot_map[name][2][-1]['time'])
+        
+        def skip(reason):
+            signal_store.record(tf, direction, SKIPPED, reason, pivots=pivots, structure=context, symbol=SYMBOL,
+                                bar_time=bar_time)
+        
+        if direction not in ['bull', 'bear', 'bull_retest', 'bear_retest']:
+            skip('awaiting_retest')
+            continue
+        if taken:
+            skip(f'superseded_by_{taken}')
+            continue
+        if current_positions >= MAX_POS:
+            skip('max_positions')
+            continue
+        if trigger_key in triggered_timeframes:
+            skip('already_triggered')
+            continue
+        
+        try:
+            highs, lows, bars = pivot_map[name]
+            fills = enter_trade(direction, symbol_info, bars, highs, lows,
+                                signal.stop_loss, signal.take_profit, signal.strategy)
+            
+            if not fills:
+                skip('entry_rejected')
+                continue
+            if not fills[0].filled:
+                skip('order_failed')
+                continue
+            
+            triggered_timeframes[trigger_key] = True
+            taken = tf
+            
+            event = signal_store.record(tf, direction, TAKEN, ticket=fills[0].order,
+                                        pivots=pivots, structure=context, symbol=SYMBOL, bar_time=bar_time)
+            
+            # Log the prices that were actually sent with each leg
+            for fill in fills:
+                if fill.filled:
+                    req = fill.request
+                    risk = stop_risk_amount(req['price'], req['sl'], fill.volume, symbol_info)
+                    log_trade(direction, req['price'], req['sl'], req['tp'], fill.volume, fill, tf, risk)
+                    signal_store.link_ticket(fill.order, event)
+        except Exception as e:
+            print(f"Error entering trade on {name} timeframe: {e}")
+            skip('error')
+    signal_store.flush()
+
+# One pass of the bot loop; returns False when trading is blocked
+def run_cycle(symbol_info, triggered_timeframes, analysis=None):
+    # Fails fast while the terminal is backing off or the circuit is open
+    if not broker_session.ensure():
+        return False
+    
+    # Get existing positions and refresh account state once per cycle
+    positions = mt5.positions_get(symbol=SYMBOL, magic=MAGIC) or []
+    if not risk_engine.refresh(positions, symbol_info):
+        return False  # Never size or check risk against last cycle's account state
+    
+    # Check drawdown limit
+    if check_drawdown_limit():
+        print(f"Daily drawdown limit reached. Waiting for next check.")
+        return False
+    
+    # Protecting open positions never waits for analysis, whatever the budget
+    cycle_scheduler.run('positions', scheduler.POSITIONS, manage_positions, positions, symbol_info, essential=True)
+    if analysis is not None:
+        # Account executors receive (dir_map, pivot_map, signals) from the signal engine and only route orders
+        dir_map, pivot_map, signals = analysis
+    else:
+        dir_map, pivot_map = analyze_timeframes(symbol_info)
+        _, signals = cycle_scheduler.run('strategies', scheduler.ORDERS, strategy_engine.evaluate,
+                                         strategy_context(symbol_info, dir_map, pivot_map), essential=True)
+    cycle_scheduler.run('entries', scheduler.ORDERS, evaluate_entries, positions, symbol_info, dir_map, pivot_map,
+                        triggered_timeframes, signals, essential=True)
+    save_checkpoint(triggered_timeframes)
+    return True
+
+# Persist state if anything changed since the last write
+def save_checkpoint(triggered_timeframes):
+    try:
+        checkpoint.save(SYMBOL, market_structures, triggered_timeframes, last_bar_times,
+                        risk_engine.day, risk_engine.day_start_equity)
+    except Exception as e:
+        print(f"Error writing state snapshot: {e}")
+
+# Load the last snapshot and reconcile it with bars that closed while stopped
+def restore_checkpoint(symbol_info):
+    state = checkpoint.load()
+    if state is None or state.symbol != SYMBOL:
+        return {}
+    
+    start = time.perf_counter()
+    # Timeframes not analyzed again before the next save (shed, backing off) keep their bar time
+    last_bar_times.update(state.bar_times)
+    buffer = pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
+    for name, tf in zip(TIMEFRAME_NAMES, TIMEFRAMES):
+        ms = state.structures.get(name)
+        if ms is None:
+            continue
+        market_structures[name] = ms
+        seen = state.bar_times.get(name)
+        if seen is None or not ms.waiting_for_retest:
+            continue
+        bars = mt5.copy_rates_from_pos(SYMBOL, tf, 0, LOOKBACK)
+        if bars is None or len(bars) < 2:
+            continue
+        # Only bars that opened after the last one seen and have since closed
+        closed = bars[:-1][bars[:-1]['time'] > seen]
+        if reconcile(ms, closed, buffer):
+            print(f"Dropped stale {ms.retest_direction} retest at {ms.retest_level} on {name}")
+    
+    risk_engine.restore(state.day, state.day_start_equity)
+    triggered = {}
+    if state.day == datetime.now().date():
+        triggered = {name: True for name in state.triggered}
+    
+    print(f"Restored state snapshot from {datetime.fromtimestamp(state.saved_at)} "
+          f"in {(time.perf_counter() - start) * 1000:.1f}ms")
+    return triggered
 
 # Enhanced main bot loop with better error handling
 def run(stop_event):
-    if not mt5.initialize():
-        print("MT5 initialization failed")
-        return
-    if not mt5.symbol_select(SYMBOL, True):
-        print(f"Failed to select symbol {SYMBOL}")
-        mt5.shutdown()
+    if ACCOUNTS:
+        # Analyze once here and fan signals out to one executor per account
+        import fanout
+        return fanout.run(stop_event, ACCOUNTS)
+    
+    # Trades logged under an older header would otherwise lose their timeframe and risk columns
+    migrate_journal(JOURNAL_FILE)
+    if not broker_session.ensure():
+        print(f"MT5 initialization failed: {broker_session.last_error}")
         return
 
-    symbol_info = mt5.symbol_info(SYMBOL)
-    triggered_timeframes = {}
+    symbol_info = symbol_registry.get(SYMBOL)
+    if symbol_info is None:
+        broker_session.shutdown()
+        return
+    triggered_timeframes = restore_checkpoint(symbol_info)
     last_day = datetime.now().day
     
+    if DIAGNOSTICS_ENABLED:
+        diagnostics.watch('market_structures', lambda: len(market_structures))
+        diagnostics.watch('triggered_timeframes', lambda: len(triggered_timeframes))
+        diagnostics.watch('analysis_cache', lambda: len(analysis_cache.entries))
+        diagnostics.watch('signal_tickets', lambda: len(signal_store.by_ticket))
+        diagnostics.start()
+    
     print(f"Bot started for {SYMBOL} at {datetime.now()}")
     print(f"Configured timeframes: {TIMEFRAME_NAMES}")
     print(f"Max positions: {MAX_POS}, Lot size: {LOT_SIZE}")
+    if TICK_MODE:
+        print(f"Tick mode: polling ticks every {TICK_POLL_INTERVAL}s between bar cycles")
 
     while not stop_event.is_set():
+        cycle_start = time.time()
         try:
             current_day = datetime.now().day
             if current_day != last_day:
@@ -674,115 +1039,27 @@ def run(stop_event):
                 last_day = current_day
                 print(f"New trading day: {datetime.now().date()}")
 
-            # Check drawdown limit
-            if check_drawdown_limit():
-                print(f"Daily drawdown limit reached. Waiting for next check.")
-                time.sleep(UPDATE_INTERVAL)
-                continue
-
-            # Get and manage existing positions
-            positions = mt5.positions_get(symbol=SYMBOL, magic=MAGIC) or []
-            
-            for position in positions:
-                try:
-                    # Check for break-even opportunity
-                    new_sl = check_break_even(position, symbol_info)
-                    if new_sl:
-                        move_to_break_even(position, new_sl)
-                    
-                    # Check for trailing stop opportunity (new)
-                    trailing_sl = check_trailing_stop(position, symbol_info)
-                    if trailing_sl:
-                        move_to_break_even(position, trailing_sl)  # Reuse existing function
-                    
-                    # Check for partial close opportunity
-                    if check_partial_close(position, symbol_info):
-                        partial_close(position)
-                except Exception as e:
-                    print(f"Error managing position {position.ticket}: {e}")
-            
-            # Analyze market and look for opportunities
-            dir_map = {}
-            pivot_map = {}
-            
-            for name, tf in zip(TIMEFRAME_NAMES, TIMEFRAMES):
-                try:
-                    bars = mt5.copy_rates_from_pos(SYMBOL, tf, 0, LOOKBACK)
-                    if bars is None:
-                        print(f"No data returned for {name}")
-                        continue
-                        
-                    if len(bars) < LOOKBACK:
-                        print(f"Insufficient data for {name}: got {len(bars)}/{LOOKBACK}")
-                        continue
-                        
-                    highs, lows = find_pivots(bars)
-                    # Update to pass the timeframe name for market structure tracking
-                    direction = check_structure_break(bars, symbol_info, name)
-                    
-                    dir_map[name] = direction
-                    pivot_map[name] = (highs, lows, bars)
-                    
-                    if name in triggered_timeframes:
-                        continue
-                except Exception as e:
-                    print(f"Error analyzing {name} timeframe: {e}")
-                    continue
-                
-            # Evaluate if we should enter new positions
-            current_positions = len(positions)
-            if current_positions < MAX_POS:
-                for name in TIMEFRAME_NAMES:
-                    if name not in dir_map or not dir_map[name]:
-                        continue
-                        
-                    if name in triggered_timeframes:
-                        continue
-                        
-                    direction = dir_map[name]
-                    
-                    if direction in ['bull', 'bear', 'bull_retest', 'bear_retest']:
-                        try:
-                            highs, lows, bars = pivot_map[name]
-                            result = enter_trade(direction, symbol_info, bars, highs, lows)
-                            
-                            if result and hasattr(result, 'order') and result.order > 0:
-                                triggered_timeframes[name] = True
-                                
-                                tick = mt5.symbol_info_tick(SYMBOL)
-                                entry_price = tick.ask if 'bull' in direction else tick.bid
-                                
-                                # Determine stop loss based on direction
-                                if 'bull' in direction and lows and len(lows) > 0:
-                                    stop_loss = lows[-1][1] - pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
-                                elif 'bear' in direction and highs and len(highs) > 0:
-                                    stop_loss = highs[-1][1] + pips_to_points(BREAK_BUFFER_PIPS, symbol_info)
-                                else:
-                                    # Fallback to ATR-based stop loss
-                                    atr = calculate_atr(bars, ATR_PERIOD)
-                                    stop_loss = entry_price - atr * ATR_MULT_SL if 'bull' in direction else entry_price + atr * ATR_MULT_SL
-                                
-                                # Calculate take profit
-                                sl_distance = abs(entry_price - stop_loss)
-                                take_profit = entry_price + sl_distance * ATR_MULT_TP if 'bull' in direction else entry_price - sl_distance * ATR_MULT_TP
-                                
-                                # Ensure we have valid volume
-                                volume = result.volume if hasattr(result, 'volume') else LOT_SIZE
-                                
-                                # Log the trade
-                                log_trade(direction, entry_price, stop_loss, take_profit, volume, result)
-                                break
-                        except Exception as e:
-                            print(f"Error entering trade on {name} timeframe: {e}")
-                            continue
+            # Contract specs are reloaded every SYMBOL_REFRESH_INTERVAL seconds
+            symbol_info = symbol_registry.get(SYMBOL) or symbol_info
+            cycle_scheduler.begin()
+            with diagnostics.cycle():
+                run_cycle(symbol_info, triggered_timeframes)
+            diagnostics.maybe_snapshot()
         
         except Exception as e:
             print(f"Error in main bot loop: {e}")
+        finally:
+            cycle_scheduler.end(UPDATE_INTERVAL)
         
-        time.sleep(UPDATE_INTERVAL)
+        # Cycles start every UPDATE_INTERVAL; an overrun shortens the wait instead of shifting the schedule
+        next_cycle = cycle_start + UPDATE_INTERVAL
+        if TICK_MODE:
+            watch_ticks(symbol_info, triggered_timeframes, next_cycle, stop_event)
+        else:
+            time.sleep(max(0.0, next_cycle - time.time()))
 
     print(f"Bot stopped at {datetime.now()}")
-    mt5.shutdown()
+    broker_session.shutdown()
 
 if __name__ == '__main__':
     stop_flag = threading.Event()
@@ -0,0 +1,222 @@
+"""
+Shared terminal session with health checks, backoff and a circuit breaker.
+
+The MetaTrader5 package holds one connection per process, so the bot loop
+and the Flask handlers share a single BrokerSession instead of each calling
+mt5.initialize(). Callers ask ensure() before talking to the terminal:
+
+- While healthy, ensure() costs a time check; a health probe runs every
+  health_interval seconds.
+- After a failure, reconnects are spaced with exponential backoff and jitter.
+  Calls in between fail immediately without touching the terminal.
+- After failure_threshold consecutive failures the circuit opens and all
+  calls fail fast for cooldown seconds, doubling on each failed half-open probe.
+
+A call that returns no data on a working connection (no bars for one
+timeframe, no ticks) is a data error, not a connection failure. Data errors
+are counted per key, e.g. symbol and timeframe, with their own backoff. They
+never drop the session, and a reconnect does not reset them.
+
+Only state changes are printed, not every failed attempt.
+"""
+import random
+import threading
+import time
+import MetaTrader5 as mt5
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+
+# Account config keys passed to mt5.initialize()
+TERMINAL_KEYS = {'terminal_path': 'path', 'login': 'login', 'password': 'password',
+                 'server': 'server', 'timeout': 'timeout'}
+
+
+def terminal_kwargs(account):
+    kwargs = {arg: account[key] for key, arg in TERMINAL_KEYS.items() if key in account}
+    if 'login' in kwargs:
+        kwargs['login'] = int(kwargs['login'])
+    return kwargs
+
+
+class BrokerSession:
+    """
+    Args:
+        symbol (str): Selected on every (re)connect and probed by the health check
+        health_interval (float): Seconds between health probes while connected
+        backoff_base (float): First reconnect delay in seconds
+        backoff_max (float): Cap on the reconnect delay
+        failure_threshold (int): Consecutive failures that open the circuit
+        cooldown (float): Seconds the circuit stays open before a trial reconnect
+        **init_kwargs: Passed to mt5.initialize() (path, login, password, server, timeout)
+    """
+
+    def __init__(self, symbol=None, health_interval=30.0, backoff_base=1.0, backoff_max=300.0,
+                 failure_threshold=5, cooldown=60.0, **init_kwargs):
+        self.symbol = symbol
+        self.health_interval = health_interval
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.failure_threshold = failure_threshold
+        self.base_cooldown = cooldown
+        self.init_kwargs = init_kwargs
+
+        self.connected = False
+        self.state = CLOSED
+        self.failures = 0
+        self.cooldown = cooldown
+        self.next_attempt = 0.0
+        self.last_health = 0.0
+        self.last_error = None
+        self.data_errors = {}  # key -> {'failures', 'next_attempt', 'last_error'}
+        self.stats = {'connects': 0, 'total_failures': 0, 'fast_failures': 0, 'health_checks': 0, 'circuit_opens': 0,
+                      'data_errors': 0, 'data_skips': 0}
+        self._lock = threading.RLock()
+
+    def ensure(self):
+        """
+        Make sure the session is usable.
+
+        Returns:
+            bool: False, without contacting the terminal, while backing off or with the circuit open
+        """
+        now = time.monotonic()
+        if self.connected and now - self.last_health < self.health_interval:
+            return True
+        with self._lock:
+            now = time.monotonic()
+            if self.connected:
+                if now - self.last_health < self.health_interval:
+                    return True
+                if self._healthy():
+                    self.last_health = now
+                    return True
+                self._failed(f"health check failed: {mt5.last_error()}")
+                return False
+            if now < self.next_attempt:
+                self.stats['fast_failures'] += 1
+                return False
+            if self.state == OPEN:
+                self.state = HALF_OPEN
+                print("Broker circuit half-open, trying to reconnect")
+            return self._connect()
+
+    def _healthy(self):
+        self.stats['health_checks'] += 1
+        if mt5.terminal_info() is None:
+            return False
+        return self.symbol is None or mt5.symbol_info_tick(self.symbol) is not None
+
+    def _connect(self):
+        if not mt5.initialize(**self.init_kwargs):
+            self._failed(f"initialize failed: {mt5.last_error()}")
+            return False
+        if self.symbol is not None and not mt5.symbol_select(self.symbol, True):
+            self._failed(f"failed to select symbol {self.symbol}: {mt5.last_error()}")
+            return False
+        recovered = self.failures > 0
+        self.connected = True
+        self.failures = 0
+        self.cooldown = self.base_cooldown
+        self.state = CLOSED
+        self.last_health = time.monotonic()
+        self.last_error = None
+        self.stats['connects'] += 1
+        if recovered:
+            print("Broker connection restored")
+        return True
+
+    def _failed(self, error):
+        now = time.monotonic()
+        self.connected = False
+        self.failures += 1
+        self.stats['total_failures'] += 1
+        first = self.failures == 1
+        self.last_error = error
+        if self.state == HALF_OPEN:
+            # Trial reconnect failed: reopen for twice as long
+            self.cooldown = min(self.cooldown * 2, self.backoff_max * 10)
+            self._open(now)
+        elif self.failures >= self.failure_threshold:
+            self._open(now)
+        else:
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (self.failures - 1))
+            self.next_attempt = now + delay * random.uniform(0.5, 1.5)
+            if first:
+                print(f"Broker connection lost ({error}), retrying with backoff")
+
+    def _open(self, now):
+        self.state = OPEN
+        self.stats['circuit_opens'] += 1
+        self.next_attempt = now + self.cooldown * random.uniform(0.9, 1.1)
+        print(f"Broker circuit open after {self.failures} failures ({self.last_error}); "
+              f"failing fast for {self.cooldown:.0f}s")
+
+    def report_failure(self, error=None):
+        """Let callers count a failed terminal call (e.g. copy_rates returned None) towards the breaker."""
+        with self._lock:
+            self._failed(error or f"call failed: {mt5.last_error()}")
+
+    def data_ready(self, key):
+        """False while the data behind key (e.g. 'EURUSD:TIMEFRAME_D1') is backing off after errors."""
+        entry = self.data_errors.get(key)
+        if entry is None or time.monotonic() >= entry['next_attempt']:
+            return True
+        self.stats['data_skips'] += 1
+        return False
+
+    def report_data_error(self, key, error):
+        """Count a call that returned no data for key; backs off that key only."""
+        with self._lock:
+            entry = self.data_errors.setdefault(key, {'failures': 0, 'next_attempt': 0.0, 'last_error': None})
+            entry['failures'] += 1
+            entry['last_error'] = error
+            self.stats['data_errors'] += 1
+            delay = min(self.backoff_max, self.backoff_base * 2 ** (entry['failures'] - 1))
+            entry['next_attempt'] = time.monotonic() + delay * random.uniform(0.5, 1.5)
+            if entry['failures'] == 1:
+                print(f"No data for {key} ({error}), retrying with backoff")
+
+    def report_data_ok(self, key):
+        if key not in self.data_errors:
+            return
+        with self._lock:
+            entry = self.data_errors.pop(key, None)
+        if entry is not None:
+            print(f"Data for {key} restored after {entry['failures']} failures")
+
+    def call(self, fn, *args, **kwargs):
+        """
+        Run fn(*args) against the terminal if the session is usable.
+
+        Returns:
+            The result of fn, or None when the session is down or fn returned None
+        """
+        if not self.ensure():
+            return None
+        result = fn(*args, **kwargs)
+        if result is None:
+            self.report_failure(f"{getattr(fn, '__name__', 'call')} failed: {mt5.last_error()}")
+        return result
+
+    def shutdown(self):
+        with self._lock:
+            if self.connected:
+                mt5.shutdown()
+            self.connected = False
+
+    def status(self):
+        with self._lock:
+            return {
+                'connected': self.connected,
+                'circuit': self.state,
+                'failures': self.failures,
+                'retry_in': max(0.0, self.next_attempt - time.monotonic()) if not self.connected else 0.0,
+                'last_error': self.last_error,
+                'data_errors_by_key': {key: {'failures': e['failures'], 'last_error': e['last_error'],
+                                             'retry_in': max(0.0, e['next_attempt'] - time.monotonic())}
+                                       for key, e in self.data_errors.items()},
+                **self.stats,
+            }
@@ -0,0 +1,299 @@
+"""
+Versioned, atomically written config.json.
+
+Every write validates the changed keys against SCHEMA. It then bumps
+config_version and replaces the file through a temp file and os.replace,
+so a reader in any process sees either the old file or the new one, never
+a partial write. Writers in every process hold a lock on config.json.lock
+across the read, version check and write, so no update is lost. In-process
+readers get the cached parsed dict. It is only re-parsed when the file on
+disk changes.
+"""
+import ast
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from types import MappingProxyType
+try:
+    import fcntl
+except ImportError:  # Windows terminals lock through msvcrt instead
+    fcntl = None
+    import msvcrt
+
+VERSION_KEY = 'config_version'
+
+
+# Hold an exclusive lock on a sidecar file, shared by every process writing the same config
+@contextmanager
+def file_lock(path):
+    with open(path, 'a+') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+TIMEFRAME_NAMES = ['TIMEFRAME_M1', 'TIMEFRAME_M15', 'TIMEFRAME_M30', 'TIMEFRAME_H1', 'TIMEFRAME_H4', 'TIMEFRAME_D1']
+
+# key -> (type, min, max); None means unbounded
+SCHEMA = {
+    'symbol': (str, None, None),
+    'timeframe': (str, None, None),
+    'timeframes': (list, None, None),
+    'lookback': (int, 10, None),
+    'pivot_depth': (int, 1, None),
+    'break_buffer_pips': (float, 0, None),
+    'atr_period': (int, 1, None),
+    'atr_multiplier_sl': (float, 0, None),
+    'atr_multiplier_tp': (float, 0, None),
+    'lot_size': (float, 0, None),
+    'stop_loss_pips': (float, 0, None),
+    'take_profit_pips': (float, 0, None),
+    'magic': (int, 0, None),
+    'max_positions': (int, 0, None),
+    'update_interval': (int, 1, None),
+    'break_even_pips': (float, 0, None),
+    'break_even_buffer_pips': (float, 0, None),
+    'partial_close_enabled': (bool, None, None),
+    'partial_close_pct': (float, 0, 100),
+    'partial_close_pips': (float, 0, None),
+    'retest_enabled': (bool, None, None),
+    'risk_per_trade': (float, 0, 100),
+    'drawdown_limit_daily': (float, 0, 100),
+    'scale_out_enabled': (bool, None, None),
+    'scale_out_target': (float, 0, None),
+    'max_open_risk_pct': (float, 0, 100),
+    'max_direction_risk_pct': (float, 0, 100),
+    'order_max_attempts': (int, 1, None),
+    'symbol_refresh_interval': (float, 1, None),
+    'signal_memory': (int, 1, None),
+    'history_sync_days': (int, 1, None),
+    'max_signal_age': (float, 0, None),
+    'broker_health_interval': (float, 1, None),
+    'broker_backoff_max': (float, 1, None),
+    'broker_failure_threshold': (int, 1, None),
+    'broker_circuit_cooldown': (float, 1, None),
+    'tick_mode': (bool, None, None),
+    'tick_buffer_size': (int, 1024, None),
+    'tick_poll_interval': (float, 0.01, None),
+    'diagnostics_enabled': (bool, None, None),
+    'diagnostics_interval': (float, 1, None),
+    'diagnostics_growth_alert_mb': (float, 0, None),
+    'strategies': (list, None, None),
+    'strategy_workers': (int, 0, None),
+    'cycle_budget': (float, 0, None),
+    'max_deferrals': (int, 0, None),
+    'accounts': (list, None, None),
+}
+
+TRUE_WORDS = ('true', 'on', 'yes', '1')
+FALSE_WORDS = ('false', 'off', 'no', '0')
+
+
+class ConfigError(ValueError):
+    """Rejected config update; errors maps each bad key to a message."""
+
+    def __init__(self, errors):
+        super().__init__('; '.join(f"{k}: {v}" for k, v in errors.items()))
+        self.errors = errors
+
+
+class VersionConflict(ConfigError):
+    def __init__(self, expected, current):
+        super().__init__({VERSION_KEY: f"form was loaded at version {expected}, config is now at {current}"})
+        self.expected = expected
+        self.current = current
+
+
+# Type guess for keys without a schema entry, as the settings form always did
+def guess_value(val):
+    if not isinstance(val, str):
+        return val
+    if val.lower() == 'true':
+        return True
+    if val.lower() == 'false':
+        return False
+    if val.isdigit():
+        return int(val)
+    try:
+        return float(val)
+    except ValueError:
+        pass
+    if val[:1] in '[{' and val[-1:] in ']}':
+        try:
+            return ast.literal_eval(val)
+        except (SyntaxError, ValueError):
+            pass
+    return val
+
+
+def coerce(key, val):
+    """Convert a form or JSON value to the schema type of key, or raise ValueError."""
+    spec = SCHEMA.get(key)
+    if spec is None:
+        return guess_value(val)
+    kind, lo, hi = spec
+    if kind is bool:
+        if isinstance(val, bool):
+            return val
+        word = str(val).strip().lower()
+        if word in TRUE_WORDS:
+            return True
+        if word in FALSE_WORDS:
+            return False
+        raise ValueError(f"expected true/false, got {val!r}")
+    if kind is list:
+        if isinstance(val, str):
+            try:
+                val = ast.literal_eval(val)
+            except (SyntaxError, ValueError):
+                raise ValueError(f"expected a list, got {val!r}")
+        if not isinstance(val, list):
+            raise ValueError(f"expected a list, got {type(val).__name__}")
+        if key == 'timeframes':
+            unknown = [tf for tf in val if tf not in TIMEFRAME_NAMES]
+            if unknown or not val:
+                raise ValueError(f"expected a non-empty list of {', '.join(TIMEFRAME_NAMES)}")
+        return val
+    if kind is str:
+        val = str(val).strip()
+        if not val:
+            raise ValueError("must not be empty")
+        return val
+    try:
+        number = float(val)
+    except (TypeError, ValueError):
+        raise ValueError(f"expected a number, got {val!r}")
+    if kind is int:
+        if number != int(number):
+            raise ValueError(f"expected a whole number, got {val!r}")
+        number = int(number)
+    if lo is not None and number < lo:
+        raise ValueError(f"must be >= {lo}")
+    if hi is not None and number > hi:
+        raise ValueError(f"must be <= {hi}")
+    return number
+
+
+class ConfigStore:
+    """
+    Args:
+        path (str): JSON config file
+    """
+
+    def __init__(self, path='config.json'):
+        self.path = path
+        self._config = MappingProxyType({})
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _file_stamp(self):
+        st = os.stat(self.path)
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def get(self):
+        """
+        Current config as a read-only mapping.
+
+        Costs one stat() when nothing changed; the file is parsed only after a write.
+        """
+        stamp = self._file_stamp()
+        if stamp != self._stamp:
+            with self._lock:
+                if stamp != self._stamp:
+                    with open(self.path, 'r') as f:
+                        self._config = MappingProxyType(json.load(f))
+                    self._stamp = stamp
+        return self._config
+
+    @property
+    def version(self):
+        return self.get().get(VERSION_KEY, 0)
+
+    def diff(self, changes, current=None):
+        """
+        Validate changes against the current config.
+
+        Returns:
+            dict: {key: (old, new)} for keys whose value actually changes
+
+        Raises:
+            ConfigError: If any value fails its schema
+        """
+        if current is None:
+            current = self.get()
+        errors, diff = {}, {}
+        for key, raw in changes.items():
+            if key == VERSION_KEY:
+                continue
+            try:
+                value = coerce(key, raw)
+            except ValueError as e:
+                errors[key] = str(e)
+                continue
+            if key not in current or current[key] != value:
+                diff[key] = (current.get(key), value)
+        if errors:
+            raise ConfigError(errors)
+        return diff
+
+    def update(self, changes, expected_version=None):
+        """
+        Apply changes and write the file atomically under a new version.
+
+        Keys not in changes keep their current value.
+
+        Args:
+            changes (dict): key -> new value (form strings are coerced)
+            expected_version (int): Reject the update if the config moved past this version
+
+        Returns:
+            tuple: (version, diff)
+
+        Raises:
+            ConfigError: If any value fails its schema
+            VersionConflict: If expected_version is stale
+        """
+        # The thread lock serializes this store; the file lock serializes every worker's store
+        with self._lock, file_lock(self.path + '.lock'):
+            # Re-read the file itself; another process may have written it
+            with open(self.path, 'r') as f:
+                current = json.load(f)
+            version = current.get(VERSION_KEY, 0)
+            if expected_version is not None and int(expected_version) != version:
+                raise VersionConflict(int(expected_version), version)
+            diff = self.diff(changes, current)
+            if not diff:
+                return version, diff
+            new = dict(current)
+            for key, (_, value) in diff.items():
+                new[key] = value
+            new[VERSION_KEY] = version + 1
+            self._write(new)
+            return version + 1, diff
+
+    def _write(self, config):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix='.config-', suffix='.json')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(config, f, indent=4)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._config = MappingProxyType(config)
+        self._stamp = self._file_stamp()
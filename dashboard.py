@@ -1,20 +1,118 @@
-# ...existing code...
-
-def update_dashboard(analysis_results):
-    """Update the dashboard with analysis results."""
-    # Ensure we're checking for all timeframes
-    timeframes = ['M1', 'M5', 'M15', 'H1', 'H4', 'D1']
-    
-    for timeframe in timeframes:
-        # Get result or default to "none" if missing
-        result = analysis_results.get(timeframe, "none")
-        
-        # Update the UI element for this timeframe
-        # Make sure the UI element exists for each timeframe
-        ui_element_id = f"analysis_{timeframe}"
-        update_ui_element(ui_element_id, result)
-        
-        # Debug logging
-        print(f"Setting {timeframe} analysis to: {result}")
-
-# ...existing code...
+"""Consolidated JSON/HTML reports for analysis.py scans."""
+import html
+import json
+import os
+import tempfile
+from datetime import datetime
+
+DIRECTION_COLORS = {'Bull': '#10b981', 'Bear': '#ef4444', 'none': '#9ca3af'}
+
+
+def build_report(results, timeframes, params, meta):
+    """
+    Combine per-symbol results into one report dict.
+
+    The summary counts symbols per direction and timeframe and lists every
+    active retest, so the nightly scan can be read at a glance.
+    """
+    summary = {tf: {'Bull': 0, 'Bear': 0, 'none': 0} for tf in timeframes}
+    retests = []
+    for symbol, by_tf in results.items():
+        for tf in timeframes:
+            r = by_tf.get(tf, {})
+            summary[tf][r.get('direction', 'none')] += 1
+            if r.get('waiting_for_retest'):
+                retests.append({'symbol': symbol, 'timeframe': tf,
+                                'direction': r['retest_direction'], 'level': r['retest_level'],
+                                'close': r['close']})
+    return {
+        'meta': dict(meta, params=params, symbols=len(results), timeframes=list(timeframes)),
+        'summary': summary,
+        'active_retests': retests,
+        'symbols': results,
+    }
+
+
+def _atomic_write(path, text):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.report-')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def write_json_report(report, path):
+    _atomic_write(path, json.dumps(report, indent=2))
+
+
+def _fmt_price(value):
+    return '' if value is None else f"{value:.5g}"
+
+
+def _fmt_time(ts):
+    return '' if ts is None else datetime.fromtimestamp(ts).strftime('%Y-%m-%d %H:%M')
+
+
+def render_html_report(report):
+    timeframes = report['meta']['timeframes']
+    esc = html.escape
+    rows = []
+    for symbol, by_tf in sorted(report['symbols'].items()):
+        cells = [f"<th>{esc(symbol)}</th>"]
+        for tf in timeframes:
+            r = by_tf.get(tf, {})
+            direction = r.get('direction', 'none')
+            title = [f"close {_fmt_price(r.get('close'))}"]
+            if r.get('last_pivot_high'):
+                title.append(f"PH {_fmt_price(r['last_pivot_high']['price'])} @ {_fmt_time(r['last_pivot_high']['time'])}")
+            if r.get('last_pivot_low'):
+                title.append(f"PL {_fmt_price(r['last_pivot_low']['price'])} @ {_fmt_time(r['last_pivot_low']['time'])}")
+            if r.get('error'):
+                title.append(r['error'])
+            retest = f"<br><small>retest {_fmt_price(r['retest_level'])}</small>" if r.get('waiting_for_retest') else ''
+            cells.append(f"<td title=\"{esc(' | '.join(title))}\" style=\"color:{DIRECTION_COLORS[direction]}\">"
+                         f"{esc(direction)}{retest}</td>")
+        rows.append(f"<tr>{''.join(cells)}</tr>")
+
+    summary = ''.join(
+        f"<tr><th>{esc(tf)}</th><td>{c['Bull']}</td><td>{c['Bear']}</td><td>{c['none']}</td></tr>"
+        for tf, c in report['summary'].items())
+    meta = report['meta']
+    return f"""<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<title>Market Structure Scan {esc(meta['generated_at'])}</title>
+<style>
+  body {{ font-family: sans-serif; margin: 2rem; color: #1f2937; }}
+  table {{ border-collapse: collapse; margin-bottom: 2rem; }}
+  th, td {{ border: 1px solid #e5e7eb; padding: 4px 10px; text-align: center; }}
+  thead th {{ background: #f3f4f6; }}
+</style>
+</head>
+<body>
+<h1>Market Structure Scan</h1>
+<p>{meta['symbols']} symbols, generated {esc(meta['generated_at'])} in {meta['elapsed_seconds']}s
+from {esc(meta['data_dir'])}</p>
+<h2>Summary</h2>
+<table><thead><tr><th>Timeframe</th><th>Bull</th><th>Bear</th><th>None</th></tr></thead>
+<tbody>{summary}</tbody></table>
+<h2>Symbols</h2>
+<table><thead><tr><th>Symbol</th>{''.join(f'<th>{esc(tf)}</th>' for tf in timeframes)}</tr></thead>
+<tbody>{''.join(rows)}</tbody></table>
+</body>
+</html>
+"""
+
+
+def write_html_report(report, path):
+    _atomic_write(path, render_html_report(report))
+
+
+def update_dashboard(report):
+    """Print the per-timeframe summary and active retests of a scan report."""
+    for timeframe, counts in report['summary'].items():
+        print(f"{timeframe:>14}: {counts['Bull']:>5} bull {counts['Bear']:>5} bear {counts['none']:>5} none")
+    for r in report['active_retests']:
+        print(f"  retest {r['symbol']} {r['timeframe']} {r['direction']} at {_fmt_price(r['level'])} "
+              f"(close {_fmt_price(r['close'])})")
@@ -1,19 +1,158 @@
-# ...existing code...
+"""
+Load bar data from a local bar store without a terminal connection.
 
-def load_all_timeframes(symbol, timeframes=['M1', 'M5', 'M15', 'H1', 'H4', 'D1']):
-    """Load data for all timeframes."""
+Files are looked up as <data_dir>/<symbol>/<timeframe>.<ext> or
+<data_dir>/<symbol>_<timeframe>.<ext>, with ext one of npy, csv, parquet.
+Timeframes may be given as 'H1' or 'TIMEFRAME_H1'. Every loader returns a
+structured array with the same fields as mt5.copy_rates_from_pos.
+"""
+import csv
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+import numpy as np
+
+try:
+    import pandas as pd
+except ImportError:  # parquet support is optional
+    pd = None
+
+DEFAULT_TIMEFRAMES = ['M1', 'M5', 'M15', 'H1', 'H4', 'D1']
+EXTENSIONS = ('npy', 'csv', 'parquet')
+
+# Same field layout as copy_rates_from_pos
+RATES_DTYPE = np.dtype([
+    ('time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('tick_volume', '<u8'),
+    ('spread', '<i4'),
+    ('real_volume', '<u8'),
+])
+
+
+def short_timeframe(timeframe):
+    return timeframe.replace('TIMEFRAME_', '')
+
+
+def find_timeframe_file(data_dir, symbol, timeframe):
+    tf = short_timeframe(timeframe)
+    for ext in EXTENSIONS:
+        for path in (os.path.join(data_dir, symbol, f"{tf}.{ext}"),
+                     os.path.join(data_dir, f"{symbol}_{tf}.{ext}")):
+            if os.path.exists(path):
+                return path
+    return None
+
+
+def discover_symbols(data_dir):
+    """Symbols with at least one bar file in data_dir."""
+    symbols = set()
+    for entry in os.scandir(data_dir):
+        if entry.is_dir():
+            if any(f.split('.')[-1] in EXTENSIONS for f in os.listdir(entry.path)):
+                symbols.add(entry.name)
+        elif '_' in entry.name and entry.name.rsplit('.', 1)[-1] in EXTENSIONS:
+            symbols.add(entry.name.rsplit('_', 1)[0])
+    return sorted(symbols)
+
+
+def _parse_time(value):
+    try:
+        return int(float(value))
+    except ValueError:
+        return int(datetime.fromisoformat(value).timestamp())
+
+
+def _from_columns(columns, n):
+    rates = np.zeros(n, dtype=RATES_DTYPE)
+    for field in RATES_DTYPE.names:
+        if field in columns:
+            rates[field] = columns[field]
+    return rates
+
+
+def read_csv(path):
+    with open(path, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        fields = [name for name in RATES_DTYPE.names if name in (reader.fieldnames or [])]
+        rows = [[_parse_time(r['time'])] + [float(r[name]) for name in fields[1:]] for r in reader]
+    if not rows:
+        return np.zeros(0, dtype=RATES_DTYPE)
+    data = np.array(rows, dtype=np.float64)
+    return _from_columns({name: data[:, i] for i, name in enumerate(fields)}, len(rows))
+
+
+def read_parquet(path):
+    if pd is None:
+        raise ImportError("pandas (with pyarrow or fastparquet) is required to read parquet files")
+    df = pd.read_parquet(path)
+    if np.issubdtype(df['time'].dtype, np.datetime64):
+        df['time'] = df['time'].astype('int64') // 10**9
+    return _from_columns({c: df[c].to_numpy() for c in df.columns}, len(df))
+
+
+def load_bar_file(path, count=None):
+    """Read one npy/csv/parquet bar file, keeping the newest `count` bars if given."""
+    ext = path.rsplit('.', 1)[-1]
+    if ext == 'npy':
+        # Memory-map so only the requested tail is read from disk
+        rates = np.load(path, mmap_mode='r')
+    elif ext == 'csv':
+        rates = read_csv(path)
+    elif ext == 'parquet':
+        rates = read_parquet(path)
+    else:
+        raise ValueError(f"unsupported bar file type: {path}")
+    if count:
+        rates = rates[-count:]
+    if rates.dtype != RATES_DTYPE:
+        # Structured casts match fields by position, so copy by name instead
+        return _from_columns({name: rates[name] for name in rates.dtype.names}, len(rates))
+    return np.array(rates)
+
+
+def load_timeframe_data(symbol, timeframe, data_dir='data', count=None):
+    """
+    Load bars for one symbol/timeframe, oldest first.
+
+    Args:
+        count (int): Keep only the newest `count` bars
+
+    Raises:
+        FileNotFoundError: No bar file exists for the symbol/timeframe
+    """
+    path = find_timeframe_file(data_dir, symbol, timeframe)
+    if path is None:
+        raise FileNotFoundError(f"no bar file for {symbol} {short_timeframe(timeframe)} in {data_dir}")
+    return load_bar_file(path, count)
+
+
+def load_all_timeframes(symbol, timeframes=DEFAULT_TIMEFRAMES, data_dir='data', count=None, errors=None):
+    """
+    Load data for all timeframes.
+
+    Missing or unreadable timeframes come back as empty arrays. When an
+    `errors` dict is given, the reason is recorded in it under the timeframe.
+    """
     data = {}
-    
+
     for timeframe in timeframes:
         try:
-            data[timeframe] = load_timeframe_data(symbol, timeframe)
-            # Add debug logging
-            print(f"Loaded {len(data[timeframe])} records for {timeframe}")
+            data[timeframe] = load_timeframe_data(symbol, timeframe, data_dir, count)
         except Exception as e:
-            print(f"Error loading {timeframe}: {str(e)}")
+            if errors is not None:
+                errors[timeframe] = str(e)
             # Initialize with empty data rather than omitting
-            data[timeframe] = []
-    
+            data[timeframe] = np.zeros(0, dtype=RATES_DTYPE)
+
     return data
 
-# ...existing code...
+
+def load_universe(symbols, timeframes=DEFAULT_TIMEFRAMES, data_dir='data', count=None, workers=8):
+    """Load several symbols concurrently; returns {symbol: {timeframe: rates}}."""
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        loaded = pool.map(lambda s: load_all_timeframes(s, timeframes, data_dir, count), symbols)
+        return dict(zip(symbols, loaded))
@@ -0,0 +1,246 @@
+"""
+Long-run memory and allocation diagnostics for the bot loop.
+
+When started, tracemalloc traces every allocation. Each bot cycle records
+its net allocated bytes, live block delta and allocation peak. GC callbacks
+time every collection. Every snapshot_interval seconds a tracemalloc
+snapshot is compared with the first one and with the previous one. The top
+growing source lines, RSS and the sizes of registered containers (structure
+maps, caches) are kept as a trend. Growth past growth_alert_mb since
+start prints an alert, once per threshold crossed.
+
+Tracing costs CPU and memory, so it only runs with diagnostics_enabled.
+"""
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import deque
+from contextlib import contextmanager
+
+try:
+    import psutil
+except ImportError:  # RSS comes from /proc or getrusage without it
+    psutil = None
+
+MB = 1024 * 1024
+# Allocations made by the tracer itself or by imports are not leaks
+IGNORED_FILES = (tracemalloc.__file__, '<frozen importlib._bootstrap>', '<frozen importlib._bootstrap_external>',
+                 '<unknown>')
+
+
+def resident_memory():
+    """Resident set size in bytes, or the peak RSS where the current one is unavailable."""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024
+    except ImportError:
+        return 0
+
+
+def format_stat(stat):
+    frame = stat.traceback[0]
+    return {
+        'location': f"{frame.filename}:{frame.lineno}",
+        'size_diff_kb': stat.size_diff / 1024,
+        'size_kb': stat.size / 1024,
+        'count_diff': stat.count_diff,
+        'count': stat.count,
+    }
+
+
+class Diagnostics:
+    """
+    Args:
+        snapshot_interval (float): Seconds between tracemalloc snapshots
+        growth_alert_mb (float): RSS or traced growth since start that raises an alert, and every multiple of it
+        top (int): Source lines kept per growth diff
+        frames (int): Stack frames stored per traced allocation
+        history (int): Cycles, GC pauses and trend samples kept
+    """
+
+    def __init__(self, snapshot_interval=600.0, growth_alert_mb=50.0, top=20, frames=1, history=500):
+        self.snapshot_interval = snapshot_interval
+        self.growth_alert_mb = growth_alert_mb
+        self.top = top
+        self.frames = frames
+        self.enabled = False
+        self.started_at = None
+        self.gauges = {}
+        self.cycles = deque(maxlen=history)
+        self.gc_pauses = deque(maxlen=history)
+        self.gc_totals = {gen: {'collections': 0, 'pause_ms': 0.0, 'max_pause_ms': 0.0, 'collected': 0}
+                          for gen in range(3)}
+        self.trend = deque(maxlen=history)
+        self.alerts = deque(maxlen=100)
+        self.growth_since_start = []
+        self.growth_since_last = []
+        self._baseline = None
+        self._previous = None
+        self._base_rss = 0
+        self._base_traced = 0
+        self._alert_level = 0
+        self._last_snapshot = 0.0
+        self._gc_start = None
+        self._lock = threading.Lock()
+
+    def watch(self, name, size_fn):
+        """Record size_fn() (e.g. a dict's len) with every trend sample."""
+        self.gauges[name] = size_fn
+
+    def start(self):
+        if self.enabled:
+            return
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+        gc.callbacks.append(self._on_gc)
+        self.enabled = True
+        self.started_at = time.time()
+        self._base_rss = resident_memory()
+        self._base_traced = tracemalloc.get_traced_memory()[0]
+        self._baseline = self._previous = self._take()
+        self._last_snapshot = time.monotonic()
+        self._sample()
+        print(f"Diagnostics started: snapshots every {self.snapshot_interval:.0f}s, "
+              f"alert every {self.growth_alert_mb:.0f}MB of growth")
+
+    def stop(self):
+        if not self.enabled:
+            return
+        self.enabled = False
+        if self._on_gc in gc.callbacks:
+            gc.callbacks.remove(self._on_gc)
+        tracemalloc.stop()
+        self._baseline = self._previous = None
+
+    def _on_gc(self, phase, info):
+        if phase == 'start':
+            self._gc_start = time.perf_counter()
+            return
+        if self._gc_start is None:
+            return
+        pause = (time.perf_counter() - self._gc_start) * 1000
+        self._gc_start = None
+        totals = self.gc_totals[info['generation']]
+        totals['collections'] += 1
+        totals['pause_ms'] += pause
+        totals['max_pause_ms'] = max(totals['max_pause_ms'], pause)
+        totals['collected'] += info['collected']
+        self.gc_pauses.append((time.time(), info['generation'], pause))
+
+    @contextmanager
+    def cycle(self):
+        """Measure allocations of one bot cycle; a no-op unless started."""
+        if not self.enabled:
+            yield
+            return
+        tracemalloc.reset_peak()
+        traced_before = tracemalloc.get_traced_memory()[0]
+        blocks_before = sys.getallocatedblocks()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            traced, peak = tracemalloc.get_traced_memory()
+            self.cycles.append({
+                'time': time.time(),
+                'elapsed_ms': (time.perf_counter() - start) * 1000,
+                'net_kb': (traced - traced_before) / 1024,
+                'peak_kb': (peak - traced_before) / 1024,
+                'blocks': sys.getallocatedblocks() - blocks_before,
+            })
+
+    def _take(self):
+        return tracemalloc.take_snapshot().filter_traces(
+            [tracemalloc.Filter(False, name) for name in IGNORED_FILES])
+
+    def _sample(self):
+        traced, peak = tracemalloc.get_traced_memory()
+        sample = {'time': time.time(), 'rss_mb': resident_memory() / MB, 'traced_mb': traced / MB,
+                  'traced_peak_mb': peak / MB}
+        for name, size_fn in self.gauges.items():
+            try:
+                sample[name] = size_fn()
+            except Exception as e:
+                sample[name] = f"error: {e}"
+        self.trend.append(sample)
+        return sample
+
+    def maybe_snapshot(self, force=False):
+        """Take a snapshot if snapshot_interval has passed; returns True if one was taken."""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        if not force and now - self._last_snapshot < self.snapshot_interval:
+            return False
+        with self._lock:
+            self._last_snapshot = now
+            snapshot = self._take()
+            self.growth_since_start = [format_stat(s) for s in snapshot.compare_to(self._baseline, 'lineno')[:self.top]]
+            self.growth_since_last = [format_stat(s) for s in snapshot.compare_to(self._previous, 'lineno')[:self.top]]
+            self._previous = snapshot
+            sample = self._sample()
+            self._check_growth(sample)
+        return True
+
+    def _check_growth(self, sample):
+        if self.growth_alert_mb <= 0:
+            return
+        rss_growth = sample['rss_mb'] - self._base_rss / MB
+        traced_growth = sample['traced_mb'] - self._base_traced / MB
+        growth = max(rss_growth, traced_growth)
+        level = int(growth // self.growth_alert_mb)
+        if level <= self._alert_level:
+            return
+        self._alert_level = level
+        top = self.growth_since_start[0]['location'] if self.growth_since_start else 'unknown'
+        alert = {
+            'time': sample['time'],
+            'rss_growth_mb': rss_growth,
+            'traced_growth_mb': traced_growth,
+            'top_growth': top,
+            'gauges': {name: sample[name] for name in self.gauges},
+        }
+        self.alerts.append(alert)
+        print(f"Memory growth alert: RSS +{rss_growth:.1f}MB, traced +{traced_growth:.1f}MB since "
+              f"diagnostics started; largest growth at {top}")
+
+    def report(self):
+        if not self.enabled:
+            return {'enabled': False}
+        cycles = list(self.cycles)
+        net = [c['net_kb'] for c in cycles]
+        pauses = [p for _, _, p in self.gc_pauses]
+        with self._lock:
+            return {
+                'enabled': True,
+                'uptime_s': time.time() - self.started_at,
+                'snapshot_interval_s': self.snapshot_interval,
+                'cycles': {
+                    'count': len(cycles),
+                    'mean_net_kb': sum(net) / len(net) if net else 0.0,
+                    'max_peak_kb': max((c['peak_kb'] for c in cycles), default=0.0),
+                    'mean_blocks': sum(c['blocks'] for c in cycles) / len(cycles) if cycles else 0.0,
+                    'recent': cycles[-10:],
+                },
+                'gc': {
+                    'generations': self.gc_totals,
+                    'recent_max_pause_ms': max(pauses, default=0.0),
+                    'recent_mean_pause_ms': sum(pauses) / len(pauses) if pauses else 0.0,
+                    'counts': gc.get_count(),
+                },
+                'trend': list(self.trend),
+                'growth_since_start': self.growth_since_start,
+                'growth_since_last': self.growth_since_last,
+                'alerts': list(self.alerts),
+            }
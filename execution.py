@@ -0,0 +1,128 @@
+import time
+import MetaTrader5 as mt5
+
+# Return codes where resending at a fresh price usually succeeds
+RETRY_RETCODES = {
+    mt5.TRADE_RETCODE_REQUOTE,
+    mt5.TRADE_RETCODE_PRICE_CHANGED,
+    mt5.TRADE_RETCODE_PRICE_OFF,
+}
+FILLED_RETCODES = {mt5.TRADE_RETCODE_DONE, mt5.TRADE_RETCODE_DONE_PARTIAL}
+# Filling modes tried in order when the broker rejects the current one
+FILLING_MODES = [mt5.ORDER_FILLING_FOK, mt5.ORDER_FILLING_IOC, mt5.ORDER_FILLING_RETURN]
+
+
+# Outcome of one submitted order, including every retry
+class Fill:
+    __slots__ = ('request', 'result', 'attempts', 'latency_ms', 'slippage', 'error')
+
+    def __init__(self, request):
+        self.request = request
+        self.result = None
+        self.attempts = 0
+        self.latency_ms = 0.0   # submit -> final response, all attempts included
+        self.slippage = 0.0     # fill vs first requested price, positive means a worse fill
+        self.error = None
+
+    @property
+    def filled(self):
+        return self.result is not None and self.result.retcode in FILLED_RETCODES
+
+    @property
+    def order(self):
+        return self.result.order if self.filled else 0
+
+    @property
+    def volume(self):
+        return self.result.volume if self.filled else 0.0
+
+    @property
+    def price(self):
+        return self.result.price if self.filled and self.result.price else self.request.get('price')
+
+
+class ExecutionEngine:
+    """
+    Sends orders with a bounded retry policy and records fill latency and slippage.
+
+    Requotes and price changes are resent at the current tick price. An
+    unsupported filling mode falls through FILLING_MODES. Any other rejection
+    is returned to the caller right away.
+
+    Args:
+        max_attempts (int): Max order_send calls per order
+        retry_delay (float): Seconds to wait between attempts
+    """
+
+    def __init__(self, max_attempts=3, retry_delay=0.05):
+        self.max_attempts = max_attempts
+        self.retry_delay = retry_delay
+        self.stats = {'orders': 0, 'filled': 0, 'retries': 0, 'rejected': 0, 'latency_ms_total': 0.0}
+
+    def send(self, request):
+        fill = Fill(dict(request))
+        req = fill.request
+        filling = req.get('type_filling', FILLING_MODES[0])
+        fill_modes = [filling] + [m for m in FILLING_MODES if m != filling]
+        requested_price = req.get('price')
+        start = time.perf_counter()
+
+        while fill.attempts < self.max_attempts:
+            fill.attempts += 1
+            try:
+                result = mt5.order_send(req)
+            except Exception as e:
+                fill.error = str(e)
+                break
+            fill.result = result
+            if result is None:
+                fill.error = f"order_send returned None: {mt5.last_error()}"
+                break
+            if result.retcode in FILLED_RETCODES:
+                break
+            if result.retcode in RETRY_RETCODES and 'price' in req:
+                tick = mt5.symbol_info_tick(req['symbol'])
+                if tick:
+                    req['price'] = tick.ask if req['type'] == mt5.ORDER_TYPE_BUY else tick.bid
+            elif result.retcode == mt5.TRADE_RETCODE_INVALID_FILL and len(fill_modes) > 1:
+                fill_modes.pop(0)
+                req['type_filling'] = fill_modes[0]
+            else:
+                fill.error = f"{result.retcode}, {result.comment}"
+                break
+            self.stats['retries'] += 1
+            if fill.attempts < self.max_attempts:
+                time.sleep(self.retry_delay)
+
+        fill.latency_ms = (time.perf_counter() - start) * 1000
+        if fill.filled and requested_price and fill.result.price:
+            diff = fill.result.price - requested_price
+            fill.slippage = diff if req['type'] == mt5.ORDER_TYPE_BUY else -diff
+        elif not fill.filled and fill.error is None and fill.result is not None:
+            fill.error = f"{fill.result.retcode}, {fill.result.comment}"
+
+        self.stats['orders'] += 1
+        self.stats['latency_ms_total'] += fill.latency_ms
+        if fill.filled:
+            self.stats['filled'] += 1
+        else:
+            self.stats['rejected'] += 1
+        return fill
+
+    def submit(self, requests):
+        """
+        Send a group of prebuilt orders back to back.
+
+        The first request is the parent leg: if it does not fill, the rest are
+        not sent, so a scale-out leg never opens without its main position.
+
+        Returns:
+            list: One Fill per request that was sent
+        """
+        fills = []
+        for i, request in enumerate(requests):
+            fill = self.send(request)
+            fills.append(fill)
+            if i == 0 and not fill.filled:
+                break
+        return fills
@@ -0,0 +1,336 @@
+"""
+In-process stand-in for the MetaTrader5 module.
+
+Implements the subset of the MT5 API used by bot.py and app.py on top of
+generated or recorded bars, so benchmarks and load tests run without a
+terminal. Call install() before importing bot or app:
+
+    import fake_broker
+    fake_broker.install()
+    import bot
+"""
+import sys
+import threading
+import time
+import zlib
+from datetime import datetime
+from types import SimpleNamespace
+import numpy as np
+from data_loader import RATES_DTYPE
+from synthetic import SyntheticMarket
+
+# Constants, with the values used by the real terminal
+TIMEFRAME_M1 = 1
+TIMEFRAME_M5 = 5
+TIMEFRAME_M15 = 15
+TIMEFRAME_M30 = 30
+TIMEFRAME_H1 = 16385
+TIMEFRAME_H4 = 16388
+TIMEFRAME_D1 = 16408
+TIMEFRAME_MN1 = 49153
+
+POSITION_TYPE_BUY = 0
+POSITION_TYPE_SELL = 1
+ORDER_TYPE_BUY = 0
+ORDER_TYPE_SELL = 1
+DEAL_TYPE_BUY = 0
+DEAL_TYPE_SELL = 1
+DEAL_ENTRY_IN = 0
+DEAL_ENTRY_OUT = 1
+
+TRADE_ACTION_DEAL = 1
+TRADE_ACTION_SLTP = 6
+ORDER_FILLING_FOK = 0
+ORDER_FILLING_IOC = 1
+ORDER_FILLING_RETURN = 2
+
+TRADE_RETCODE_REQUOTE = 10004
+TRADE_RETCODE_REJECT = 10006
+TRADE_RETCODE_DONE = 10009
+TRADE_RETCODE_DONE_PARTIAL = 10010
+TRADE_RETCODE_INVALID_VOLUME = 10014
+TRADE_RETCODE_PRICE_CHANGED = 10020
+TRADE_RETCODE_PRICE_OFF = 10021
+TRADE_RETCODE_INVALID_FILL = 10030
+
+COPY_TICKS_ALL = -1
+COPY_TICKS_INFO = 1
+COPY_TICKS_TRADE = 2
+
+# Layout of the arrays returned by copy_ticks_from
+TICK_DTYPE = np.dtype([('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+                       ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')])
+
+TIMEFRAME_SECONDS = {
+    TIMEFRAME_M1: 60,
+    TIMEFRAME_M5: 300,
+    TIMEFRAME_M15: 900,
+    TIMEFRAME_M30: 1800,
+    TIMEFRAME_H1: 3600,
+    TIMEFRAME_H4: 14400,
+    TIMEFRAME_D1: 86400,
+    TIMEFRAME_MN1: 2592000,
+}
+
+
+_lock = threading.RLock()
+_state = {
+    'connected': False,
+    'down': False,        # simulate an unreachable terminal
+    'latency': 0.0,       # seconds added to every terminal call
+    'seed': 7,
+    'history_size': 5000,
+    'market': {'gap_rate': 0.0005, 'break_every': 300},  # SyntheticMarket arguments of generated series
+    'bars': {},           # (symbol, timeframe) -> rates array
+    'positions': {},      # ticket -> position namespace
+    'deals': [],
+    'next_ticket': 1000,
+    'balance': 10000.0,
+    'last_error': (1, 'Success'),
+}
+
+
+def _delay():
+    if _state['latency']:
+        time.sleep(_state['latency'])
+
+
+def configure(latency=None, seed=None, history_size=None, balance=None, down=None, market=None):
+    """Set simulated terminal latency (seconds), RNG seed, bars per series, balance, outage and generator arguments."""
+    with _lock:
+        if market is not None:
+            _state['market'] = dict(market)
+            _state['bars'].clear()
+        if down is not None:
+            _state['down'] = down
+            if down:
+                _state['connected'] = False
+        if latency is not None:
+            _state['latency'] = latency
+        if seed is not None:
+            _state['seed'] = seed
+            _state['bars'].clear()
+        if history_size is not None:
+            _state['history_size'] = history_size
+            _state['bars'].clear()
+        if balance is not None:
+            _state['balance'] = balance
+
+
+def reset():
+    with _lock:
+        _state['bars'].clear()
+        _state['positions'].clear()
+        _state['deals'].clear()
+        _state['next_ticket'] = 1000
+
+
+def install():
+    """Register this module as MetaTrader5 so later imports pick it up."""
+    sys.modules['MetaTrader5'] = sys.modules[__name__]
+    return sys.modules[__name__]
+
+
+# Synthetic bars with regimes, gaps and planted breaks; deterministic per (symbol, timeframe)
+def generate_bars(count, timeframe=TIMEFRAME_M1, start_price=100.0, seed=0, end_time=None):
+    step = TIMEFRAME_SECONDS.get(timeframe, 60)
+    end_time = end_time or (int(time.time()) // step * step)
+    market = SyntheticMarket(step, start_price, end_time - step * (count - 1), seed=seed, **_state['market'])
+    return market.generate(count).rates
+
+
+def load_bars(symbol, timeframe, rates):
+    """Serve recorded bars (a rates array or a path to a .npy file) for a symbol/timeframe."""
+    if isinstance(rates, str):
+        rates = np.load(rates)
+    with _lock:
+        _state['bars'][(symbol, timeframe)] = np.asarray(rates, dtype=RATES_DTYPE)
+
+
+def _series(symbol, timeframe):
+    key = (symbol, timeframe)
+    series = _state['bars'].get(key)
+    if series is None:
+        with _lock:
+            series = _state['bars'].get(key)
+            if series is None:
+                seed = zlib.crc32(f"{symbol}:{timeframe}:{_state['seed']}".encode())
+                series = generate_bars(_state['history_size'], timeframe, seed=seed)
+                _state['bars'][key] = series
+    return series
+
+
+# Terminal lifecycle
+def initialize(*args, **kwargs):
+    _delay()
+    if _state['down']:
+        _state['last_error'] = (-10004, 'No IPC connection')
+        return False
+    _state['connected'] = True
+    _state['last_error'] = (1, 'Success')
+    return True
+
+
+def login(*args, **kwargs):
+    _delay()
+    return True
+
+
+def shutdown():
+    _state['connected'] = False
+
+
+def last_error():
+    return _state['last_error']
+
+
+def terminal_info():
+    _delay()
+    if _state['down'] or not _state['connected']:
+        return None
+    return SimpleNamespace(connected=True, trade_allowed=True, name='fake terminal', build=0)
+
+
+def symbol_select(symbol, enable=True):
+    _delay()
+    return True
+
+
+def symbol_info(symbol):
+    _delay()
+    return SimpleNamespace(
+        name=symbol,
+        digits=2,
+        point=0.01,
+        trade_contract_size=1.0,
+        trade_tick_size=0.01,
+        trade_tick_value=0.01,
+        volume_min=0.01,
+        volume_max=100.0,
+        volume_step=0.01,
+        trade_stops_level=0,
+        spread=10,
+    )
+
+
+def symbol_info_tick(symbol):
+    _delay()
+    if _state['down']:
+        return None
+    rates = _series(symbol, TIMEFRAME_M1)
+    last = float(rates['close'][-1])
+    return SimpleNamespace(time=int(rates['time'][-1]), bid=last, ask=last + 0.1, last=last,
+                           time_msc=int(rates['time'][-1]) * 1000, volume=0)
+
+
+def copy_rates_from_pos(symbol, timeframe, start_pos, count):
+    _delay()
+    rates = _series(symbol, timeframe)
+    end = len(rates) - start_pos
+    if end <= 0:
+        return None
+    return rates[max(0, end - count):end].copy()
+
+
+def copy_ticks_from(symbol, date_from, count, flags=COPY_TICKS_ALL, rate=10):
+    """
+    Ticks from date_from (datetime or epoch seconds) up to now, `rate` per second.
+
+    Prices walk around the last M1 close, deterministic per (symbol, second).
+    """
+    _delay()
+    if _state['down']:
+        return None
+    if isinstance(date_from, datetime):
+        date_from = date_from.timestamp()
+    now_ms = int(time.time() * 1000)
+    start_ms = max(int(date_from * 1000), now_ms - 600000)
+    step = 1000 // rate
+    times = np.arange(start_ms - start_ms % step + step, now_ms + 1, step, dtype=np.int64)[:count]
+    anchor = float(_series(symbol, TIMEFRAME_M1)['close'][-1])
+    seconds = times // 1000
+    noise = np.empty(len(times))
+    for second in np.unique(seconds):
+        mask = seconds == second
+        rng = np.random.default_rng(zlib.crc32(f"{symbol}:{second}:{_state['seed']}".encode()))
+        noise[mask] = rng.normal(0, anchor * 0.0005, mask.sum())
+    ticks = np.zeros(len(times), dtype=TICK_DTYPE)
+    ticks['time'] = seconds
+    ticks['time_msc'] = times
+    ticks['bid'] = np.round(anchor + noise, 2)
+    ticks['ask'] = ticks['bid'] + 0.1
+    ticks['flags'] = 6  # TICK_FLAG_BID | TICK_FLAG_ASK
+    return ticks
+
+
+# Account and trading
+def account_info():
+    _delay()
+    with _lock:
+        floating = 0.0
+        for p in _state['positions'].values():
+            floating += p.profit
+        balance = _state['balance']
+    return SimpleNamespace(balance=balance, equity=balance + floating, margin=0.0,
+                           margin_free=balance + floating, login=1, currency='USD')
+
+
+def positions_get(symbol=None, magic=None, **kwargs):
+    _delay()
+    with _lock:
+        return tuple(p for p in _state['positions'].values()
+                     if (symbol is None or p.symbol == symbol) and (magic is None or p.magic == magic))
+
+
+def history_deals_get(date_from=None, date_to=None, **kwargs):
+    _delay()
+    t_from = date_from.timestamp() if isinstance(date_from, datetime) else (date_from or 0)
+    t_to = date_to.timestamp() if isinstance(date_to, datetime) else (date_to or float('inf'))
+    with _lock:
+        return tuple(d for d in _state['deals'] if t_from <= d.time <= t_to)
+
+
+def _result(retcode, request, order=0, price=0.0):
+    return SimpleNamespace(retcode=retcode, order=order, deal=order, volume=request.get('volume', 0.0),
+                           price=price, comment='done' if retcode == TRADE_RETCODE_DONE else 'rejected',
+                           request=request)
+
+
+def order_send(request):
+    _delay()
+    action = request.get('action')
+    with _lock:
+        if action == TRADE_ACTION_SLTP:
+            p = _state['positions'].get(request.get('position'))
+            if p is None:
+                return _result(TRADE_RETCODE_REJECT, request)
+            p.sl = request.get('sl', p.sl)
+            p.tp = request.get('tp', p.tp)
+            return _result(TRADE_RETCODE_DONE, request, p.ticket)
+
+        if action != TRADE_ACTION_DEAL or request.get('volume', 0) <= 0:
+            return _result(TRADE_RETCODE_INVALID_VOLUME, request)
+
+        ticket = _state['next_ticket']
+        _state['next_ticket'] += 1
+        price = request.get('price', 0.0)
+        now = int(time.time())
+        closing = _state['positions'].get(request.get('position'))
+        if closing is not None:
+            closing.volume = round(closing.volume - request['volume'], 2)
+            if closing.volume <= 0:
+                del _state['positions'][closing.ticket]
+            entry = DEAL_ENTRY_OUT
+        else:
+            _state['positions'][ticket] = SimpleNamespace(
+                ticket=ticket, symbol=request['symbol'], magic=request.get('magic', 0),
+                type=POSITION_TYPE_BUY if request['type'] == ORDER_TYPE_BUY else POSITION_TYPE_SELL,
+                volume=request['volume'], price_open=price, sl=request.get('sl', 0.0),
+                tp=request.get('tp', 0.0), profit=0.0, time=now)
+            entry = DEAL_ENTRY_IN
+        _state['deals'].append(SimpleNamespace(
+            ticket=ticket, order=ticket, position_id=closing.ticket if closing else ticket,
+            symbol=request['symbol'], magic=request.get('magic', 0), type=request['type'],
+            entry=entry, volume=request['volume'], price=price, profit=0.0, time=now,
+            comment=request.get('comment', '')))
+        return _result(TRADE_RETCODE_DONE, request, ticket, price)
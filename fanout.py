@@ -0,0 +1,199 @@
+"""
+One signal engine feeding several account executors.
+
+The MetaTrader5 package talks to a single terminal per process, so every
+account gets its own executor process with its own terminal, magic, risk
+limits and journal. Market data and structure analysis run once per cycle
+in the engine process, and so do the strategy plugins. The signals are
+pickled once and sent to every executor, which only routes orders, so
+analysis cost does not grow with the number of accounts.
+"""
+import multiprocessing as mp
+import pickle
+import queue
+import time
+from datetime import datetime
+
+
+# Everything an executor needs from one engine cycle
+def build_signal(cycle, dir_map, pivot_map, signals, structures, bar_times):
+    # Pivots and bars only for timeframes some strategy signalled on
+    active = {s.timeframe: pivot_map[s.timeframe] for s in signals if s.timeframe in pivot_map}
+    return pickle.dumps({
+        'cycle': cycle,
+        'created_at': time.time(),
+        'dir_map': dir_map,
+        'pivot_map': active,
+        'signals': signals,
+        'structures': {name: structures[name] for name in active if name in structures},
+        'bar_times': dict(bar_times),
+    }, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+# Executor process: trade one account from the engine's signals
+def executor_main(account, inbox, outbox, stop_event, max_signal_age):
+    import bot
+
+    name = account['name']
+    bot.configure_account(account)
+    if not bot.broker_session.ensure():
+        outbox.put({'account': name, 'error': f'MT5 initialization failed: {bot.broker_session.last_error}'})
+        return
+
+    symbol_info = bot.symbol_registry.get(bot.SYMBOL)
+    triggered_timeframes = bot.restore_checkpoint(symbol_info)
+    last_day = datetime.now().day
+    print(f"[{name}] executor started, magic {bot.MAGIC}, max positions {bot.MAX_POS}")
+
+    while not stop_event.is_set():
+        try:
+            payload = inbox.get(timeout=1.0)
+        except queue.Empty:
+            continue
+
+        try:
+            signal = pickle.loads(payload)
+            current_day = datetime.now().day
+            if current_day != last_day:
+                triggered_timeframes = {}
+                last_day = current_day
+
+            # A signal that waited too long in the queue is only used to manage positions
+            age = time.time() - signal['created_at']
+            dir_map, pivot_map, signals = signal['dir_map'], signal['pivot_map'], signal['signals']
+            if age > max_signal_age:
+                print(f"[{name}] signal from cycle {signal['cycle']} is {age:.1f}s old, not entering")
+                dir_map, pivot_map, signals = {}, {}, []
+
+            bot.market_structures.update(signal['structures'])
+            bot.last_bar_times.update(signal['bar_times'])
+            start = time.perf_counter()
+            symbol_info = bot.symbol_registry.get(bot.SYMBOL) or symbol_info
+            ok = bot.run_cycle(symbol_info, triggered_timeframes, (dir_map, pivot_map, signals))
+            outbox.put({
+                'account': name,
+                'cycle': signal['cycle'],
+                'trading': ok,
+                'positions': len(bot.risk_engine.positions),
+                'equity': bot.risk_engine.equity,
+                'daily_loss_pct': bot.risk_engine.daily_loss_pct(),
+                'elapsed_ms': (time.perf_counter() - start) * 1000,
+            })
+        except Exception as e:
+            print(f"[{name}] error in executor cycle: {e}")
+            outbox.put({'account': name, 'error': str(e)})
+
+    bot.broker_session.shutdown()
+    print(f"[{name}] executor stopped")
+
+
+class AccountExecutor:
+    """
+    Handle on one executor process.
+
+    Args:
+        account (dict): Entry of the 'accounts' config list; 'name' is required
+        context: multiprocessing context used to start the process
+    """
+
+    def __init__(self, account, outbox, stop_event, context, max_signal_age):
+        self.account = account
+        self.name = account['name']
+        self.outbox = outbox
+        self.stop_event = stop_event
+        self.context = context
+        self.max_signal_age = max_signal_age
+        self.inbox = None
+        self.process = None
+        self.restarts = 0
+
+    def start(self):
+        self.inbox = self.context.Queue()
+        self.process = self.context.Process(
+            target=executor_main, name=f'executor-{self.name}', daemon=True,
+            args=(self.account, self.inbox, self.outbox, self.stop_event, self.max_signal_age))
+        self.process.start()
+
+    def alive(self):
+        return self.process is not None and self.process.is_alive()
+
+    def send(self, payload):
+        if not self.alive():
+            print(f"[{self.name}] executor exited with code {self.process.exitcode}, restarting")
+            self.restarts += 1
+            self.start()
+        self.inbox.put(payload)
+
+    def join(self, timeout):
+        if self.process is None:
+            return
+        self.process.join(timeout)
+        if self.process.is_alive():
+            self.process.terminate()
+
+
+# Engine loop: analyze once per cycle and fan the result out to every account
+def run(stop_event, accounts, context=None):
+    import bot
+
+    if not bot.broker_session.ensure():
+        print(f"MT5 initialization failed: {bot.broker_session.last_error}")
+        return
+
+    context = context or mp.get_context('spawn')
+    worker_stop = context.Event()
+    outbox = context.Queue()
+    # Signals older than one update interval are stale by the time they are read
+    max_signal_age = float(bot.config.get('max_signal_age', bot.UPDATE_INTERVAL))
+    executors = [AccountExecutor(account, outbox, worker_stop, context, max_signal_age) for account in accounts]
+    for executor in executors:
+        executor.start()
+
+    symbol_info = bot.symbol_registry.get(bot.SYMBOL)
+    bot.restore_checkpoint(symbol_info)
+    status = {}
+    cycle = 0
+    print(f"Signal engine started for {bot.SYMBOL} with {len(executors)} accounts: "
+          f"{', '.join(e.name for e in executors)}")
+
+    while not stop_event.is_set():
+        try:
+            cycle += 1
+            start = time.perf_counter()
+            if not bot.broker_session.ensure():
+                stop_event.wait(bot.UPDATE_INTERVAL)
+                continue
+            symbol_info = bot.symbol_registry.get(bot.SYMBOL) or symbol_info
+            bot.cycle_scheduler.begin()
+            try:
+                dir_map, pivot_map = bot.analyze_timeframes(symbol_info)
+            finally:
+                bot.cycle_scheduler.end(bot.UPDATE_INTERVAL)
+            signals = bot.strategy_engine.evaluate(bot.strategy_context(symbol_info, dir_map, pivot_map))
+            bot.save_checkpoint({})
+            payload = build_signal(cycle, dir_map, pivot_map, signals, bot.market_structures, bot.last_bar_times)
+            for executor in executors:
+                executor.send(payload)
+            elapsed = (time.perf_counter() - start) * 1000
+
+            # Reports from the previous cycle
+            while True:
+                try:
+                    report = outbox.get_nowait()
+                except queue.Empty:
+                    break
+                status[report['account']] = report
+                if 'error' in report:
+                    print(f"[{report['account']}] {report['error']}")
+            summary = ', '.join(f"{n}: {r.get('positions', '?')} pos" for n, r in sorted(status.items()))
+            print(f"Cycle {cycle}: analysis {elapsed:.1f}ms, {summary}")
+        except Exception as e:
+            print(f"Error in signal engine loop: {e}")
+
+        stop_event.wait(bot.UPDATE_INTERVAL)
+
+    worker_stop.set()
+    for executor in executors:
+        executor.join(5.0)
+    print(f"Signal engine stopped at {datetime.now()}")
+    bot.broker_session.shutdown()
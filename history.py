@@ -0,0 +1,190 @@
+"""
+Local deal history store.
+
+Deals are copied from the terminal into SQLite once and queried from there.
+Each sync only asks the terminal for deals newer than the last one stored.
+Pages use a (time, ticket) keyset cursor on an index instead of OFFSET, so a
+page costs the same on the first or the ten-thousandth page.
+"""
+import datetime
+import sqlite3
+import threading
+import time
+import MetaTrader5 as mt5
+
+DEAL_FIELDS = ('ticket', 'time', 'position_id', 'symbol', 'type', 'entry', 'volume', 'price',
+               'profit', 'commission', 'swap', 'magic', 'comment')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS deals (
+    ticket      INTEGER PRIMARY KEY,
+    time        INTEGER NOT NULL,
+    position_id INTEGER,
+    symbol      TEXT,
+    type        INTEGER,
+    entry       INTEGER,
+    volume      REAL,
+    price       REAL,
+    profit      REAL,
+    commission  REAL,
+    swap        REAL,
+    magic       INTEGER,
+    comment     TEXT
+);
+CREATE INDEX IF NOT EXISTS deals_time ON deals (time, ticket);
+CREATE INDEX IF NOT EXISTS deals_magic_time ON deals (magic, time, ticket);
+CREATE INDEX IF NOT EXISTS deals_position ON deals (position_id, entry);
+"""
+
+# Deals are re-fetched from slightly before the newest stored one; duplicates are ignored
+SYNC_OVERLAP = 60
+
+MAX_PAGE = 500
+
+
+def encode_cursor(row):
+    return f"{row['time']}:{row['ticket']}"
+
+
+def decode_cursor(cursor):
+    """
+    Returns:
+        tuple: (time, ticket), or None for an empty or malformed cursor
+    """
+    try:
+        t, ticket = cursor.split(':')
+        return int(t), int(ticket)
+    except (AttributeError, ValueError):
+        return None
+
+
+class HistoryStore:
+    """
+    Args:
+        path (str): SQLite database file
+        initial_days (int): How far back the first sync reaches
+        min_sync_interval (float): Seconds between terminal queries; sync() is a no-op in between
+        session (BrokerSession): Shared terminal session; mt5.initialize() is used without one
+    """
+
+    def __init__(self, path, initial_days=365, min_sync_interval=5.0, session=None):
+        self.path = path
+        self.session = session
+        self.initial_days = initial_days
+        self.min_sync_interval = min_sync_interval
+        self.last_sync = 0.0
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _db(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.row_factory = sqlite3.Row
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def newest_time(self):
+        with self._lock:
+            row = self._db().execute('SELECT MAX(time) FROM deals').fetchone()
+        return row[0]
+
+    def sync(self, force=False):
+        """
+        Copy deals the store has not seen yet from the terminal.
+
+        Returns:
+            int: Number of new deals stored
+        """
+        now = time.time()
+        if not force and now - self.last_sync < self.min_sync_interval:
+            return 0
+        if not (self.session.ensure() if self.session is not None else mt5.initialize()):
+            return 0
+        newest = self.newest_time()
+        if newest is None:
+            date_from = datetime.datetime.now() - datetime.timedelta(days=self.initial_days)
+        else:
+            date_from = datetime.datetime.fromtimestamp(newest - SYNC_OVERLAP)
+        # Server time can run ahead of local time
+        date_to = datetime.datetime.now() + datetime.timedelta(days=1)
+        deals = mt5.history_deals_get(date_from, date_to)
+        if deals is None:
+            print(f"Failed to get deal history: {mt5.last_error()}")
+            return 0
+        rows = [tuple(getattr(d, f, None) for f in DEAL_FIELDS) for d in deals]
+        with self._lock:
+            db = self._db()
+            before = db.total_changes
+            with db:
+                db.executemany(f"INSERT OR IGNORE INTO deals ({', '.join(DEAL_FIELDS)}) "
+                               f"VALUES ({', '.join('?' * len(DEAL_FIELDS))})", rows)
+            added = db.total_changes - before
+        self.last_sync = now
+        return added
+
+    def page(self, magic=None, date_from=None, date_to=None, cursor=None, limit=50):
+        """
+        One page of deals, newest first.
+
+        Closing deals carry the opening deal's price as price_open.
+
+        Args:
+            date_from, date_to (int): Inclusive epoch-second bounds
+            cursor (str): next_cursor of the previous page
+
+        Returns:
+            dict: {'deals': [...], 'next_cursor': str or None}
+        """
+        limit = max(1, min(int(limit), MAX_PAGE))
+        where, args = [], []
+        if magic is not None:
+            where.append('d.magic = ?')
+            args.append(magic)
+        if date_from is not None:
+            where.append('d.time >= ?')
+            args.append(int(date_from))
+        if date_to is not None:
+            where.append('d.time <= ?')
+            args.append(int(date_to))
+        key = decode_cursor(cursor)
+        if key is not None:
+            # Row-value comparison lets SQLite seek the (magic, time, ticket) index
+            where.append('(d.time, d.ticket) < (?, ?)')
+            args.extend(key)
+        sql = ("SELECT d.*, (SELECT o.price FROM deals o WHERE o.position_id = d.position_id "
+               "AND o.entry = ? AND o.ticket != d.ticket ORDER BY o.time LIMIT 1) AS open_price FROM deals d "
+               f"{'WHERE ' + ' AND '.join(where) if where else ''} "
+               "ORDER BY d.time DESC, d.ticket DESC LIMIT ?")
+        with self._lock:
+            rows = self._db().execute(sql, [mt5.DEAL_ENTRY_IN] + args + [limit + 1]).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'deals': [format_deal(r) for r in rows],
+            'next_cursor': encode_cursor(rows[-1]) if more else None,
+        }
+
+    def closes_since(self, magic, since):
+        """Closing deals with time >= since, oldest first."""
+        with self._lock:
+            rows = self._db().execute(
+                'SELECT * FROM deals WHERE magic = ? AND time >= ? AND entry = ? ORDER BY time, ticket',
+                (magic, int(since), mt5.DEAL_ENTRY_OUT)).fetchall()
+        return [dict(r) for r in rows]
+
+
+# Deal row in the shape the history table renders
+def format_deal(row):
+    deal = dict(row)
+    open_price = deal.pop('open_price', None)
+    deal['type'] = 'BUY' if row['type'] == mt5.DEAL_TYPE_BUY else 'SELL'
+    deal['price_open'] = open_price if open_price is not None else row['price']
+    deal['price_close'] = row['price']
+    return deal
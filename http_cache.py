@@ -0,0 +1,137 @@
+"""
+Conditional GET, compression and fingerprinted static URLs for the dashboard.
+
+- JSON responses to GET get a content-hash ETag and Cache-Control: no-cache.
+  A poll whose payload has not changed is answered with an empty 304.
+- Text responses (JSON, JS, CSS, HTML) are compressed with brotli when the
+  package is installed and the client accepts it, otherwise with gzip. The
+  compressed body is cached per ETag, so unchanged content is compressed once.
+- url_for('static', ...) appends ?v=<content hash>. Requests carrying the
+  current hash are served with a one-year immutable Cache-Control; a changed
+  file gets a new URL.
+"""
+import gzip
+import hashlib
+import os
+from collections import OrderedDict
+from flask import request
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE = {'application/json', 'application/javascript', 'text/javascript', 'text/css', 'text/html',
+                'text/plain', 'image/svg+xml'}
+MIN_COMPRESS_SIZE = 512  # bytes; smaller bodies are not worth the header
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+STATIC_MAX_AGE = 365 * 86400
+COMPRESSED_CACHE_SIZE = 256  # compressed bodies kept, by ETag and encoding
+
+_fingerprints = {}
+_compressed = OrderedDict()
+stats = {'not_modified': 0, 'compressed': 0, 'compress_cache_hits': 0, 'bytes_in': 0, 'bytes_out': 0}
+
+
+# Short content hash of a static file, recomputed only when the file changes
+def static_fingerprint(path):
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    entry = _fingerprints.get(path)
+    if entry is None or entry[0] != stamp:
+        with open(path, 'rb') as f:
+            entry = (stamp, hashlib.blake2b(f.read(), digest_size=8).hexdigest())
+        _fingerprints[path] = entry
+    return entry[1]
+
+
+def choose_encoding(accept_encoding):
+    if brotli is not None and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+
+def compress(data, encoding):
+    if encoding == 'br':
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+# Compressed body for an ETag, from the cache when the same content was compressed before
+def compressed_body(etag, encoding, load):
+    key = (etag, encoding)
+    body = _compressed.get(key)
+    if body is not None:
+        _compressed.move_to_end(key)
+        stats['compress_cache_hits'] += 1
+        return body
+    body = compress(load(), encoding)
+    _compressed[key] = body
+    if len(_compressed) > COMPRESSED_CACHE_SIZE:
+        _compressed.popitem(last=False)
+    return body
+
+
+def init_app(app):
+    """Register the static URL fingerprinting and the response hook on a Flask app."""
+
+    @app.url_defaults
+    def fingerprint_static(endpoint, values):
+        if endpoint == 'static' and 'filename' in values and 'v' not in values:
+            version = static_fingerprint(os.path.join(app.static_folder, values['filename']))
+            if version:
+                values['v'] = version
+
+    @app.after_request
+    def cache_and_compress(response):
+        if request.method not in ('GET', 'HEAD') or response.status_code not in (200, 304):
+            return response
+
+        if request.endpoint == 'static':
+            # send_file already set an ETag and answered If-None-Match
+            if request.args.get('v'):
+                response.cache_control.no_cache = None
+                response.cache_control.public = True
+                response.cache_control.max_age = STATIC_MAX_AGE
+                response.cache_control.immutable = True
+        elif response.mimetype == 'application/json':
+            response.cache_control.no_cache = True
+            if response.get_etag()[0] is None:
+                response.add_etag()
+            response.make_conditional(request)
+
+        if response.status_code == 304:
+            stats['not_modified'] += 1
+            return response
+        if response.mimetype not in COMPRESSIBLE or 'Content-Encoding' in response.headers:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+        length = response.content_length
+        if encoding is None or (length is not None and length < MIN_COMPRESS_SIZE):
+            return response
+
+        etag, _ = response.get_etag()
+        # send_file streams from disk; the file is read only when the compressed copy is not cached
+        source = response.response
+        response.direct_passthrough = False
+        data = compressed_body(etag, encoding, response.get_data) if etag else compress(response.get_data(), encoding)
+        if hasattr(source, 'close'):
+            source.close()
+        stats['bytes_in'] += length or 0
+        stats['bytes_out'] += len(data)
+        stats['compressed'] += 1
+        response.set_data(data)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # Same content, different bytes: the compressed variant only matches weakly
+            response.set_etag(etag, weak=True)
+        return response
+
+    return app
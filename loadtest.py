@@ -0,0 +1,336 @@
+"""
+Load test for the dashboard and API, run against the fake broker.
+
+    python loadtest.py                                  # 50 viewers for 30s on the threaded dev server
+    python loadtest.py --clients 200 --duration 60 --server waitress --threads 16
+    python loadtest.py --server gunicorn --workers 4
+    python loadtest.py --url http://127.0.0.1:5000      # an already running server
+
+Each simulated viewer loads / once, then polls /api/data every --interval
+seconds, like an open dashboard tab. --config-writes adds POST /update_config
+at that many requests per second across all viewers. The app runs in a
+temporary directory holding a copy of config.json, so journals, snapshots
+and config writes stay out of the working tree.
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+from urllib.parse import urlencode, urlsplit
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+SERVERS = ['werkzeug', 'waitress', 'gunicorn']
+
+
+# WSGI app on the fake broker; also the gunicorn entry point ('loadtest:create_app()')
+def create_app():
+    import fake_broker
+    fake_broker.install()
+    fake_broker.configure(latency=float(os.environ.get('LOADTEST_TERMINAL_LATENCY', 0)))
+    import app as dashboard_app
+    return dashboard_app.app
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(host, port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1.0):
+                return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+
+class Server:
+    """Runs the app in one of SERVERS on a free local port."""
+
+    def __init__(self, kind, threads, workers):
+        self.kind = kind
+        self.threads = threads
+        self.workers = workers
+        self.host = '127.0.0.1'
+        self.port = free_port()
+        self._server = None
+        self._thread = None
+        self._proc = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        if self.kind == 'gunicorn':
+            env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [REPO_DIR, os.environ.get('PYTHONPATH')])))
+            self._proc = subprocess.Popen(
+                [sys.executable, '-m', 'gunicorn', '-w', str(self.workers), '--threads', str(self.threads),
+                 '-b', f'{self.host}:{self.port}', '--log-level', 'warning', 'loadtest:create_app()'],
+                env=env, stdout=subprocess.DEVNULL)
+        else:
+            wsgi_app = create_app()
+            if self.kind == 'waitress':
+                import waitress
+                self._server = waitress.create_server(wsgi_app, host=self.host, port=self.port, threads=self.threads)
+                target = self._server.run
+            else:
+                from werkzeug.serving import WSGIRequestHandler, make_server
+
+                class QuietHandler(WSGIRequestHandler):
+                    def log_request(self, *args, **kwargs):
+                        pass
+
+                self._server = make_server(self.host, self.port, wsgi_app, threaded=True,
+                                           request_handler=QuietHandler)
+                target = self._server.serve_forever
+            self._thread = threading.Thread(target=target, daemon=True)
+            self._thread.start()
+        if not wait_for_port(self.host, self.port):
+            self.stop()
+            raise RuntimeError(f"{self.kind} server did not start on port {self.port}")
+
+    def stop(self):
+        if self._proc is not None:
+            self._proc.terminate()
+            self._proc.wait(10)
+        elif self._server is not None:
+            if self.kind == 'waitress':
+                self._server.close()
+            else:
+                self._server.shutdown()
+
+
+class Recorder:
+    """Latencies and errors per endpoint, shared by all client threads."""
+
+    def __init__(self):
+        self.latencies = {}
+        self.errors = {}
+        self.error_samples = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds, error=None):
+        with self._lock:
+            self.latencies.setdefault(name, []).append(seconds * 1000)
+            if error is not None:
+                self.errors[name] = self.errors.get(name, 0) + 1
+                self.error_samples.setdefault(name, error)
+
+    def summary(self, elapsed):
+        results = {}
+        for name, values in sorted(self.latencies.items()):
+            values.sort()
+            n = len(values)
+            results[name] = {
+                'requests': n,
+                'errors': self.errors.get(name, 0),
+                'error_rate_pct': self.errors.get(name, 0) / n * 100,
+                'throughput_rps': n / elapsed,
+                'p50_ms': statistics.median(values),
+                'p90_ms': values[min(n - 1, int(n * 0.90))],
+                'p99_ms': values[min(n - 1, int(n * 0.99))],
+                'max_ms': values[-1],
+            }
+        return results
+
+
+class Client:
+    """One keep-alive connection, reopened after any failure; revalidates with ETags like a browser."""
+
+    def __init__(self, url, recorder, timeout):
+        parts = urlsplit(url)
+        self.host, self.port = parts.hostname, parts.port or 80
+        self.recorder = recorder
+        self.timeout = timeout
+        self.conn = None
+        self.etags = {}
+
+    def request(self, name, method, path, body=None, ok=(200,)):
+        headers = {'Accept-Encoding': 'gzip, deflate, br'}
+        if body is not None:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif path in self.etags:
+            headers['If-None-Match'] = self.etags[path]
+        start = time.perf_counter()
+        error = None
+        try:
+            if self.conn is None:
+                self.conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+            self.conn.request(method, path, body=body, headers=headers)
+            resp = self.conn.getresponse()
+            resp.read()
+            if resp.status not in ok:
+                error = f"HTTP {resp.status}"
+            if resp.getheader('ETag'):
+                self.etags[path] = resp.getheader('ETag')
+            if resp.getheader('Connection', '').lower() == 'close' or resp.version == 10:
+                self.conn.close()
+                self.conn = None
+        except (OSError, http.client.HTTPException) as e:
+            error = f"{type(e).__name__}: {e}"
+            if self.conn is not None:
+                self.conn.close()
+            self.conn = None
+        self.recorder.add(name, time.perf_counter() - start, error)
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+
+
+# Dashboard tab: page load, then /api/data every interval until the deadline
+def viewer(url, recorder, interval, deadline, timeout):
+    client = Client(url, recorder, timeout)
+    # Tabs are not opened in lockstep
+    time.sleep(random.uniform(0, interval))
+    client.request('GET /', 'GET', '/')
+    next_poll = time.perf_counter() + interval
+    while True:
+        delay = next_poll - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if time.perf_counter() >= deadline:
+            break
+        client.request('GET /api/data', 'GET', '/api/data', ok=(200, 304))
+        # A slow response delays the next poll, as setTimeout in the page does
+        next_poll = max(next_poll + interval, time.perf_counter())
+    client.close()
+
+
+# Settings form submissions at a fixed total rate, cycling through forms; the last one restores the config
+def config_writer(url, recorder, rate, deadline, timeout, forms):
+    client = Client(url, recorder, timeout)
+    bodies = [urlencode(form) for form in forms]
+    writes = 0
+    while time.perf_counter() < deadline:
+        client.request('POST /update_config', 'POST', '/update_config', body=bodies[writes % len(bodies)],
+                       ok=(200, 302, 303))
+        writes += 1
+        time.sleep(1.0 / rate)
+    if writes % len(bodies):
+        # Leave the config as it was found
+        client.request('POST /update_config', 'POST', '/update_config', body=bodies[-1], ok=(200, 302, 303))
+    client.close()
+
+
+def run_load(url, clients, duration, interval, config_writes, timeout, forms):
+    recorder = Recorder()
+    deadline = time.perf_counter() + duration
+    threads = [threading.Thread(target=viewer, args=(url, recorder, interval, deadline, timeout), daemon=True)
+               for _ in range(clients)]
+    if config_writes > 0:
+        threads.append(threading.Thread(target=config_writer, daemon=True,
+                                        args=(url, recorder, config_writes, deadline, timeout, forms)))
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(duration + timeout + interval + 5)
+    elapsed = time.perf_counter() - start
+    return recorder.summary(elapsed), recorder.error_samples, elapsed
+
+
+def print_table(results, elapsed):
+    width = max([len(n) for n in results] + [len('total')]) + 2
+    print(f"{'endpoint':<{width}}{'requests':>10}{'rps':>9}{'p50':>10}{'p90':>10}{'p99':>10}{'max':>10}{'errors':>9}")
+    for name, r in results.items():
+        print(f"{name:<{width}}{r['requests']:>10}{r['throughput_rps']:>9.1f}{r['p50_ms']:>8.1f}ms"
+              f"{r['p90_ms']:>8.1f}ms{r['p99_ms']:>8.1f}ms{r['max_ms']:>8.1f}ms{r['error_rate_pct']:>8.1f}%")
+    total = sum(r['requests'] for r in results.values())
+    errors = sum(r['errors'] for r in results.values())
+    print(f"{'total':<{width}}{total:>10}{total / elapsed:>9.1f}"
+          f"{'':>40}{(errors / total * 100 if total else 0):>8.1f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--clients', type=int, default=50, help='simulated dashboard viewers')
+    parser.add_argument('--duration', type=float, default=30.0, help='seconds to run')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between /api/data polls per viewer')
+    parser.add_argument('--config-writes', type=float, default=0.0, help='POST /update_config per second, in total')
+    parser.add_argument('--server', choices=SERVERS, default='werkzeug',
+                        help='werkzeug is the threaded server app.run() uses')
+    parser.add_argument('--threads', type=int, default=8, help='threads per worker (waitress, gunicorn)')
+    parser.add_argument('--workers', type=int, default=4, help='worker processes (gunicorn)')
+    parser.add_argument('--url', help='load an already running server instead of starting one')
+    parser.add_argument('--terminal-latency', type=float, default=0.0,
+                        help='seconds added to every fake terminal call')
+    parser.add_argument('--timeout', type=float, default=30.0, help='per-request timeout in seconds')
+    parser.add_argument('--save', help='write results JSON to this path')
+    args = parser.parse_args(argv)
+
+    with open(os.path.join(REPO_DIR, 'config.json'), 'r') as f:
+        config = json.load(f)
+    # Toggle between two valid values so every write really replaces the config file
+    interval = int(config.get('update_interval', 60))
+    forms = [{'update_interval': interval + 1}, {'update_interval': interval}]
+
+    server = None
+    workdir = None
+    cwd = os.getcwd()
+    save_path = os.path.abspath(args.save) if args.save else None
+    try:
+        if args.url:
+            url = args.url.rstrip('/')
+        else:
+            workdir = tempfile.mkdtemp(prefix='loadtest-')
+            shutil.copy(os.path.join(REPO_DIR, 'config.json'), workdir)
+            os.chdir(workdir)
+            os.environ['LOADTEST_TERMINAL_LATENCY'] = str(args.terminal_latency)
+            server = Server(args.server, args.threads, args.workers)
+            server.start()
+            url = server.url
+        print(f"{args.clients} viewers polling {url} every {args.interval}s for {args.duration}s "
+              f"({args.server if server else 'external'} server)")
+        results, error_samples, elapsed = run_load(url, args.clients, args.duration, args.interval,
+                                                   args.config_writes, args.timeout, forms)
+    finally:
+        if server is not None:
+            server.stop()
+        os.chdir(cwd)
+        if workdir is not None:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    if results:
+        print_table(results, elapsed)
+    for name, error in error_samples.items():
+        print(f"  first error on {name}: {error}")
+
+    if save_path:
+        with open(save_path, 'w') as f:
+            json.dump({
+                'meta': {
+                    'timestamp': datetime.now().isoformat(timespec='seconds'),
+                    'python': platform.python_version(),
+                    'platform': platform.platform(),
+                    'server': args.server if server else args.url,
+                    'threads': args.threads,
+                    'workers': args.workers,
+                    'clients': args.clients,
+                    'interval': args.interval,
+                    'duration': args.duration,
+                    'terminal_latency': args.terminal_latency,
+                },
+                'results': results,
+            }, f, indent=2)
+    return 1 if any(r['errors'] for r in results.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,299 @@
+"""
+Search and tail bot log files without reading them into memory.
+
+Log files are memory-mapped. A sparse index holds one entry per block of
+about INDEX_STRIDE bytes: the block's start offset, the timestamp of its
+first entry and the most severe level in it. A query bisects the index for
+`since`, skips blocks below the requested level, and parses only the blocks
+it has to. Cursors are byte offsets of entry starts, so tailing a growing
+file reads only the bytes appended since the last poll. Memory use depends
+on the page size and scan budget, not on the file size.
+
+Entries look like `2025-04-23 12:33:46,885 INFO message`. Lines that do not
+start with a timestamp (tracebacks) belong to the entry above them.
+"""
+import bisect
+import glob
+import mmap
+import os
+import re
+import threading
+from datetime import datetime
+
+INDEX_STRIDE = 64 * 1024
+MAX_SCAN = 8 * 1024 * 1024  # bytes parsed per query; the cursor continues from there
+MAX_LIMIT = 1000
+
+LEVELS = {'DEBUG': 10, 'INFO': 20, 'WARNING': 30, 'ERROR': 40, 'CRITICAL': 50}
+# Severe levels first, so the first token found in a block is its maximum
+LEVEL_TOKENS = [(rank, f' {name} '.encode()) for name, rank in sorted(LEVELS.items(), key=lambda kv: -kv[1])]
+
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+ENTRY_START = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.]?\d* (\w+) ?', re.M)
+
+
+def level_rank(level):
+    if level is None:
+        return 0
+    rank = LEVELS.get(str(level).upper())
+    if rank is None:
+        raise ValueError(f"unknown level {level!r}, expected one of {', '.join(LEVELS)}")
+    return rank
+
+
+# Epoch seconds to the log's own timestamp text, which sorts chronologically
+def time_key(since):
+    return datetime.fromtimestamp(since).strftime(TIME_FORMAT).encode()
+
+
+class LogFilter:
+    """Compiled query arguments shared by the block skip and the entry scan."""
+    __slots__ = ('rank', 'since', 'needle', 'pattern', 'level_re')
+
+    def __init__(self, rank, since, q):
+        self.rank = rank
+        self.since = since
+        self.needle = q.lower() if q else None
+        self.pattern = re.compile(re.escape(q.encode()), re.I) if q else None
+        self.level_re = None
+        if rank:
+            names = '|'.join(name for name, r in LEVELS.items() if r >= rank)
+            self.level_re = re.compile(rb'^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d)[,.]?\d* (' + names.encode() + rb') ?', re.M)
+
+
+class LogFile:
+    """
+    One memory-mapped log file and its sparse index.
+
+    Args:
+        path (str): Log file; it may keep growing while open
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+        self._map = None
+        self.size = 0       # bytes up to the last complete line
+        self.offsets = []   # block start offsets, each at an entry start
+        self.times = []     # timestamp text of each block's first entry
+        self.ranks = []     # most severe level in each block
+        self._lock = threading.Lock()
+
+    def close(self):
+        with self._lock:
+            self._unmap()
+
+    def _unmap(self):
+        if self._map is not None:
+            self._map.close()
+        if self._file is not None:
+            self._file.close()
+        self._map = self._file = None
+        self.size = 0
+        self.offsets, self.times, self.ranks = [], [], []
+
+    def refresh(self):
+        """Map bytes appended since the last call and extend the index over them."""
+        try:
+            length = os.path.getsize(self.path)
+        except OSError:
+            self._unmap()
+            return
+        if self._map is not None and length < len(self._map):
+            # Truncated or rotated in place: start over
+            self._unmap()
+        if length == 0 or (self._map is not None and length == len(self._map)):
+            return
+        if self._map is not None:
+            self._map.close()
+        else:
+            self._file = open(self.path, 'rb')
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        end = self._map.rfind(b'\n') + 1
+        if end > self.size:
+            self._index(end)
+            self.size = end
+
+    def _index(self, end):
+        mm = self._map
+        # The last block was open-ended; rebuild it with the new bytes
+        start = self.offsets.pop() if self.offsets else 0
+        if self.times:
+            self.times.pop()
+            self.ranks.pop()
+        while start < end:
+            m = ENTRY_START.search(mm, start, end)
+            if m is None:
+                break
+            block_start = m.start()
+            nxt = ENTRY_START.search(mm, min(block_start + INDEX_STRIDE, end), end)
+            block_end = nxt.start() if nxt else end
+            rank = 0
+            for level, token in LEVEL_TOKENS:
+                if mm.find(token, block_start, block_end) >= 0:
+                    rank = level
+                    break
+            self.offsets.append(block_start)
+            self.times.append(m.group(1))
+            self.ranks.append(rank)
+            start = block_end
+
+    def _block_of(self, offset):
+        return max(0, bisect.bisect_right(self.offsets, offset) - 1)
+
+    def _block_end(self, i):
+        return self.offsets[i + 1] if i + 1 < len(self.offsets) else self.size
+
+    def _entry_end(self, pos, end):
+        nxt = ENTRY_START.search(self._map, pos, end)
+        return nxt.start() if nxt else end
+
+    def _entry_at(self, pos, start):
+        """Entry-start match for the entry containing byte pos; start must be an entry start."""
+        mm = self._map
+        line = mm.rfind(b'\n', start, pos) + 1 or start
+        while True:
+            m = ENTRY_START.match(mm, line)
+            if m is not None or line <= start:
+                return m
+            line = mm.rfind(b'\n', start, line - 1) + 1 or start
+
+    def _entries(self, start, end, f):
+        """
+        (offset, end, timestamp, level, body offset) for candidate entries starting in [start, end).
+
+        With a search text only entries containing it are visited, and with a
+        level only entries at that level or above; both searches run in C
+        over the mapped bytes instead of entry by entry.
+        """
+        mm = self._map
+        if f.pattern is not None:
+            hit = f.pattern.search(mm, start, end)
+            while hit is not None:
+                m = self._entry_at(hit.start(), start)
+                stop = self._entry_end(m.end(), end)
+                yield m.start(), stop, m.group(1), m.group(2), m.end()
+                hit = f.pattern.search(mm, stop, end)
+            return
+        starts = f.level_re.finditer(mm, start, end) if f.level_re is not None else ENTRY_START.finditer(mm, start, end)
+        for m in starts:
+            yield m.start(), self._entry_end(m.end(), end), m.group(1), m.group(2), m.end()
+
+    def _match(self, entry, f):
+        offset, stop, stamp, level, body = entry
+        level = level.decode(errors='replace')
+        if f.rank and LEVELS.get(level, 0) < f.rank:
+            return None
+        if f.since is not None and stamp < f.since:
+            return None
+        message = self._map[body:stop].decode('utf-8', errors='replace').rstrip('\n')
+        if f.needle and f.needle not in message.lower():
+            return None
+        return {'offset': offset, 'time': stamp.decode(), 'level': level, 'message': message}
+
+    def _skip(self, i, f, start, end):
+        if f.rank and self.ranks[i] < f.rank:
+            return True
+        return f.pattern is not None and f.pattern.search(self._map, start, end) is None
+
+    def query(self, since=None, level=None, q=None, cursor=None, limit=200):
+        """
+        Matching entries.
+
+        Without cursor or since, the newest `limit` matches are returned.
+        Otherwise entries are read forward from the cursor offset or from the
+        first entry at or after since.
+
+        Args:
+            since (float): Epoch seconds; older entries are skipped
+            level (str): Minimum level, e.g. 'WARNING' also matches ERROR
+            q (str): Case-insensitive substring of the message
+            cursor (int): Byte offset returned as next_cursor by an earlier query
+            limit (int): Maximum entries returned
+
+        Returns:
+            dict: {'entries', 'next_cursor', 'size'}; poll again with next_cursor to tail
+        """
+        f = LogFilter(level_rank(level), time_key(since) if since is not None else None, q)
+        limit = max(1, min(int(limit), MAX_LIMIT))
+        with self._lock:
+            self.refresh()
+            if self._map is None or not self.offsets:
+                return {'entries': [], 'next_cursor': int(cursor or 0), 'size': self.size}
+            if cursor is None and since is None:
+                return self._tail(f, limit)
+            return self._forward(f, cursor, limit)
+
+    def _forward(self, f, cursor, limit):
+        if cursor is not None:
+            pos = max(0, min(int(cursor), self.size))
+            i = self._block_of(pos)
+        else:
+            # First block that can hold an entry at or after since
+            i = max(0, bisect.bisect_left(self.times, f.since) - 1)
+            pos = self.offsets[i]
+        entries, scanned = [], 0
+        while i < len(self.offsets) and pos < self.size:
+            end = self._block_end(i)
+            if self._skip(i, f, pos, end):
+                pos = end
+                i += 1
+                continue
+            if scanned >= MAX_SCAN:
+                break
+            scanned += end - pos
+            for entry in self._entries(pos, end, f):
+                match = self._match(entry, f)
+                if match is not None:
+                    entries.append(match)
+                    if len(entries) >= limit:
+                        return {'entries': entries, 'next_cursor': entry[1], 'size': self.size}
+            pos = end
+            i += 1
+        return {'entries': entries, 'next_cursor': pos, 'size': self.size}
+
+    def _tail(self, f, limit):
+        entries, scanned = [], 0
+        for i in range(len(self.offsets) - 1, -1, -1):
+            start, end = self.offsets[i], self._block_end(i)
+            if self._skip(i, f, start, end):
+                continue
+            scanned += end - start
+            block = [m for m in (self._match(e, f) for e in self._entries(start, end, f)) if m is not None]
+            entries[:0] = block[-(limit - len(entries)):]
+            if len(entries) >= limit or scanned >= MAX_SCAN:
+                break
+        return {'entries': entries, 'next_cursor': self.size, 'size': self.size}
+
+
+class LogService:
+    """
+    Log files matching a glob, newest last.
+
+    Args:
+        pattern (str): Glob for log files, e.g. 'bot_*.log'
+    """
+
+    def __init__(self, pattern='bot_*.log'):
+        self.pattern = pattern
+        self._files = {}
+        self._lock = threading.Lock()
+
+    def files(self):
+        return sorted(os.path.basename(p) for p in glob.glob(self.pattern))
+
+    def get(self, name=None):
+        """LogFile for name (a basename from files()), or for the newest file."""
+        names = self.files()
+        if not names:
+            return None
+        if name is None:
+            name = names[-1]
+        elif name not in names:
+            raise ValueError(f"unknown log file {name!r}")
+        path = os.path.join(os.path.dirname(self.pattern), name)
+        with self._lock:
+            log = self._files.get(path)
+            if log is None:
+                log = self._files[path] = LogFile(path)
+        return log
@@ -0,0 +1,229 @@
+"""
+Incremental trade performance analytics.
+
+Each closed trade is appended once to per-group prefix-sum series (all
+trades, per timeframe and per direction). Any trailing window, by trade
+count or by close time, is then a difference of two prefix entries.
+Drawdown is not a sum; it comes from a tree of aligned power-of-two blocks
+of the equity curve, each holding its peak, trough and inner drawdown, so a
+window's drawdown merges O(log n) blocks.
+"""
+import bisect
+import math
+import threading
+
+# R-multiple histogram bin edges; outer bins catch everything beyond
+R_BINS = [-3.0, -2.0, -1.5, -1.0, -0.5, 0.0, 0.5, 1.0, 1.5, 2.0, 3.0, 4.0, 5.0]
+
+
+def _merge(left, right):
+    # Drawdown across two adjacent blocks: within either, or the left peak down to the right trough
+    return max(left[0], right[0]), min(left[1], right[1]), max(left[2], right[2], left[0] - right[1])
+
+
+class _Series:
+    __slots__ = ('times', 'profit', 'cum_profit', 'cum_sq', 'cum_wins', 'cum_losses', 'cum_win_sum',
+                 'cum_loss_sum', 'cum_down_sq', 'peak', 'max_dd', 'blocks', 'r_counts', 'r_sum', 'r_n')
+
+    def __init__(self):
+        self.times = []
+        self.profit = []
+        # Prefix sums with a leading zero so window [i, n) is cum[n] - cum[i]
+        self.cum_profit = [0.0]
+        self.cum_sq = [0.0]
+        self.cum_wins = [0]
+        self.cum_losses = [0]
+        self.cum_win_sum = [0.0]
+        self.cum_loss_sum = [0.0]
+        self.cum_down_sq = [0.0]
+        self.peak = 0.0
+        self.max_dd = 0.0
+        # blocks[level][b] = (peak, trough, drawdown) of equity points [b * 2**level, (b + 1) * 2**level)
+        self.blocks = [[]]
+        self._add_point(0.0)
+        self.r_counts = [0] * (len(R_BINS) + 1)
+        self.r_sum = 0.0
+        self.r_n = 0
+
+    def add(self, close_time, profit, r_multiple):
+        self.times.append(close_time)
+        self.profit.append(profit)
+        equity = self.cum_profit[-1] + profit
+        self.cum_profit.append(equity)
+        self.cum_sq.append(self.cum_sq[-1] + profit * profit)
+        self.cum_wins.append(self.cum_wins[-1] + (profit > 0))
+        self.cum_losses.append(self.cum_losses[-1] + (profit < 0))
+        self.cum_win_sum.append(self.cum_win_sum[-1] + max(profit, 0.0))
+        self.cum_loss_sum.append(self.cum_loss_sum[-1] + min(profit, 0.0))
+        self.cum_down_sq.append(self.cum_down_sq[-1] + min(profit, 0.0) ** 2)
+        self.peak = max(self.peak, equity)
+        self.max_dd = max(self.max_dd, self.peak - equity)
+        self._add_point(equity)
+        if r_multiple is not None:
+            self.r_counts[bisect.bisect_right(R_BINS, r_multiple)] += 1
+            self.r_sum += r_multiple
+            self.r_n += 1
+
+    def start_index(self, last=None, since=None):
+        n = len(self.times)
+        start = 0
+        if last is not None:
+            start = max(0, n - last)
+        if since is not None:
+            start = max(start, bisect.bisect_left(self.times, since))
+        return start
+
+    def _add_point(self, equity):
+        # Each completed pair of blocks completes one block on the level above
+        block = (equity, equity, 0.0)
+        for level in self.blocks:
+            level.append(block)
+            if len(level) % 2:
+                return
+            block = _merge(level[-2], level[-1])
+        self.blocks.append([block])
+
+    def window_drawdown(self, start):
+        """(peak, drawdown) of the equity curve from point start, the equity before trade start, to the end."""
+        end = len(self.cum_profit)
+        result = None
+        while start < end:
+            # Largest aligned block starting here that fits in the window
+            level = 0
+            while (level + 1 < len(self.blocks) and not start >> level & 1
+                   and start + (2 << level) <= end):
+                level += 1
+            block = self.blocks[level][start >> level]
+            result = block if result is None else _merge(result, block)
+            start += 1 << level
+        return result[0], result[2]
+
+    def stats(self, last=None, since=None):
+        n = len(self.times)
+        i = self.start_index(last, since)
+        count = n - i
+        total = self.cum_profit[n] - self.cum_profit[i]
+        wins = self.cum_wins[n] - self.cum_wins[i]
+        losses = self.cum_losses[n] - self.cum_losses[i]
+        gross_win = self.cum_win_sum[n] - self.cum_win_sum[i]
+        gross_loss = -(self.cum_loss_sum[n] - self.cum_loss_sum[i])
+        mean = total / count if count else 0.0
+        var = (self.cum_sq[n] - self.cum_sq[i]) / count - mean * mean if count else 0.0
+        std = math.sqrt(max(var, 0.0) * count / (count - 1)) if count > 1 else 0.0
+        downside = math.sqrt((self.cum_down_sq[n] - self.cum_down_sq[i]) / count) if count else 0.0
+        equity = self.cum_profit[n]
+        peak, drawdown = self.window_drawdown(i)
+        return {
+            'total_trades': count,
+            'winning_trades': wins,
+            'losing_trades': losses,
+            'win_rate': wins / count * 100 if count else 0,
+            'avg_win': gross_win / wins if wins else 0,
+            'avg_loss': gross_loss / losses if losses else 0,
+            'profit_factor': gross_win / gross_loss if gross_loss else 0,
+            'net_profit': total,
+            'expectancy': mean,
+            'sharpe': mean / std if std else 0.0,       # per trade, not annualized
+            'sortino': mean / downside if downside else 0.0,
+            'max_drawdown': drawdown,
+            'current_drawdown': peak - equity,
+            'all_time_max_drawdown': self.max_dd,
+            'all_time_current_drawdown': self.peak - equity,
+        }
+
+    def r_distribution(self):
+        labels = [f"<{R_BINS[0]}"] + [f"{lo}..{hi}" for lo, hi in zip(R_BINS, R_BINS[1:])] + [f">={R_BINS[-1]}"]
+        return {
+            'bins': labels,
+            'counts': list(self.r_counts),
+            'trades': self.r_n,
+            'avg_r': self.r_sum / self.r_n if self.r_n else 0.0,
+        }
+
+
+def downsample(times, values, max_points):
+    """
+    Reduce a series to at most ~max_points, keeping each bucket's min and max.
+
+    Spikes stay visible in charts, unlike with plain striding.
+    """
+    n = len(values)
+    if n <= max_points:
+        return list(times), list(values)
+    buckets = max(1, max_points // 2)
+    size = n / buckets
+    out_t, out_v = [], []
+    for b in range(buckets):
+        lo, hi = int(b * size), min(n, int((b + 1) * size))
+        if lo >= hi:
+            continue
+        chunk = values[lo:hi]
+        i_min = lo + chunk.index(min(chunk))
+        i_max = lo + chunk.index(max(chunk))
+        for i in sorted({i_min, i_max}):
+            out_t.append(times[i])
+            out_v.append(values[i])
+    return out_t, out_v
+
+
+class PerformanceTracker:
+    """
+    Running performance aggregates, updated as each trade closes.
+
+    Groups: 'all', 'timeframe:<name>' and 'direction:<bull|bear>'.
+    """
+
+    def __init__(self):
+        self._groups = {'all': _Series()}
+        self._seen = set()
+        self._lock = threading.Lock()
+        self.last_close_time = 0
+
+    def add_trade(self, ticket, close_time, profit, timeframe=None, direction=None, r_multiple=None):
+        """Record one closed trade; a ticket seen before is ignored."""
+        with self._lock:
+            if ticket in self._seen:
+                return False
+            self._seen.add(ticket)
+            keys = ['all']
+            if timeframe:
+                keys.append(f'timeframe:{timeframe}')
+            if direction:
+                keys.append(f'direction:{direction}')
+            for key in keys:
+                series = self._groups.get(key)
+                if series is None:
+                    series = self._groups[key] = _Series()
+                series.add(close_time, profit, r_multiple)
+            self.last_close_time = max(self.last_close_time, close_time)
+            return True
+
+    def groups(self):
+        return sorted(self._groups)
+
+    def stats(self, group='all', last=None, since=None):
+        series = self._groups.get(group)
+        if series is None:
+            return _Series().stats()
+        with self._lock:
+            return series.stats(last, since)
+
+    def r_distribution(self, group='all'):
+        series = self._groups.get(group) or _Series()
+        with self._lock:
+            return series.r_distribution()
+
+    def equity_series(self, group='all', max_points=500, since=None):
+        """Downsampled equity and drawdown curves for charts."""
+        series = self._groups.get(group) or _Series()
+        with self._lock:
+            i = series.start_index(since=since)
+            times = series.times[i:]
+            equity = series.cum_profit[i + 1:]
+        drawdown, peak = [], float('-inf')
+        for e in equity:
+            peak = max(peak, e)
+            drawdown.append(peak - e)
+        eq_t, eq_v = downsample(times, equity, max_points)
+        dd_t, dd_v = downsample(times, drawdown, max_points)
+        return {'equity': {'time': eq_t, 'value': eq_v}, 'drawdown': {'time': dd_t, 'value': dd_v}}
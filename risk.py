@@ -0,0 +1,203 @@
+import threading
+from datetime import datetime
+import MetaTrader5 as mt5
+
+
+# Risk held by a single open position
+class PositionRisk:
+    __slots__ = ('ticket', 'direction', 'volume', 'risk_amount')
+
+    def __init__(self, ticket, direction, volume, risk_amount):
+        self.ticket = ticket
+        self.direction = direction      # 'bull' or 'bear'
+        self.volume = volume
+        self.risk_amount = risk_amount  # account currency lost if the stop is hit
+
+
+# Money lost if a position of `volume` lots is stopped out
+def stop_risk_amount(entry_price, stop_loss, volume, symbol_info):
+    tick_size = symbol_info.trade_tick_size
+    tick_value = symbol_info.trade_tick_value
+    if tick_size == 0 or tick_value == 0:
+        return 0.0
+    return abs(entry_price - stop_loss) / tick_size * tick_value * volume
+
+
+class RiskEngine:
+    """
+    Keeps account state, start-of-day equity and open risk per position in memory.
+
+    The broker is only queried in refresh(), once per bot cycle. Order fills and
+    closes are applied as events, so pre_trade_check() never leaves the process.
+
+    Args:
+        daily_loss_limit_pct (float): Max loss from start-of-day equity, in percent
+        max_open_risk_pct (float): Max combined stop risk of all open positions, in percent of equity
+        max_direction_risk_pct (float): Max combined stop risk in one direction, in percent of equity
+        default_risk_pct (float): Risk assumed for positions without a stop loss, in percent of balance
+    """
+
+    def __init__(self, daily_loss_limit_pct, max_open_risk_pct, max_direction_risk_pct, default_risk_pct):
+        self.daily_loss_limit_pct = daily_loss_limit_pct
+        self.max_open_risk_pct = max_open_risk_pct
+        self.max_direction_risk_pct = max_direction_risk_pct
+        self.default_risk_pct = default_risk_pct
+
+        self.balance = 0.0
+        self.equity = 0.0
+        self.margin_free = 0.0
+        self.day = None
+        self.day_start_equity = 0.0
+        self.positions = {}
+        self.exposure = {'bull': 0.0, 'bear': 0.0}
+        self.updated_at = None
+        self._lock = threading.Lock()
+
+    @property
+    def ready(self):
+        return self.updated_at is not None
+
+    # Pull account and position state from the broker
+    def refresh(self, positions=None, symbol_info=None):
+        account_info = mt5.account_info()
+        if not account_info:
+            print("Failed to get account info for risk engine")
+            return False
+        with self._lock:
+            self._apply_account(account_info.balance, account_info.equity, account_info.margin_free)
+            if positions is not None and symbol_info is not None:
+                self.positions = {}
+                for p in positions:
+                    direction = 'bull' if p.type == mt5.POSITION_TYPE_BUY else 'bear'
+                    self.positions[p.ticket] = PositionRisk(
+                        p.ticket, direction, p.volume,
+                        self._risk_for(p.price_open, p.sl, p.volume, symbol_info))
+                self._recompute_exposure()
+        return True
+
+    # Carry today's start-of-day equity over a restart
+    def restore(self, day, day_start_equity):
+        with self._lock:
+            if day == datetime.now().date() and day_start_equity > 0:
+                self.day = day
+                self.day_start_equity = day_start_equity
+
+    def _apply_account(self, balance, equity, margin_free, now=None):
+        now = now or datetime.now()
+        self.balance = balance
+        self.equity = equity
+        self.margin_free = margin_free
+        if self.day != now.date():
+            self.day = now.date()
+            self.day_start_equity = equity
+        self.updated_at = now
+
+    def _risk_for(self, entry_price, stop_loss, volume, symbol_info):
+        if not stop_loss:
+            return self.balance * (self.default_risk_pct / 100)
+        return stop_risk_amount(entry_price, stop_loss, volume, symbol_info)
+
+    def _recompute_exposure(self):
+        exposure = {'bull': 0.0, 'bear': 0.0}
+        for p in self.positions.values():
+            exposure[p.direction] += p.risk_amount
+        self.exposure = exposure
+
+    # Record a filled order without waiting for the next refresh
+    def on_fill(self, ticket, direction, volume, entry_price, stop_loss, symbol_info):
+        side = 'bull' if 'bull' in direction else 'bear'
+        with self._lock:
+            risk = self._risk_for(entry_price, stop_loss, volume, symbol_info)
+            self.positions[ticket] = PositionRisk(ticket, side, volume, risk)
+            self.exposure[side] += risk
+
+    # Record a closed position, or an SL change that removed its risk
+    def on_close(self, ticket):
+        with self._lock:
+            p = self.positions.pop(ticket, None)
+            if p:
+                self.exposure[p.direction] -= p.risk_amount
+
+    # Scale a position's risk down to the volume left after a partial close
+    def on_partial_close(self, ticket, closed_volume):
+        with self._lock:
+            p = self.positions.get(ticket)
+            if not p:
+                return
+            remaining = p.volume - closed_volume
+            if remaining <= 1e-9:
+                closed = True
+            else:
+                closed = False
+                risk = p.risk_amount * remaining / p.volume
+                self.exposure[p.direction] += risk - p.risk_amount
+                p.risk_amount = risk
+                p.volume = remaining
+        if closed:
+            self.on_close(ticket)
+
+    def on_stop_moved(self, ticket, entry_price, stop_loss, symbol_info):
+        with self._lock:
+            p = self.positions.get(ticket)
+            if not p:
+                return
+            # A stop at or beyond entry carries no loss risk
+            if (p.direction == 'bull' and stop_loss >= entry_price) or \
+                    (p.direction == 'bear' and stop_loss <= entry_price):
+                risk = 0.0
+            else:
+                risk = self._risk_for(entry_price, stop_loss, p.volume, symbol_info)
+            self.exposure[p.direction] += risk - p.risk_amount
+            p.risk_amount = risk
+
+    def daily_loss_pct(self):
+        if self.day_start_equity <= 0:
+            return 0.0
+        return (self.day_start_equity - self.equity) / self.day_start_equity * 100
+
+    def open_risk(self):
+        return self.exposure['bull'] + self.exposure['bear']
+
+    def pre_trade_check(self, direction, new_risk=0.0):
+        """
+        Run the daily loss, open risk and correlated exposure checks for a new order.
+
+        Args:
+            direction (str): Trade direction ('bull', 'bear', 'bull_retest', ...)
+            new_risk (float): Stop risk of the new order in account currency
+
+        Returns:
+            tuple: (allowed, reason) where reason is None when allowed
+        """
+        if not self.ready:
+            return False, "risk state not loaded"
+
+        loss_pct = self.daily_loss_pct()
+        if loss_pct >= self.daily_loss_limit_pct:
+            return False, f"daily loss {loss_pct:.2f}% exceeds limit of {self.daily_loss_limit_pct}%"
+
+        equity = self.equity
+        if equity <= 0:
+            return False, "no equity"
+
+        open_pct = (self.open_risk() + new_risk) / equity * 100
+        if open_pct > self.max_open_risk_pct:
+            return False, f"open risk {open_pct:.2f}% exceeds limit of {self.max_open_risk_pct}%"
+
+        side = 'bull' if 'bull' in direction else 'bear'
+        side_pct = (self.exposure[side] + new_risk) / equity * 100
+        if side_pct > self.max_direction_risk_pct:
+            return False, f"{side} exposure {side_pct:.2f}% exceeds limit of {self.max_direction_risk_pct}%"
+
+        return True, None
+
+    def snapshot(self):
+        return {
+            'balance': self.balance,
+            'equity': self.equity,
+            'day_start_equity': self.day_start_equity,
+            'daily_loss_pct': self.daily_loss_pct(),
+            'open_risk': self.open_risk(),
+            'exposure': dict(self.exposure),
+            'positions': len(self.positions),
+        }
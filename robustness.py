@@ -0,0 +1,387 @@
+"""
+Walk-forward and Monte Carlo robustness checks for strategy parameters.
+
+    python robustness.py montecarlo --trades trades.csv --sims 10000
+    python robustness.py walkforward --bars data/EURUSD_H1.npy --folds 6 \\
+        --grid atr_multiplier_tp=2,3,4 --grid retest_enabled=true,false
+
+Trade streams are R-multiples (profit divided by the amount risked). The
+Monte Carlo sizes every trade at risk_per_trade percent of current equity,
+as calculate_position_size does live. Resampled paths are computed as
+NumPy matrices in chunks spread over a process pool.
+"""
+import argparse
+import csv
+import itertools
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+import data_loader
+import structure
+
+DEFAULT_CONFIG = 'config.json'
+PERCENTILES = [5, 25, 50, 75, 95, 99]
+DRAWDOWN_LEVELS = [10, 20, 30, 50]
+# Parameters that change which signals fire; the rest only change exits
+SIGNAL_PARAMS = ('pivot_depth', 'break_buffer', 'retest_enabled', 'lookback')
+
+
+def load_config(path=DEFAULT_CONFIG):
+    try:
+        with open(path, 'r') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def strategy_params(config):
+    """Backtest parameters taken from config.json, with the bot's defaults."""
+    return {
+        'lookback': int(config.get('lookback', 100)),
+        'pivot_depth': int(config.get('pivot_depth', 1)),
+        'break_buffer': 0.0,
+        'retest_enabled': bool(config.get('retest_enabled', True)),
+        'atr_period': int(config.get('atr_period', 14)),
+        'atr_multiplier_sl': float(config.get('atr_multiplier_sl', 1.5)),
+        'atr_multiplier_tp': float(config.get('atr_multiplier_tp', 3.0)),
+    }
+
+
+def load_trade_stream(path, risk_amount=None):
+    """
+    Read R-multiples from a CSV.
+
+    Uses an r_multiple column if present. Otherwise profit is divided by a
+    risk column, by risk_amount, or failing both by the average loss (1R ~
+    the typical stop-out).
+    """
+    with open(path, 'r', newline='') as f:
+        rows = list(csv.DictReader(f))
+    if not rows:
+        return np.zeros(0)
+    if 'r_multiple' in rows[0]:
+        return np.array([float(r['r_multiple']) for r in rows])
+    profit = np.array([float(r['profit']) for r in rows])
+    if 'risk' in rows[0]:
+        risk = np.array([float(r['risk']) for r in rows])
+    elif risk_amount:
+        risk = np.full(len(profit), risk_amount)
+    else:
+        losses = -profit[profit < 0]
+        if len(losses) == 0:
+            raise ValueError("no losing trades to estimate 1R from; pass --risk-amount")
+        risk = np.full(len(profit), losses.mean())
+    return profit / risk
+
+
+# Backtest
+
+def signal_stream(bars, params):
+    """
+    Replay the live structure rules bar by bar.
+
+    Returns:
+        list: (bar index, signal, pivot stop level or None) for every entry signal
+    """
+    lookback, depth = params['lookback'], params['pivot_depth']
+    ms = structure.MarketStructure()
+    signals = []
+    for end in range(lookback, len(bars) + 1):
+        window = bars[end - lookback:end]
+        highs, lows = structure.find_pivots(window, depth)
+        structure.update_trend(ms, highs, lows)
+        signal = structure.detect_break(ms, window, params['break_buffer'], params['retest_enabled'])
+        if signal in ('bull', 'bear', 'bull_retest', 'bear_retest'):
+            pivots = lows if 'bull' in signal else highs
+            level = pivots[-1][1] if pivots else None
+            signals.append((end - 1, signal, level))
+    return signals
+
+
+def simulate_exits(bars, signals, params):
+    """
+    Turn entry signals into R-multiples, one open position at a time.
+
+    Entries fill at the signal bar's close. Stops follow enter_trade: the
+    last pivot beyond the break, less the buffer, or ATR * atr_multiplier_sl.
+    The target is atr_multiplier_tp times the stop distance. A bar that hits
+    both counts as a loss. A trade still open at the end is marked to the
+    last close.
+    """
+    high, low, close = bars['high'], bars['low'], bars['close']
+    n = len(bars)
+    results = []
+    busy_until = -1
+    for i, signal, level in signals:
+        if i <= busy_until or i + 1 >= n:
+            continue
+        entry = close[i]
+        bull = 'bull' in signal
+        if level is not None:
+            stop = level - params['break_buffer'] if bull else level + params['break_buffer']
+        else:
+            atr = structure.average_true_range(bars[max(0, i - params['atr_period']):i + 1], params['atr_period'])
+            stop = entry - atr * params['atr_multiplier_sl'] if bull else entry + atr * params['atr_multiplier_sl']
+        risk = entry - stop if bull else stop - entry
+        if risk <= 0:
+            continue
+        target = entry + risk * params['atr_multiplier_tp'] if bull else entry - risk * params['atr_multiplier_tp']
+
+        after = slice(i + 1, n)
+        stop_hits = np.flatnonzero(low[after] <= stop if bull else high[after] >= stop)
+        target_hits = np.flatnonzero(high[after] >= target if bull else low[after] <= target)
+        first_stop = stop_hits[0] if len(stop_hits) else n
+        first_target = target_hits[0] if len(target_hits) else n
+        if first_stop == n and first_target == n:
+            results.append(((close[-1] - entry) if bull else (entry - close[-1])) / risk)
+            busy_until = n
+        elif first_stop <= first_target:
+            results.append(-1.0)
+            busy_until = i + 1 + first_stop
+        else:
+            results.append(params['atr_multiplier_tp'])
+            busy_until = i + 1 + first_target
+    return np.array(results)
+
+
+def backtest(bars, params):
+    return simulate_exits(bars, signal_stream(bars, params), params)
+
+
+def _evaluate_group(bars, signal_params, exit_param_sets):
+    """Process pool task: one signal replay shared by every exit parameter set."""
+    signals = signal_stream(bars, signal_params)
+    return [simulate_exits(bars, signals, dict(signal_params, **p)) for p in exit_param_sets]
+
+
+def summarize(r):
+    if len(r) == 0:
+        return {'trades': 0, 'total_r': 0.0, 'expectancy': 0.0, 'win_rate': 0.0}
+    return {
+        'trades': int(len(r)),
+        'total_r': float(r.sum()),
+        'expectancy': float(r.mean()),
+        'win_rate': float((r > 0).mean() * 100),
+    }
+
+
+def walk_forward(bars, base_params, grid, folds=5, objective='total_r', min_trades=5, workers=None):
+    """
+    Rolling walk-forward: pick the best grid point on window N, test it on window N+1.
+
+    Args:
+        bars: Rates array, oldest first
+        base_params (dict): Parameters not being optimized (see strategy_params)
+        grid (dict): {param: [values]} to search
+        folds (int): Number of train/test pairs; bars are cut into folds + 1 windows
+
+    Returns:
+        dict: Per-fold choices and metrics, plus the concatenated out-of-sample R stream
+    """
+    lookback = base_params['lookback']
+    size = (len(bars) - lookback) // (folds + 1)
+    if size <= lookback:
+        raise ValueError(f"not enough bars for {folds} folds with lookback {lookback}")
+
+    def window(k):
+        # Include lookback bars of history before the window for warm-up
+        start = lookback + k * size
+        return bars[start - lookback:start + size]
+
+    names = list(grid)
+    combos = [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    groups = {}
+    for combo in combos:
+        params = dict(base_params, **combo)
+        key = tuple(params[p] for p in SIGNAL_PARAMS)
+        groups.setdefault(key, []).append(params)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        jobs = {}
+        for k in range(folds):
+            for key, param_sets in groups.items():
+                exit_sets = [{p: v for p, v in ps.items() if p not in SIGNAL_PARAMS} for ps in param_sets]
+                jobs[(k, key)] = pool.submit(_evaluate_group, window(k), param_sets[0], exit_sets)
+
+        in_sample = {}
+        for (k, key), job in jobs.items():
+            for params, r in zip(groups[key], job.result()):
+                in_sample.setdefault(k, []).append((params, r))
+
+        chosen = {}
+        for k in range(folds):
+            ranked = [(summarize(r), p) for p, r in in_sample[k] if len(r) >= min_trades]
+            if not ranked:
+                ranked = [(summarize(r), p) for p, r in in_sample[k]]
+            chosen[k] = max(ranked, key=lambda item: item[0][objective])
+        oos_jobs = {k: pool.submit(backtest, window(k + 1), chosen[k][1]) for k in range(folds)}
+        oos = {k: job.result() for k, job in oos_jobs.items()}
+
+    report = []
+    for k in range(folds):
+        stats, params = chosen[k]
+        report.append({
+            'fold': k,
+            'params': {n: params[n] for n in names},
+            'in_sample': stats,
+            'out_of_sample': summarize(oos[k]),
+        })
+    stream = np.concatenate([oos[k] for k in range(folds)]) if folds else np.zeros(0)
+    return {'folds': report, 'out_of_sample': summarize(stream), 'oos_r': stream}
+
+
+# Monte Carlo
+
+def _mc_chunk(r, risk_fraction, n_sims, method, seed, ruin_level):
+    rng = np.random.default_rng(seed)
+    n = len(r)
+    if method == 'bootstrap':
+        paths = r[rng.integers(0, n, (n_sims, n))]
+    else:
+        paths = rng.permuted(np.tile(r, (n_sims, 1)), axis=1)
+    growth = 1.0 + risk_fraction * paths
+    np.maximum(growth, 0.0, out=growth)
+    equity = np.cumprod(growth, axis=1)
+    peak = np.maximum.accumulate(equity, axis=1)
+    np.maximum(peak, 1.0, out=peak)  # starting equity is the first peak
+    max_dd = (1.0 - equity / peak).max(axis=1)
+    ruined = equity.min(axis=1) <= ruin_level
+    return max_dd, equity[:, -1], ruined
+
+
+def monte_carlo(r, risk_pct, sims=10000, method='bootstrap', ruin_pct=50.0, workers=None, chunk=250, seed=None):
+    """
+    Drawdown and risk-of-ruin distributions from resampled trade sequences.
+
+    Args:
+        r: R-multiples of the trade stream
+        risk_pct (float): Percent of equity risked per trade (risk_per_trade)
+        method (str): 'bootstrap' (draw with replacement) or 'shuffle' (reorder the same trades)
+        ruin_pct (float): Drawdown from starting equity that counts as ruin
+
+    Returns:
+        dict: Percentiles of max drawdown and final return, risk of ruin and
+        the probability of reaching each of DRAWDOWN_LEVELS
+    """
+    r = np.asarray(r, dtype=np.float64)
+    if len(r) == 0:
+        raise ValueError("empty trade stream")
+    seeds = np.random.SeedSequence(seed).spawn((sims + chunk - 1) // chunk)
+    sizes = [min(chunk, sims - i * chunk) for i in range(len(seeds))]
+    args = (r, risk_pct / 100.0)
+    ruin_level = 1.0 - ruin_pct / 100.0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parts = list(pool.map(_mc_chunk, *zip(*[args + (n, method, s, ruin_level) for n, s in zip(sizes, seeds)])))
+    max_dd = np.concatenate([p[0] for p in parts]) * 100
+    final = (np.concatenate([p[1] for p in parts]) - 1.0) * 100
+    ruined = np.concatenate([p[2] for p in parts])
+
+    return {
+        'sims': sims,
+        'trades': int(len(r)),
+        'method': method,
+        'risk_pct': risk_pct,
+        'max_drawdown_pct': {f'p{q}': float(v) for q, v in zip(PERCENTILES, np.percentile(max_dd, PERCENTILES))},
+        'final_return_pct': {f'p{q}': float(v) for q, v in zip(PERCENTILES, np.percentile(final, PERCENTILES))},
+        'risk_of_ruin_pct': float(ruined.mean() * 100),
+        'prob_drawdown_pct': {f'>={lvl}': float((max_dd >= lvl).mean() * 100) for lvl in DRAWDOWN_LEVELS},
+        'elapsed_seconds': round(time.perf_counter() - start, 3),
+    }
+
+
+def _parse_grid(items):
+    grid = {}
+    for item in items or []:
+        name, _, values = item.partition('=')
+        parsed = []
+        for v in values.split(','):
+            if v.lower() in ('true', 'false'):
+                parsed.append(v.lower() == 'true')
+            else:
+                parsed.append(float(v) if '.' in v else int(v))
+        grid[name] = parsed
+    return grid
+
+
+def _print_mc(mc):
+    print(f"Monte Carlo: {mc['sims']} {mc['method']} paths of {mc['trades']} trades at {mc['risk_pct']}% risk "
+          f"({mc['elapsed_seconds']}s)")
+    print("  max drawdown %: " + ' '.join(f"{k}={v:.1f}" for k, v in mc['max_drawdown_pct'].items()))
+    print("  final return %: " + ' '.join(f"{k}={v:.1f}" for k, v in mc['final_return_pct'].items()))
+    print(f"  risk of ruin: {mc['risk_of_ruin_pct']:.2f}%  "
+          + ' '.join(f"P(dd{k}%)={v:.1f}%" for k, v in mc['prob_drawdown_pct'].items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config', default=DEFAULT_CONFIG)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--json', help='write results JSON here')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    mc = sub.add_parser('montecarlo', help='resample a trade stream')
+    mc.add_argument('--trades', required=True, help='CSV with r_multiple, or profit [and risk] columns')
+    mc.add_argument('--risk-amount', type=float, help='account currency risked per trade, for profit-only CSVs')
+
+    wf = sub.add_parser('walkforward', help='rolling optimize/test over a bar series')
+    wf.add_argument('--bars', required=True, help='bar file (.npy/.csv/.parquet), or SYMBOL:TF with --data-dir')
+    wf.add_argument('--data-dir', default='data')
+    wf.add_argument('--folds', type=int, default=5)
+    wf.add_argument('--grid', action='append', help='param=v1,v2,... (repeatable)')
+    wf.add_argument('--objective', choices=['total_r', 'expectancy', 'win_rate'], default='total_r')
+    wf.add_argument('--min-trades', type=int, default=5)
+    wf.add_argument('--break-buffer', type=float, default=0.0, help='break buffer in price units')
+
+    for p in (mc, wf):
+        p.add_argument('--sims', type=int, default=10000)
+        p.add_argument('--method', choices=['bootstrap', 'shuffle'], default='bootstrap')
+        p.add_argument('--risk', type=float, help='percent risked per trade (default: risk_per_trade)')
+        p.add_argument('--ruin', type=float, default=50.0, help='drawdown %% that counts as ruin')
+        p.add_argument('--seed', type=int)
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    risk_pct = args.risk if args.risk is not None else float(config.get('risk_per_trade', 1.0))
+    output = {}
+
+    if args.command == 'walkforward':
+        if ':' in args.bars:
+            symbol, tf = args.bars.split(':', 1)
+            bars = data_loader.load_timeframe_data(symbol, tf, args.data_dir)
+        else:
+            bars = data_loader.load_bar_file(args.bars)
+        params = dict(strategy_params(config), break_buffer=args.break_buffer)
+        grid = _parse_grid(args.grid) or {'atr_multiplier_tp': [params['atr_multiplier_tp']]}
+        wf_result = walk_forward(bars, params, grid, args.folds, args.objective, args.min_trades, args.workers)
+        for fold in wf_result['folds']:
+            print(f"fold {fold['fold']}: {fold['params']} in-sample {fold['in_sample']['total_r']:+.1f}R "
+                  f"({fold['in_sample']['trades']} trades) -> out-of-sample "
+                  f"{fold['out_of_sample']['total_r']:+.1f}R ({fold['out_of_sample']['trades']} trades)")
+        oos = wf_result.pop('oos_r')
+        print(f"out-of-sample total: {wf_result['out_of_sample']}")
+        output['walk_forward'] = wf_result
+        trades = oos
+    else:
+        trades = load_trade_stream(args.trades, args.risk_amount)
+
+    if len(trades):
+        output['monte_carlo'] = monte_carlo(trades, risk_pct, args.sims, args.method, args.ruin,
+                                            args.workers, seed=args.seed)
+        _print_mc(output['monte_carlo'])
+    else:
+        print("No trades to resample")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(output, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,126 @@
+"""
+Per-cycle time budget with prioritized, sheddable work.
+
+Each bot cycle gets `budget` seconds. Work is submitted in priority order:
+position management, order handling, then timeframe analysis from the
+lowest timeframe to the highest. Essential tasks always run. Other tasks run
+only if their estimated cost (an EWMA of past runs) fits in what is left of
+the budget. A task that does not fit is shed and postponed to the next
+cycle. After max_deferrals consecutive sheds it runs regardless, so a
+higher timeframe is delayed but never starved. Overruns, shed and forced
+tasks are counted for the metrics endpoint.
+"""
+import time
+
+POSITIONS, ORDERS, LOW_TIMEFRAME, HIGH_TIMEFRAME = range(4)
+PRIORITY_NAMES = {POSITIONS: 'positions', ORDERS: 'orders', LOW_TIMEFRAME: 'low_timeframe',
+                  HIGH_TIMEFRAME: 'high_timeframe'}
+
+HIGH_TIMEFRAME_SECONDS = 4 * 3600  # H4 and above are analyzed last
+EWMA_ALPHA = 0.3
+
+
+def timeframe_priority(seconds):
+    return HIGH_TIMEFRAME if seconds >= HIGH_TIMEFRAME_SECONDS else LOW_TIMEFRAME
+
+
+class CycleScheduler:
+    """
+    Args:
+        budget (float): Seconds each cycle may take; 0 disables shedding
+        max_deferrals (int): Consecutive cycles a task may be shed before it is forced to run
+    """
+
+    def __init__(self, budget, max_deferrals=3):
+        self.budget = budget
+        self.max_deferrals = max_deferrals
+        self.cycle_start = None
+        self.estimates = {}     # task -> seconds, EWMA
+        self.deferred = {}      # task -> consecutive sheds
+        self.shed_now = []
+        self.stats = {'cycles': 0, 'overruns': 0, 'overrun_ms': 0.0, 'max_elapsed_ms': 0.0, 'last_elapsed_ms': 0.0,
+                      'late_starts': 0, 'shed': {}, 'forced': {}, 'ran': {}}
+
+    def begin(self):
+        self.cycle_start = time.perf_counter()
+        self.shed_now = []
+
+    def remaining(self):
+        if self.cycle_start is None or self.budget <= 0:
+            return float('inf')
+        return self.budget - (time.perf_counter() - self.cycle_start)
+
+    def estimate(self, name):
+        return self.estimates.get(name, 0.0)
+
+    def run(self, name, priority, fn, *args, essential=False, reserve=0.0):
+        """
+        Run fn(*args) now if it is essential or fits in the remaining budget.
+
+        Args:
+            name (str): Task name for estimates and metrics
+            priority (int): POSITIONS, ORDERS, LOW_TIMEFRAME or HIGH_TIMEFRAME
+            essential (bool): Run even when the budget is spent
+            reserve (float): Seconds kept back for essential work that runs later in the cycle
+
+        Returns:
+            tuple: (ran, result); result is None when the task was shed
+        """
+        forced = False
+        if not essential:
+            if self.remaining() - reserve < self.estimate(name):
+                deferrals = self.deferred.get(name, 0) + 1
+                if deferrals <= self.max_deferrals:
+                    self.deferred[name] = deferrals
+                    self.shed_now.append(name)
+                    self.stats['shed'][name] = self.stats['shed'].get(name, 0) + 1
+                    return False, None
+                forced = True
+                self.stats['forced'][name] = self.stats['forced'].get(name, 0) + 1
+        start = time.perf_counter()
+        try:
+            return True, fn(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            previous = self.estimates.get(name)
+            self.estimates[name] = elapsed if previous is None else previous + EWMA_ALPHA * (elapsed - previous)
+            self.deferred.pop(name, None)
+            self.stats['ran'][name] = self.stats['ran'].get(name, 0) + 1
+            if forced:
+                print(f"Ran {name} after {self.max_deferrals} deferred cycles ({PRIORITY_NAMES[priority]} priority)")
+
+    def end(self, interval=None):
+        """
+        Close the cycle and record an overrun.
+
+        Args:
+            interval (float): Seconds between cycle starts; a longer cycle makes the next one start late
+        """
+        if self.cycle_start is None:
+            return
+        now = time.perf_counter()
+        elapsed = now - self.cycle_start
+        self.cycle_start = None
+        stats = self.stats
+        stats['cycles'] += 1
+        stats['last_elapsed_ms'] = elapsed * 1000
+        stats['max_elapsed_ms'] = max(stats['max_elapsed_ms'], elapsed * 1000)
+        if interval is not None and elapsed > interval:
+            stats['late_starts'] += 1
+        if self.budget > 0 and elapsed > self.budget:
+            stats['overruns'] += 1
+            stats['overrun_ms'] += (elapsed - self.budget) * 1000
+            print(f"Cycle took {elapsed * 1000:.0f}ms, over its {self.budget * 1000:.0f}ms budget"
+                  + (f"; shed {', '.join(self.shed_now)}" if self.shed_now else ""))
+        elif self.shed_now:
+            print(f"Cycle budget tight, postponed {', '.join(self.shed_now)}")
+
+    def report(self):
+        cycles = self.stats['cycles']
+        return {
+            **self.stats,
+            'budget_ms': self.budget * 1000,
+            'overrun_rate': self.stats['overruns'] / cycles * 100 if cycles else 0.0,
+            'estimates_ms': {name: est * 1000 for name, est in self.estimates.items()},
+            'deferred': dict(self.deferred),
+        }
@@ -0,0 +1,207 @@
+"""
+Record of every evaluated signal and what happened to it.
+
+Recent events stay in a bounded in-memory deque. Every event is also
+appended to a JSONL file, which rolls over at max_file_bytes, so history
+outlives both the deque and restarts. Per-timeframe counters are updated
+on insert, so hit-rate queries do not scan events. A signal that is still
+active on the next cycle, with the same bar, direction and outcome, is
+counted once, not once per cycle. A signal's result is counted once too,
+when the last position it opened is fully closed, however many deals
+(scale-out legs, partial closes) that takes.
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+
+TAKEN = 'taken'
+SKIPPED = 'skipped'
+
+
+class SignalStore:
+    """
+    Args:
+        path (str): JSONL spill file
+        max_events (int): Events kept in memory
+        max_file_bytes (int): Size at which the spill file is rotated to <path>.1
+    """
+
+    def __init__(self, path, max_events=5000, max_file_bytes=50 * 1024 * 1024):
+        self.path = path
+        self.max_file_bytes = max_file_bytes
+        self.events = deque(maxlen=max_events)
+        self.by_ticket = {}
+        self.stats = {}
+        self._last = {}  # timeframe -> (bar time, signal, outcome, reason) and the event recorded for it
+        self._unlinked = {}  # position ticket -> profit so far, for positions without a signal event
+        self._pending = []
+        self._next_id = 1
+        self._lock = threading.Lock()
+
+    def _counters(self, timeframe):
+        c = self.stats.get(timeframe)
+        if c is None:
+            c = self.stats[timeframe] = {'evaluated': 0, TAKEN: 0, SKIPPED: 0, 'reasons': {},
+                                         'closed': 0, 'wins': 0, 'profit': 0.0, 'repeats': 0}
+        return c
+
+    def record(self, timeframe, signal, outcome, reason=None, ticket=None, pivots=None, structure=None, symbol=None,
+               bar_time=None):
+        """
+        Add one evaluated signal.
+
+        Args:
+            outcome (str): TAKEN or SKIPPED
+            reason (str): Why a signal was skipped (max_positions, already_triggered, ...)
+            pivots (dict): Last pivot highs/lows the signal was based on
+            structure (dict): MarketStructure fields at evaluation time
+            bar_time (int): Open time of the bar evaluated; a repeat of the timeframe's last
+                signal on the same bar is only counted in 'repeats'
+
+        Returns:
+            dict: The new event, or the earlier one for a repeat
+        """
+        with self._lock:
+            key = (bar_time, signal, outcome, reason)
+            last = self._last.get(timeframe)
+            if bar_time is not None and last is not None and last[0] == key:
+                self._counters(timeframe)['repeats'] += 1
+                return last[1]
+            event = {
+                'id': self._next_id,
+                'time': time.time(),
+                'symbol': symbol,
+                'timeframe': timeframe,
+                'signal': signal,
+                'outcome': outcome,
+                'reason': reason,
+                'ticket': ticket,
+                'bar_time': bar_time,
+                'pivots': pivots,
+                'structure': structure,
+            }
+            self._next_id += 1
+            if len(self.events) == self.events.maxlen:
+                evicted = self.events[0]
+                for t in evicted.get('tickets', [evicted['ticket']]):
+                    if t is not None and self.by_ticket.get(t) is evicted:
+                        del self.by_ticket[t]
+            self.events.append(event)
+            self._last[timeframe] = (key, event)
+            if ticket is not None:
+                self.by_ticket[ticket] = event
+
+            c = self._counters(timeframe)
+            c['evaluated'] += 1
+            c[outcome] += 1
+            if reason:
+                c['reasons'][reason] = c['reasons'].get(reason, 0) + 1
+            self._pending.append(event)
+            return event
+
+    def link_ticket(self, ticket, event):
+        """Attach another order (e.g. a scale-out leg) to an existing event."""
+        with self._lock:
+            tickets = event.setdefault('tickets', [event['ticket']])
+            if ticket not in tickets:
+                tickets.append(ticket)
+            self.by_ticket[ticket] = event
+
+    def record_result(self, ticket, profit, timeframe=None, closed=True):
+        """
+        Add a closing deal's profit to the signal that opened the position.
+
+        Args:
+            ticket (int): Position ticket the deal closed (part of)
+            profit (float): Net profit of the deal
+            timeframe (str): Used when no signal event is linked to the ticket
+            closed (bool): The position is now fully closed; the signal counts as one closed
+                result, with the profit of all its deals, once its last linked position is
+
+        Returns:
+            bool: False if the trade could not be attributed to a timeframe
+        """
+        with self._lock:
+            event = self.by_ticket.get(ticket)
+            tf = event['timeframe'] if event else timeframe
+            if tf is None:
+                return False
+            c = self._counters(tf)
+            c['profit'] += profit
+            if event is None:
+                total = self._unlinked.get(ticket, 0.0) + profit
+                if not closed:
+                    self._unlinked[ticket] = total
+                    return True
+                self._unlinked.pop(ticket, None)
+            else:
+                event['profit'] = total = event.get('profit', 0.0) + profit
+                if not closed:
+                    return True
+                done = event.setdefault('closed_tickets', [])
+                if ticket not in done:
+                    done.append(ticket)
+                if event.get('closed') or len(done) < len(event.get('tickets', [event['ticket']])):
+                    return True
+                event['closed'] = True
+            c['closed'] += 1
+            c['wins'] += total > 0
+            return True
+
+    def flush(self):
+        """Append events recorded since the last flush to the spill file."""
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) > self.max_file_bytes:
+                os.replace(self.path, self.path + '.1')
+            with open(self.path, 'a') as f:
+                for event in pending:
+                    f.write(json.dumps(event) + '\n')
+        except OSError as e:
+            print(f"Error writing signal log: {e}")
+
+    def hit_rates(self, timeframe=None):
+        """Per-timeframe take rate and, for closed trades, win rate."""
+        with self._lock:
+            items = [(timeframe, self.stats.get(timeframe))] if timeframe else list(self.stats.items())
+            out = {}
+            for tf, c in items:
+                if c is None:
+                    continue
+                out[tf] = dict(c, reasons=dict(c['reasons']),
+                               take_rate=c[TAKEN] / c['evaluated'] * 100 if c['evaluated'] else 0.0,
+                               win_rate=c['wins'] / c['closed'] * 100 if c['closed'] else 0.0)
+            return out
+
+    def recent(self, limit=100, timeframe=None, outcome=None):
+        with self._lock:
+            out = []
+            for event in reversed(self.events):
+                if timeframe and event['timeframe'] != timeframe:
+                    continue
+                if outcome and event['outcome'] != outcome:
+                    continue
+                out.append(event)
+                if len(out) >= limit:
+                    break
+            return out
+
+    def history(self, timeframe=None, since=None):
+        """Stream events from the spill files, oldest first, without loading them all."""
+        self.flush()
+        for path in (self.path + '.1', self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, 'r') as f:
+                for line in f:
+                    event = json.loads(line)
+                    if timeframe and event['timeframe'] != timeframe:
+                        continue
+                    if since and event['time'] < since:
+                        continue
+                    yield event
@@ -0,0 +1,148 @@
+"""
+Binary checkpoints of the bot's structure, trigger and risk state.
+
+Layout (little endian):
+    header   4s magic, H version, d saved_at, i day ordinal, d day_start_equity
+    blocks   4 length-prefixed byte blocks: symbol, STRUCTURE_DTYPE records,
+             newline-joined triggered timeframes, BAR_TIME_DTYPE records
+
+Writes go to a temp file in the same directory followed by os.replace, so
+a reader sees either the previous snapshot or the new one, never a mix.
+"""
+import os
+import struct
+import tempfile
+import time
+from datetime import date
+import numpy as np
+import structure
+
+MAGIC = b'KMSS'
+VERSION = 1
+HEADER = struct.Struct('<4sHdid')
+BLOCK_LEN = struct.Struct('<I')
+BAR_TIME_DTYPE = np.dtype([('timeframe', 'S16'), ('time', '<i8')])
+
+
+class SnapshotState:
+    __slots__ = ('symbol', 'saved_at', 'day', 'day_start_equity', 'structures', 'triggered', 'bar_times')
+
+    def __init__(self, symbol, saved_at, day, day_start_equity, structures, triggered, bar_times):
+        self.symbol = symbol
+        self.saved_at = saved_at
+        self.day = day                      # date the trigger/risk state belongs to
+        self.day_start_equity = day_start_equity
+        self.structures = structures        # {timeframe: MarketStructure}
+        self.triggered = triggered          # set of timeframe names
+        self.bar_times = bar_times          # {timeframe: open time of the last bar seen}
+
+
+def _block(data):
+    return BLOCK_LEN.pack(len(data)) + data
+
+
+def encode(symbol, structures, triggered, bar_times, day, day_start_equity):
+    """Encode state as bytes, without the header timestamp (see Checkpoint.save)."""
+    times = np.zeros(len(bar_times), dtype=BAR_TIME_DTYPE)
+    for record, (tf, t) in zip(times, bar_times.items()):
+        record['timeframe'] = tf.encode()
+        record['time'] = t
+    return (
+        _block(symbol.encode())
+        + _block(structure.structures_to_bytes(structures, symbol))
+        + _block('\n'.join(sorted(triggered)).encode())
+        + _block(times.tobytes()),
+        day.toordinal() if day else 0,
+        day_start_equity or 0.0,
+    )
+
+
+def decode(buf):
+    magic, version, saved_at, day_ordinal, day_start_equity = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"not a v{VERSION} snapshot")
+    offset = HEADER.size
+    blocks = []
+    for _ in range(4):
+        (length,) = BLOCK_LEN.unpack_from(buf, offset)
+        offset += BLOCK_LEN.size
+        blocks.append(bytes(buf[offset:offset + length]))
+        offset += length
+    symbol = blocks[0].decode()
+    structures = {tf: ms for (_, tf), ms in structure.structures_from_bytes(blocks[1]).items()}
+    triggered = set(blocks[2].decode().split('\n')) if blocks[2] else set()
+    bar_times = {r['timeframe'].decode(): int(r['time']) for r in np.frombuffer(blocks[3], dtype=BAR_TIME_DTYPE)}
+    return SnapshotState(symbol, saved_at, date.fromordinal(day_ordinal) if day_ordinal else None,
+                         day_start_equity, structures, triggered, bar_times)
+
+
+class Checkpoint:
+    """
+    Writes a snapshot whenever the encoded state differs from the last one written.
+
+    Args:
+        path (str): Snapshot file location
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._last_payload = None
+        self.writes = 0
+
+    def save(self, symbol, structures, triggered, bar_times, day, day_start_equity):
+        blocks, day_ordinal, start_equity = encode(symbol, structures, triggered, bar_times, day, day_start_equity)
+        payload = (blocks, day_ordinal, start_equity)
+        if payload == self._last_payload:
+            return False
+        data = HEADER.pack(MAGIC, VERSION, time.time(), day_ordinal, start_equity) + blocks
+
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(prefix='.snapshot-', dir=directory)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        self._last_payload = payload
+        self.writes += 1
+        return True
+
+    def load(self):
+        try:
+            with open(self.path, 'rb') as f:
+                return decode(f.read())
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error, UnicodeDecodeError) as e:
+            print(f"Ignoring unreadable snapshot {self.path}: {e}")
+            return None
+
+
+def reconcile(ms, closed_bars, buffer):
+    """
+    Bring a restored MarketStructure up to date with bars that closed while the bot was down.
+
+    A retest that would have been hit, or a retest level that price closed
+    through, during downtime is dropped. The bot should not enter on a stale
+    signal. Trend fields are rebuilt from fresh pivots on the next cycle.
+
+    Returns:
+        bool: True if the state was changed
+    """
+    if not ms.waiting_for_retest or ms.retest_level is None or len(closed_bars) == 0:
+        return False
+    level = ms.retest_level
+    touched = np.any((closed_bars['low'] <= level + buffer) & (closed_bars['high'] >= level - buffer))
+    if ms.retest_direction == 'bull':
+        invalidated = np.any(closed_bars['close'] < level - buffer)
+    else:
+        invalidated = np.any(closed_bars['close'] > level + buffer)
+    if touched or invalidated:
+        ms.waiting_for_retest = False
+        return True
+    return False
@@ -19,7 +19,7 @@ const LoggingScreen = () => {
   const [tradeLogs, setTradeLogs] = useState([]);
   const [activeTab, setActiveTab] = useState('errors');
 
-  // Update logs every second
+  // Update logs when the service reports a change
   useEffect(() => {
     const updateLogs = () => {
       setErrorLogs(loggingService.getErrorLogs());
@@ -31,14 +31,8 @@ const LoggingScreen = () => {
 
     // Subscribe to log changes
     const unsubscribe = loggingService.subscribe(updateLogs);
-    
-    // Set up interval for updating every second
-    const intervalId = setInterval(updateLogs, 1000);
 
-    return () => {
-      clearInterval(intervalId);
-      unsubscribe();
-    };
+    return unsubscribe;
   }, []);
 
   const handleClearLogs = () => {
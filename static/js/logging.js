@@ -117,6 +117,52 @@ document.addEventListener('DOMContentLoaded', function() {
             .replace(/'/g, '&#039;');
     }
     
+    // Bot log entries, fetched incrementally from /api/logs with a byte-offset cursor
+    let serverCursor = null;
+    let serverFile = null;
+    
+    function addServerEntry(entry) {
+        const logEntry = {
+            timestamp: new Date(entry.time.replace(' ', 'T')),
+            message: `${entry.level} ${entry.message}`,
+            error: null,
+            details: null
+        };
+        if (entry.level === 'ERROR' || entry.level === 'CRITICAL') {
+            logs.errors.unshift(logEntry);
+            trimLogs(logs.errors);
+        } else {
+            logs.trades.unshift(logEntry);
+            trimLogs(logs.trades);
+        }
+    }
+    
+    function pollServerLogs() {
+        const params = new URLSearchParams({ level: 'WARNING', limit: maxLogs });
+        if (serverCursor !== null) {
+            params.set('cursor', serverCursor);
+        }
+        fetch(`/api/logs?${params}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.file !== serverFile) {
+                    // A new log file was started; tail it from the end
+                    const rotated = serverFile !== null;
+                    serverFile = data.file;
+                    if (rotated) {
+                        serverCursor = null;
+                        return;
+                    }
+                }
+                serverCursor = data.next_cursor;
+                if (data.entries && data.entries.length > 0) {
+                    data.entries.forEach(addServerEntry);
+                    renderLogs();
+                }
+            })
+            .catch(e => console.error('Error fetching bot logs:', e));
+    }
+    
     // Event listeners
     clearLogsButton.addEventListener('click', clearLogs);
     
@@ -130,8 +176,9 @@ document.addEventListener('DOMContentLoaded', function() {
         logTradeIssue('Trade placement test', { symbol: 'AAPL', price: 150.25, quantity: 10 });
     }, 2000);
     
-    // Auto update logs every second
-    setInterval(renderLogs, 1000);
+    // Logs are re-rendered only when entries arrive; poll the server for new ones
+    pollServerLogs();
+    setInterval(pollServerLogs, 2000);
     
     // Expose logging functions globally for use by other scripts
     window.systemLogger = {
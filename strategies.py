@@ -0,0 +1,267 @@
+"""
+Strategy plugins sharing one data and indicator pipeline.
+
+The bot fetches bars, finds pivots and updates market structure once per
+cycle for every timeframe. Each strategy plugin then receives the same
+TimeframeData objects. Indicators requested through TimeframeData.indicator()
+are computed on first use and shared by every plugin for the rest of the
+cycle. Plugins run concurrently on a thread pool. Each plugin's thread CPU
+time, wall time, signals and errors are counted separately. The signals go
+to the bot's order router, which applies position limits, daily triggers
+and risk checks the same way for every strategy.
+
+A plugin subclasses Strategy and implements evaluate(ctx, data) for one
+timeframe, returning None, a direction ('bull', 'bear', ...) or a Signal.
+The 'strategies' config list takes built-in names, 'module:Class' paths or
+dicts such as {"name": "atr_breakout", "timeframes": ["TIMEFRAME_H1"], "channel": 30};
+"id" names a second instance of the same class.
+"""
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import structure
+
+DEFAULT_STRATEGY = 'market_structure'
+
+
+class TimeframeData:
+    """
+    Bars, pivots and structure of one timeframe for one cycle.
+
+    Args:
+        name (str): Timeframe name, e.g. 'TIMEFRAME_H1'
+        bars: Rates array
+        highs, lows (PivotArray): Pivot highs and lows of bars
+        direction (str): Market structure signal of this cycle, if any
+        ms (MarketStructure): Structure state after this cycle's update
+    """
+
+    def __init__(self, name, bars, highs, lows, direction=None, ms=None):
+        self.name = name
+        self.bars = bars
+        self.highs = highs
+        self.lows = lows
+        self.direction = direction
+        self.ms = ms
+        self._indicators = {}
+        self._lock = threading.Lock()
+        self.computed = 0
+
+    def indicator(self, key, compute):
+        """Value of compute() for key, computed once per cycle however many plugins ask."""
+        value = self._indicators.get(key)
+        if value is not None:
+            return value
+        with self._lock:
+            value = self._indicators.get(key)
+            if value is None:
+                value = self._indicators[key] = compute()
+                self.computed += 1
+        return value
+
+    def atr(self, period):
+        return self.indicator(('atr', period), lambda: structure.average_true_range(self.bars, period))
+
+    def channel(self, length):
+        """(highest high, lowest low) of the `length` bars before the last one."""
+        def compute():
+            window = self.bars[-length - 1:-1]
+            return float(np.max(window['high'])), float(np.min(window['low']))
+        return self.indicator(('channel', length), compute)
+
+
+class StrategyContext:
+    """What every plugin sees in one cycle."""
+
+    def __init__(self, symbol, symbol_info, timeframes, pip_size):
+        self.symbol = symbol
+        self.symbol_info = symbol_info
+        self.timeframes = timeframes   # name -> TimeframeData, in precedence order
+        self.pip_size = pip_size
+
+    def pips(self, pips):
+        return pips * self.pip_size
+
+
+class Signal:
+    """
+    Entry request from a strategy.
+
+    stop_loss and take_profit are prices; None lets the router derive them
+    from the timeframe's pivots and ATR as for market structure entries.
+    """
+    __slots__ = ('strategy', 'timeframe', 'direction', 'stop_loss', 'take_profit')
+
+    def __init__(self, strategy, timeframe, direction, stop_loss=None, take_profit=None):
+        self.strategy = strategy
+        self.timeframe = timeframe
+        self.direction = direction
+        self.stop_loss = stop_loss
+        self.take_profit = take_profit
+
+    def __repr__(self):
+        return f"Signal({self.strategy}, {self.timeframe}, {self.direction})"
+
+
+class Strategy:
+    """
+    Base class for plugins.
+
+    Args:
+        timeframes (list): Timeframe names to evaluate; None for all configured ones
+        **params: Strategy parameters; each overrides a class attribute of the same name
+
+    Raises:
+        ValueError: For a parameter the class does not define, or one naming a method
+    """
+    name = 'strategy'
+    # Also evaluated on tick-mode structure breaks between bar cycles
+    tick_driven = False
+
+    def __init__(self, timeframes=None, **params):
+        self.timeframes = timeframes
+        for key, value in params.items():
+            if key.startswith('_') or not hasattr(type(self), key) or callable(getattr(type(self), key)):
+                raise ValueError(f"unknown parameter {key!r} for strategy {self.name!r}")
+            setattr(self, key, value)
+
+    def evaluate(self, ctx, data):
+        raise NotImplementedError
+
+
+class MarketStructureStrategy(Strategy):
+    """Break and retest of market structure; the direction comes from the shared structure update."""
+    name = DEFAULT_STRATEGY
+    tick_driven = True
+
+    def evaluate(self, ctx, data):
+        return data.direction
+
+
+class AtrBreakoutStrategy(Strategy):
+    """
+    Close beyond the prior `channel`-bar range by atr_buffer ATRs.
+
+    Stops and targets are placed stop_atr and target_atr ATRs from the close.
+    """
+    name = 'atr_breakout'
+    channel = 20
+    atr_period = 14
+    atr_buffer = 0.5
+    stop_atr = 1.5
+    target_atr = 3.0
+
+    def evaluate(self, ctx, data):
+        if len(data.bars) < max(self.channel, self.atr_period) + 1:
+            return None
+        atr = data.atr(self.atr_period)
+        if atr <= 0:
+            return None
+        high, low = data.channel(self.channel)
+        close = float(data.bars[-1]['close'])
+        if close > high + self.atr_buffer * atr:
+            return Signal(self.name, data.name, 'bull', close - self.stop_atr * atr, close + self.target_atr * atr)
+        if close < low - self.atr_buffer * atr:
+            return Signal(self.name, data.name, 'bear', close + self.stop_atr * atr, close - self.target_atr * atr)
+        return None
+
+
+BUILTIN_STRATEGIES = {cls.name: cls for cls in (MarketStructureStrategy, AtrBreakoutStrategy)}
+
+
+def load_strategies(specs):
+    """
+    Build plugins from the 'strategies' config list.
+
+    Raises:
+        ValueError: For an unknown name, a path that does not name a Strategy subclass, or two
+            entries with the same name and no distinct 'id'
+    """
+    strategies = []
+    for spec in specs or [DEFAULT_STRATEGY]:
+        params = dict(spec) if isinstance(spec, dict) else {'name': spec}
+        name = params.pop('name', None)
+        label = params.pop('id', None)  # tells two instances of one class apart
+        cls = BUILTIN_STRATEGIES.get(name)
+        if cls is None and name and ':' in name:
+            module, _, attr = name.partition(':')
+            cls = getattr(importlib.import_module(module), attr, None)
+        if not (isinstance(cls, type) and issubclass(cls, Strategy)):
+            raise ValueError(f"unknown strategy {name!r}; built-in: {', '.join(BUILTIN_STRATEGIES)}")
+        strategy = cls(**params)
+        if label:
+            strategy.name = label
+        # Stats, tie-break order and trigger keys are all per name
+        if any(s.name == strategy.name for s in strategies):
+            raise ValueError(f"strategy {strategy.name!r} is configured twice; give each instance a distinct 'id'")
+        strategies.append(strategy)
+    return strategies
+
+
+class StrategyEngine:
+    """
+    Runs every plugin on one cycle's context.
+
+    Args:
+        strategies (list): Strategy instances; their order breaks ties between signals
+        workers (int): Threads evaluating plugins; one plugin runs inline
+    """
+
+    def __init__(self, strategies, workers=None):
+        self.strategies = list(strategies)
+        self.order = {s.name: i for i, s in enumerate(self.strategies)}
+        self.stats = {s.name: {'cycles': 0, 'cpu_ms': 0.0, 'wall_ms': 0.0, 'signals': 0, 'errors': 0}
+                      for s in self.strategies}
+        workers = workers or len(self.strategies)
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='strategy') if len(self.strategies) > 1 else None
+
+    def _run(self, strategy, ctx):
+        # thread_time() counts only this thread, so concurrent plugins are accounted separately
+        cpu = time.thread_time()
+        wall = time.perf_counter()
+        signals, error = [], None
+        try:
+            for name, data in ctx.timeframes.items():
+                if strategy.timeframes is not None and name not in strategy.timeframes:
+                    continue
+                result = strategy.evaluate(ctx, data)
+                if not result:
+                    continue
+                signals.append(Signal(strategy.name, name, result) if isinstance(result, str) else result)
+        except Exception as e:
+            error = e
+        return signals, (time.thread_time() - cpu) * 1000, (time.perf_counter() - wall) * 1000, error
+
+    def evaluate(self, ctx, ticks=False):
+        """
+        Args:
+            ticks (bool): Run only the tick-driven plugins, on a context holding the timeframes a tick broke
+
+        Returns:
+            list: Signals from every plugin, in plugin order
+        """
+        strategies = [s for s in self.strategies if s.tick_driven] if ticks else self.strategies
+        if self._pool is None or len(strategies) < 2:
+            results = [self._run(s, ctx) for s in strategies]
+        else:
+            futures = [self._pool.submit(self._run, s, ctx) for s in strategies]
+            results = [f.result() for f in futures]
+
+        signals = []
+        for strategy, (found, cpu_ms, wall_ms, error) in zip(strategies, results):
+            stats = self.stats[strategy.name]
+            stats['cycles'] += 1
+            stats['cpu_ms'] += cpu_ms
+            stats['wall_ms'] += wall_ms
+            stats['signals'] += len(found)
+            if error is not None:
+                stats['errors'] += 1
+                print(f"Strategy {strategy.name} failed: {error}")
+            signals.extend(found)
+        return signals
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False)
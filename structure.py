@@ -0,0 +1,288 @@
+"""
+Market structure state and pivot detection.
+
+Kept free of MetaTrader5 imports so the same code runs in the live bot, in
+offline analysis and in worker processes.
+"""
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+TREND_CODES = {None: 0, 'uptrend': 1, 'downtrend': -1}
+DIRECTION_CODES = {None: 0, 'bull': 1, 'bear': -1}
+TREND_NAMES = {v: k for k, v in TREND_CODES.items()}
+DIRECTION_NAMES = {v: k for k, v in DIRECTION_CODES.items()}
+
+# One record per symbol/timeframe; NaN stands in for an unset price
+STRUCTURE_DTYPE = np.dtype([
+    ('symbol', 'S24'),
+    ('timeframe', 'S16'),
+    ('last_trend', 'i1'),
+    ('retest_direction', 'i1'),
+    ('break_detected', '?'),
+    ('waiting_for_retest', '?'),
+    ('last_hh', '<f8'),
+    ('last_hl', '<f8'),
+    ('last_lh', '<f8'),
+    ('last_ll', '<f8'),
+    ('retest_level', '<f8'),
+])
+
+_EMPTY_INDEX = np.empty(0, dtype=np.int32)
+_EMPTY_PRICE = np.empty(0, dtype=np.float64)
+
+
+class PivotArray:
+    """
+    Pivot points stored as parallel index/price arrays.
+
+    Behaves like the list of (index, price) tuples it replaces: len(),
+    truthiness, iteration, pivots[-1] -> (index, price) and slicing all work.
+    """
+    __slots__ = ('index', 'price')
+
+    def __init__(self, index=_EMPTY_INDEX, price=_EMPTY_PRICE):
+        self.index = index
+        self.price = price
+
+    def __len__(self):
+        return len(self.index)
+
+    def __bool__(self):
+        return len(self.index) > 0
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return PivotArray(self.index[i], self.price[i])
+        return int(self.index[i]), float(self.price[i])
+
+    def __iter__(self):
+        return zip(self.index.tolist(), self.price.tolist())
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return f"PivotArray({list(self)!r})"
+
+    @property
+    def nbytes(self):
+        return self.index.nbytes + self.price.nbytes
+
+
+# Identify pivot highs and lows with depth
+def find_pivots(bars, depth):
+    """
+    Find bars whose high (low) is the max (min) of the 2*depth+1 bars around them.
+
+    Returns:
+        tuple: (highs, lows) as PivotArray
+    """
+    n = len(bars)
+    width = 2 * depth + 1
+    if n < width:
+        return PivotArray(), PivotArray()
+    high = np.ascontiguousarray(bars['high'], dtype=np.float64)
+    low = np.ascontiguousarray(bars['low'], dtype=np.float64)
+    center = slice(depth, n - depth)
+    hi_idx = np.flatnonzero(high[center] == sliding_window_view(high, width).max(axis=1)) + depth
+    lo_idx = np.flatnonzero(low[center] == sliding_window_view(low, width).min(axis=1)) + depth
+    return (PivotArray(hi_idx.astype(np.int32), high[hi_idx]),
+            PivotArray(lo_idx.astype(np.int32), low[lo_idx]))
+
+
+# Average true range over the last `period` bars
+def average_true_range(bars, period):
+    high = np.asarray(bars['high'], dtype=np.float64)
+    low = np.asarray(bars['low'], dtype=np.float64)
+    prev = np.asarray(bars['close'], dtype=np.float64)[:-1]
+    high, low = high[1:], low[1:]
+    trs = np.maximum(high - low, np.maximum(np.abs(high - prev), np.abs(low - prev)))
+    if len(trs) == 0:
+        return 0.0
+    return float(trs[-period:].mean())
+
+
+# Structure for tracking identified market structures
+class MarketStructure:
+    __slots__ = ('last_trend', 'last_hh', 'last_hl', 'last_lh', 'last_ll', 'break_detected',
+                 'retest_level', 'retest_direction', 'waiting_for_retest')
+
+    def __init__(self):
+        self.last_trend = None  # 'uptrend' or 'downtrend'
+        self.last_hh = None     # Last higher high price
+        self.last_hl = None     # Last higher low price
+        self.last_lh = None     # Last lower high price
+        self.last_ll = None     # Last lower low price
+        self.break_detected = False   # Structure break detected
+        self.retest_level = None      # Price level for retest entry
+        self.retest_direction = None  # Direction after break ('bull' or 'bear')
+        self.waiting_for_retest = False  # Waiting for retest entry
+
+    def to_record(self, record):
+        record['last_trend'] = TREND_CODES[self.last_trend]
+        record['retest_direction'] = DIRECTION_CODES[self.retest_direction]
+        record['break_detected'] = self.break_detected
+        record['waiting_for_retest'] = self.waiting_for_retest
+        for field in ('last_hh', 'last_hl', 'last_lh', 'last_ll', 'retest_level'):
+            value = getattr(self, field)
+            record[field] = np.nan if value is None else value
+
+    @classmethod
+    def from_record(cls, record):
+        ms = cls()
+        ms.last_trend = TREND_NAMES[int(record['last_trend'])]
+        ms.retest_direction = DIRECTION_NAMES[int(record['retest_direction'])]
+        ms.break_detected = bool(record['break_detected'])
+        ms.waiting_for_retest = bool(record['waiting_for_retest'])
+        for field in ('last_hh', 'last_hl', 'last_lh', 'last_ll', 'retest_level'):
+            value = float(record[field])
+            setattr(ms, field, None if np.isnan(value) else value)
+        return ms
+
+
+# Update trend state from the last two pivot highs and lows
+def update_trend(ms, highs, lows):
+    # We need at least 4 pivot points to identify a trend structure
+    if len(highs) < 2 or len(lows) < 2:
+        return ms
+
+    # Check for uptrend (higher highs and higher lows)
+    if highs[-1][1] > highs[-2][1] and lows[-1][1] > lows[-2][1]:
+        ms.last_trend = 'uptrend'
+        ms.last_hh = highs[-1][1]
+        ms.last_hl = lows[-1][1]
+
+    # Check for downtrend (lower highs and lower lows)
+    elif highs[-1][1] < highs[-2][1] and lows[-1][1] < lows[-2][1]:
+        ms.last_trend = 'downtrend'
+        ms.last_lh = highs[-1][1]
+        ms.last_ll = lows[-1][1]
+
+    return ms
+
+
+# Check the last bar for a break of structure or a completed retest
+def detect_break(ms, bars, buffer, retest_enabled):
+    if len(bars) == 0:
+        return None
+
+    last = bars[-1]
+    last_close = last['close']
+
+    # If we're waiting for a retest, check if it happened
+    if ms.waiting_for_retest and ms.retest_level:
+        if ms.retest_direction == 'bull':
+            # For long entries, check if price came back near the retest level (former resistance now support)
+            if abs(last_close - ms.retest_level) < buffer:
+                # Check for bullish price action (close > open)
+                if last_close > last['open']:
+                    ms.waiting_for_retest = False
+                    return 'bull_retest'
+        elif ms.retest_direction == 'bear':
+            # For short entries, check if price came back near the retest level (former support now resistance)
+            if abs(last_close - ms.retest_level) < buffer:
+                # Check for bearish price action (close < open)
+                if last_close < last['open']:
+                    ms.waiting_for_retest = False
+                    return 'bear_retest'
+
+    # Check for structure breaks
+    if ms.last_trend == 'downtrend' and ms.last_lh and last_close > ms.last_lh + buffer:
+        # Bullish break of structure (price broke above the last lower high)
+        if retest_enabled:
+            ms.retest_level = ms.last_lh
+            ms.retest_direction = 'bull'
+            ms.waiting_for_retest = True
+            return 'bull_break'
+        return 'bull'
+
+    elif ms.last_trend == 'uptrend' and ms.last_hl and last_close < ms.last_hl - buffer:
+        # Bearish break of structure (price broke below the last higher low)
+        if retest_enabled:
+            ms.retest_level = ms.last_hl
+            ms.retest_direction = 'bear'
+            ms.waiting_for_retest = True
+            return 'bear_break'
+        return 'bear'
+
+    return None
+
+
+# (open time, close) of the last bar; equal fingerprints mean equal analysis inputs
+def bar_fingerprint(bars):
+    if bars is None or len(bars) == 0:
+        return None
+    last = bars[-1]
+    return int(last['time']), float(last['close'])
+
+
+class FingerprintCache:
+    """
+    Analysis results per timeframe, reused while the input fingerprint is unchanged.
+
+    skipped/recomputed count how many evaluations the cache saved.
+    """
+
+    def __init__(self):
+        self.entries = {}
+        self.skipped = 0
+        self.recomputed = 0
+
+    def lookup(self, key, fingerprint):
+        entry = self.entries.get(key)
+        if fingerprint is not None and entry is not None and entry[0] == fingerprint:
+            self.skipped += 1
+            return entry[1]
+        return None
+
+    def store(self, key, fingerprint, value):
+        self.recomputed += 1
+        self.entries[key] = (fingerprint, value)
+
+    def invalidate(self, key):
+        self.entries.pop(key, None)
+
+    def clear(self):
+        self.entries.clear()
+
+    def stats(self):
+        total = self.skipped + self.recomputed
+        return {
+            'skipped': self.skipped,
+            'recomputed': self.recomputed,
+            'skip_rate': self.skipped / total * 100 if total else 0.0,
+            'entries': len(self.entries),
+        }
+
+
+def pack_structures(structures, symbol=''):
+    """
+    Pack {timeframe: MarketStructure} into one STRUCTURE_DTYPE record array.
+
+    Keys may also be (symbol, timeframe) tuples to hold several symbols.
+    """
+    table = np.zeros(len(structures), dtype=STRUCTURE_DTYPE)
+    for record, (key, ms) in zip(table, structures.items()):
+        sym, tf = key if isinstance(key, tuple) else (symbol, key)
+        record['symbol'] = sym.encode()
+        record['timeframe'] = tf.encode()
+        ms.to_record(record)
+    return table
+
+
+def unpack_structures(table):
+    """
+    Inverse of pack_structures.
+
+    Returns:
+        dict: {(symbol, timeframe): MarketStructure}
+    """
+    return {(r['symbol'].decode(), r['timeframe'].decode()): MarketStructure.from_record(r) for r in table}
+
+
+def structures_to_bytes(structures, symbol=''):
+    return pack_structures(structures, symbol).tobytes()
+
+
+def structures_from_bytes(buf):
+    return unpack_structures(np.frombuffer(buf, dtype=STRUCTURE_DTYPE))
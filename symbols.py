@@ -0,0 +1,106 @@
+"""
+Cached symbol metadata.
+
+symbol_info is fetched once per symbol and kept with the values the bot
+derives from it on every cycle (pip size, lot limits, stops level). Contract
+specs change rarely, so entries are only reloaded after refresh_interval.
+"""
+import math
+import threading
+import time
+import MetaTrader5 as mt5
+
+
+# Price distance of one pip for a given number of quote digits
+def pip_size(digits, point):
+    # 5/3-digit quotes have a fractional pip, so one pip is 10 points
+    if digits == 5 or digits == 3:
+        return 10 * point
+    return point
+
+
+class SymbolMeta:
+    """
+    One symbol's contract specs plus precomputed values.
+
+    Unknown attributes fall through to the raw MT5 SymbolInfo, so a SymbolMeta
+    can be passed anywhere a symbol_info is expected.
+    """
+    __slots__ = ('info', 'name', 'digits', 'point', 'pip_size', 'tick_size', 'tick_value',
+                 'contract_size', 'volume_step', 'volume_min', 'volume_max', 'volume_digits',
+                 'stops_level', 'stops_distance', 'loaded_at')
+
+    def __init__(self, info, loaded_at=None):
+        self.info = info
+        self.name = info.name
+        self.digits = info.digits
+        self.point = info.point
+        self.pip_size = pip_size(info.digits, info.point)
+        self.tick_size = info.trade_tick_size
+        self.tick_value = info.trade_tick_value
+        self.contract_size = info.trade_contract_size
+        self.volume_step = info.volume_step or 0.01
+        self.volume_min = info.volume_min or self.volume_step
+        self.volume_max = info.volume_max or float('inf')
+        # Decimals needed to print a multiple of volume_step exactly
+        self.volume_digits = max(0, -math.floor(math.log10(self.volume_step) + 1e-9))
+        self.stops_level = info.trade_stops_level
+        self.stops_distance = info.trade_stops_level * info.point  # min SL/TP distance in price
+        self.loaded_at = time.time() if loaded_at is None else loaded_at
+
+    def __getattr__(self, name):
+        # Only reached for names not in __slots__; copy and pickle probe dunders before info is set
+        if name == 'info' or name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.info, name)
+
+    def pips(self, pips):
+        """Convert pips to a price distance."""
+        return pips * self.pip_size
+
+    def round_volume(self, volume):
+        """Round volume down to volume_step and clamp it to [volume_min, volume_max]."""
+        steps = math.floor(volume / self.volume_step + 1e-9)
+        volume = round(steps * self.volume_step, self.volume_digits)
+        return min(max(volume, self.volume_min), self.volume_max)
+
+
+class SymbolRegistry:
+    """
+    Args:
+        refresh_interval (float): Seconds before an entry is reloaded from the terminal
+    """
+
+    def __init__(self, refresh_interval=3600):
+        self.refresh_interval = refresh_interval
+        self._symbols = {}
+        self._lock = threading.Lock()
+
+    def get(self, symbol):
+        """
+        Cached metadata for symbol, reloaded when older than refresh_interval.
+
+        Returns:
+            SymbolMeta: None if the terminal does not know the symbol and nothing is cached
+        """
+        meta = self._symbols.get(symbol)
+        if meta is None or time.time() - meta.loaded_at > self.refresh_interval:
+            meta = self.refresh(symbol) or meta
+        return meta
+
+    def refresh(self, symbol):
+        info = mt5.symbol_info(symbol)
+        if info is None:
+            print(f"Failed to load symbol info for {symbol}")
+            return None
+        meta = SymbolMeta(info)
+        with self._lock:
+            self._symbols[symbol] = meta
+        return meta
+
+    def invalidate(self, symbol=None):
+        with self._lock:
+            if symbol is None:
+                self._symbols.clear()
+            else:
+                self._symbols.pop(symbol, None)
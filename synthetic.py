@@ -0,0 +1,343 @@
+"""
+Synthetic bar data with market regimes and planted structure breaks.
+
+Bars have the same fields as mt5.copy_rates_from_pos. Log returns are drawn
+in one vectorized pass per chunk. A regime schedule shapes them: trending
+segments with a drift, ranging segments oscillating around a level, and
+volatility spikes with wider bars, more volume and wider spreads. Opening
+gaps are separate events at gap_rate per bar.
+
+With break_every set, structure breaks are planted about that many bars
+apart. Each one is three legs of higher highs and higher lows followed by a
+drop through the last higher low, or the mirror image for a bullish break.
+The bar where the close first crosses that pivot, the pivot level and the
+direction are returned as ground truth for find_pivots and
+check_structure_break.
+
+Generation continues seamlessly from chunk to chunk, so arbitrarily long
+series stream to a memory-mapped .npy file at constant memory:
+
+    python synthetic.py bars.npy --bars 50000000 --break-every 500
+
+writes bars.npy, plus bars.breaks.npy and bars.regimes.npy with the ground truth.
+"""
+import argparse
+import os
+import time
+import numpy as np
+from data_loader import RATES_DTYPE, short_timeframe
+from structure import DIRECTION_CODES
+from ticks import TIMEFRAME_SECONDS
+
+REGIMES = ('trend', 'range', 'spike')
+TREND, RANGE, SPIKE = range(len(REGIMES))
+DEFAULT_WEIGHTS = {'trend': 0.4, 'range': 0.45, 'spike': 0.15}
+
+# Ground truth of one planted break; direction uses structure.DIRECTION_CODES
+BREAK_DTYPE = np.dtype([
+    ('start', '<i8'),      # first bar of the pattern
+    ('index', '<i8'),      # bar whose close first crosses the level
+    ('time', '<i8'),
+    ('direction', 'i1'),
+    ('level', '<f8'),      # pivot low (bear) or pivot high (bull) that was broken
+])
+
+REGIME_DTYPE = np.dtype([
+    ('start', '<i8'),
+    ('end', '<i8'),
+    ('regime', 'i1'),      # index into REGIMES
+    ('sign', 'i1'),        # trend direction
+])
+
+# Move per bar of each leg of a bearish break pattern, in break steps; the
+# bullish pattern is its negation. Pivot lows end up at 1 and 2 leg heights,
+# pivot highs at 2, 3 and 4, and the last leg falls to 1, through the low at 2.
+BREAK_LEGS = (2, -1, 2, -1, 2, -3)
+PATTERN_WICK = 0.1  # wick scale inside patterns, so only the leg turns form pivots
+
+
+class Chunk:
+    """Bars of one chunk with the planted breaks and the regime segments that start in it."""
+    __slots__ = ('rates', 'breaks', 'regimes')
+
+    def __init__(self, rates, breaks, regimes):
+        self.rates = rates
+        self.breaks = breaks
+        self.regimes = regimes
+
+
+class SyntheticMarket:
+    """
+    Stateful bar generator; consecutive calls continue the same series.
+
+    Args:
+        timeframe (int): Bar length in seconds
+        start_price (float): Open of the first bar
+        start_time (int): Open time of the first bar; defaults to the current bar
+        volatility (float): Standard deviation of one bar's log return
+        weights (dict): Relative frequency of each regime in REGIMES
+        regime_bars (float): Mean regime length in bars
+        trend_drift (float): Drift per bar of trending regimes, in volatilities
+        range_amplitude (float): Oscillation amplitude of ranging regimes, in volatilities
+        range_period (int): Oscillation period of ranging regimes, in bars
+        spike_multiplier (float): Volatility, volume and spread factor in spikes
+        gap_rate (float): Probability of an opening gap per bar
+        gap_size (float): Standard deviation of a gap, in volatilities
+        break_every (int): Mean bars between planted breaks; 0 plants none
+        break_leg_bars (int): Bars per pattern leg; keep above twice the pivot depth
+        break_step (float): Pattern move per bar, in volatilities
+        wick (float): Mean wick length, in volatilities
+        spread (int): Spread in points outside spikes
+        seed (int): RNG seed; equal arguments and chunk sizes give equal series
+    """
+
+    def __init__(self, timeframe=60, start_price=100.0, start_time=None, volatility=0.001, weights=None,
+                 regime_bars=500, trend_drift=0.1, range_amplitude=5.0, range_period=60, spike_multiplier=4.0,
+                 gap_rate=0.0, gap_size=20.0, break_every=0, break_leg_bars=8, break_step=3.0, wick=0.5,
+                 spread=10, seed=0):
+        weights = weights or DEFAULT_WEIGHTS
+        unknown = set(weights) - set(REGIMES)
+        if unknown:
+            raise ValueError(f"unknown regimes {sorted(unknown)}, expected some of {', '.join(REGIMES)}")
+        p = np.array([float(weights.get(name, 0)) for name in REGIMES])
+        if p.sum() <= 0:
+            raise ValueError("regime weights must not all be zero")
+        self.timeframe = int(timeframe)
+        self.start_price = start_price
+        self.start_time = start_time if start_time is not None else int(time.time()) // self.timeframe * self.timeframe
+        self.volatility = volatility
+        self.regime_p = p / p.sum()
+        self.regime_bars = max(1.0, float(regime_bars))
+        self.trend_drift = trend_drift
+        self.range_amplitude = range_amplitude
+        self.range_period = range_period
+        self.spike_multiplier = spike_multiplier
+        self.gap_rate = gap_rate
+        self.gap_size = gap_size
+        self.break_every = break_every
+        self.break_leg_bars = break_leg_bars
+        self.break_step = break_step
+        self.wick = wick
+        self.spread = spread
+        self._rng = np.random.default_rng(seed)
+        self._template = np.repeat(np.array(BREAK_LEGS, dtype=np.float64), break_leg_bars) * break_step * volatility
+        self._index = 0          # global index of the next bar
+        self._log_close = 0.0    # log(close / start_price) of the last bar
+        self._segment = (TREND, 1, 0, 0)  # regime, sign, bars left, bars done of the current segment
+        self._next_break = self._break_gap() if break_every else None
+
+    def _break_gap(self):
+        # Pattern length plus a jittered spacing, so patterns never overlap
+        return len(self._template) + int(self._rng.integers(self.break_every // 2, self.break_every * 3 // 2 + 1))
+
+    def _regimes(self, n):
+        """Per-bar regime, sign and position within the segment, plus records of segments starting here."""
+        regime, sign, left, done = self._segment
+        # The segment still running at the end of the last chunk comes first
+        kinds, signs, lengths, offsets = ([regime], [sign], [left], [done]) if left else ([], [], [], [])
+        total = left
+        while total < n:
+            m = int((n - total) // self.regime_bars) + 1
+            lengths.extend(self._rng.geometric(1 / self.regime_bars, m).tolist())
+            kinds.extend(self._rng.choice(len(REGIMES), m, p=self.regime_p).tolist())
+            signs.extend(self._rng.choice((-1, 1), m).tolist())
+            offsets.extend([0] * m)
+            total = sum(lengths)
+        lengths = np.array(lengths, dtype=np.int64)
+        starts = np.cumsum(lengths) - lengths
+        k = int(np.searchsorted(starts, n))  # segments with bars in this chunk
+        used = lengths[:k].copy()
+        used[-1] = n - starts[k - 1]
+        self._segment = (kinds[k - 1], signs[k - 1], int(lengths[k - 1] - used[-1]), offsets[k - 1] + int(used[-1]))
+
+        kinds, signs, offsets = np.array(kinds[:k]), np.array(signs[:k]), np.array(offsets[:k])
+        regime = np.repeat(kinds, used)
+        sign = np.repeat(signs, used)
+        pos = np.arange(n) - np.repeat(starts[:k], used) + np.repeat(offsets, used)
+
+        # The carried-over segment was recorded with the chunk it started in
+        new = slice(1, k) if left else slice(0, k)
+        records = np.zeros(len(kinds[new]), dtype=REGIME_DTYPE)
+        records['start'] = self._index + starts[new]
+        records['end'] = records['start'] + lengths[new]
+        records['regime'] = kinds[new]
+        records['sign'] = signs[new]
+        return regime, sign, pos, records
+
+    def _break_starts(self, n):
+        """Local start bars of the patterns that fit in this chunk."""
+        if self._next_break is None:
+            return np.zeros(0, dtype=np.int64)
+        end = self._index + n
+        starts = []
+        while self._next_break < end:
+            if self._next_break + len(self._template) > end:
+                # Would straddle the chunk boundary; plant it at the start of the next chunk
+                self._next_break = end
+                break
+            starts.append(self._next_break - self._index)
+            self._next_break += self._break_gap()
+        return np.array(starts, dtype=np.int64)
+
+    def chunk(self, n):
+        """Generate the next n bars."""
+        rng = self._rng
+        vol = self.volatility
+        regime, sign, pos, records = self._regimes(n)
+
+        bar_vol = np.where(regime == SPIKE, vol * self.spike_multiplier, vol)
+        inc = rng.standard_normal(n) * bar_vol
+        ranging = regime == RANGE
+        inc[ranging] *= 0.5
+        trending = regime == TREND
+        inc[trending] += sign[trending] * self.trend_drift * vol
+        if ranging.any():
+            # Increments of a sine around the segment's starting level
+            w = 2 * np.pi / self.range_period
+            p = pos[ranging]
+            inc[ranging] += self.range_amplitude * vol * (np.sin(w * p) - np.sin(w * (p - 1)))
+        gap = np.zeros(n)
+        if self.gap_rate:
+            hit = rng.random(n) < self.gap_rate
+            gap[hit] = rng.standard_normal(int(hit.sum())) * self.gap_size * bar_vol[hit]
+        wick = np.abs(rng.standard_normal((2, n))) * (self.wick * bar_vol)
+
+        starts = self._break_starts(n)
+        directions = rng.choice((DIRECTION_CODES['bull'], DIRECTION_CODES['bear']), len(starts)).astype(np.int8)
+        if len(starts):
+            bars = starts[:, None] + np.arange(len(self._template))
+            # The bearish template rises first; a bullish break (code 1) is its mirror image
+            inc[bars] = -directions[:, None] * self._template
+            gap[bars] = 0.0
+            wick[:, bars.ravel()] *= PATTERN_WICK
+
+        log_close = self._log_close + np.cumsum(inc + gap)
+        log_open = np.empty(n)
+        log_open[0] = self._log_close
+        log_open[1:] = log_close[:-1]
+        log_open += gap
+        self._log_close = float(log_close[-1])
+
+        rates = np.empty(n, dtype=RATES_DTYPE)
+        rates['time'] = self.start_time + self.timeframe * (self._index + np.arange(n, dtype=np.int64))
+        opens = self.start_price * np.exp(log_open)
+        closes = self.start_price * np.exp(log_close)
+        rates['open'] = opens
+        rates['close'] = closes
+        rates['high'] = np.maximum(opens, closes) * np.exp(wick[0])
+        rates['low'] = np.minimum(opens, closes) * np.exp(-wick[1])
+        activity = bar_vol / vol
+        rates['tick_volume'] = rng.integers(10, 500, n) * activity
+        rates['spread'] = self.spread * activity
+        rates['real_volume'] = 0
+
+        breaks = self._break_truth(rates, starts, directions)
+        self._index += n
+        return Chunk(rates, breaks, records)
+
+    def _break_truth(self, rates, starts, directions):
+        truth = np.zeros(len(starts), dtype=BREAK_DTYPE)
+        if not len(starts):
+            return truth
+        k = self.break_leg_bars
+        # The second pullback ends at the last bar of leg 4; its pivot is that bar or the next
+        turn = starts + 4 * k - 1
+        bull = directions == DIRECTION_CODES['bull']
+        level = np.where(bull, np.maximum(rates['high'][turn], rates['high'][turn + 1]),
+                         np.minimum(rates['low'][turn], rates['low'][turn + 1]))
+        last_leg = starts[:, None] + 5 * k + np.arange(k)
+        crossed = (rates['close'][last_leg] - level[:, None]) * directions[:, None] > 0
+        index = last_leg[np.arange(len(starts)), crossed.argmax(axis=1)]
+        truth['start'] = self._index + starts
+        truth['index'] = self._index + index
+        truth['time'] = rates['time'][index]
+        truth['direction'] = directions
+        truth['level'] = level
+        return truth
+
+    def chunks(self, count, chunk_size=1_000_000):
+        """Yield Chunks until count bars have been generated."""
+        remaining = count
+        while remaining > 0:
+            n = min(chunk_size, remaining)
+            chunk = self.chunk(n)
+            remaining -= n
+            if remaining == 0:
+                chunk.regimes['end'] = np.minimum(chunk.regimes['end'], self._index)
+            yield chunk
+
+    def generate(self, count, chunk_size=1_000_000):
+        """All count bars in memory as one Chunk."""
+        parts = list(self.chunks(count, chunk_size))
+        if not parts:
+            return Chunk(np.zeros(0, dtype=RATES_DTYPE), np.zeros(0, dtype=BREAK_DTYPE),
+                         np.zeros(0, dtype=REGIME_DTYPE))
+        if len(parts) == 1:
+            return parts[0]
+        return Chunk(np.concatenate([c.rates for c in parts]), np.concatenate([c.breaks for c in parts]),
+                     np.concatenate([c.regimes for c in parts]))
+
+    def write(self, path, count, chunk_size=1_000_000):
+        """
+        Stream count bars into a .npy file, chunk by chunk.
+
+        The ground truth goes next to it as <stem>.breaks.npy and <stem>.regimes.npy.
+
+        Returns:
+            dict: Paths and the number of bars and breaks written
+        """
+        stem = path[:-4] if path.endswith('.npy') else path
+        out = np.lib.format.open_memmap(path, mode='w+', dtype=RATES_DTYPE, shape=(count,))
+        breaks, regimes = [], []
+        offset = 0
+        for chunk in self.chunks(count, chunk_size):
+            out[offset:offset + len(chunk.rates)] = chunk.rates
+            offset += len(chunk.rates)
+            breaks.append(chunk.breaks)
+            regimes.append(chunk.regimes)
+        out.flush()
+        del out
+        breaks = np.concatenate(breaks) if breaks else np.zeros(0, dtype=BREAK_DTYPE)
+        regimes = np.concatenate(regimes) if regimes else np.zeros(0, dtype=REGIME_DTYPE)
+        np.save(stem + '.breaks.npy', breaks)
+        np.save(stem + '.regimes.npy', regimes)
+        return {'bars': path, 'breaks': stem + '.breaks.npy', 'regimes': stem + '.regimes.npy',
+                'count': count, 'planted': len(breaks)}
+
+
+def timeframe_seconds(timeframe):
+    """Seconds per bar for 'M15', 'TIMEFRAME_M15' or a number of seconds."""
+    if str(timeframe).isdigit():
+        return int(timeframe)
+    seconds = TIMEFRAME_SECONDS.get('TIMEFRAME_' + short_timeframe(str(timeframe)).upper())
+    if seconds is None:
+        raise ValueError(f"unknown timeframe {timeframe!r}")
+    return seconds
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('path', help='output .npy file')
+    parser.add_argument('--bars', type=int, default=1_000_000)
+    parser.add_argument('--chunk', type=int, default=1_000_000, help='bars generated and written at a time')
+    parser.add_argument('--timeframe', default='M1', help="e.g. 'M1', 'H1' or seconds per bar")
+    parser.add_argument('--start-price', type=float, default=100.0)
+    parser.add_argument('--start-time', type=int, help='epoch seconds of the first bar')
+    parser.add_argument('--volatility', type=float, default=0.001)
+    parser.add_argument('--gap-rate', type=float, default=0.0)
+    parser.add_argument('--break-every', type=int, default=0, help='mean bars between planted breaks')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    market = SyntheticMarket(timeframe_seconds(args.timeframe), args.start_price, args.start_time,
+                             args.volatility, gap_rate=args.gap_rate, break_every=args.break_every, seed=args.seed)
+    start = time.perf_counter()
+    result = market.write(args.path, args.bars, args.chunk)
+    elapsed = time.perf_counter() - start
+    print(f"Wrote {args.bars:,} bars to {result['bars']} in {elapsed:.1f}s "
+          f"({args.bars / elapsed / 1e6 * 60:.0f}M bars/min, {os.path.getsize(args.path) / 1024 ** 2:.0f}MB), "
+          f"{result['planted']} planted breaks in {result['breaks']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,237 @@
+"""
+Tick-level break and retest detection.
+
+Ticks go into a fixed-size NumPy ring buffer. Each timeframe's break and
+retest levels are derived from its MarketStructure once, and rebuilt only
+when the structure changes. A batch of ticks is then checked against them
+with a few vectorized comparisons. Per tick the cost is a constant number
+of array operations, independent of lookback or pivot count.
+"""
+import time
+import numpy as np
+
+TICK_DTYPE = np.dtype([('time_msc', '<i8'), ('bid', '<f8'), ('ask', '<f8')])
+
+NO_RETEST, RETEST_BULL, RETEST_BEAR = 0, 1, -1
+
+# Bar length per timeframe name, for tracking the open of the bar a tick falls in
+TIMEFRAME_SECONDS = {
+    'TIMEFRAME_M1': 60,
+    'TIMEFRAME_M15': 900,
+    'TIMEFRAME_M30': 1800,
+    'TIMEFRAME_H1': 3600,
+    'TIMEFRAME_H4': 14400,
+    'TIMEFRAME_D1': 86400,
+}
+
+
+class TickRing:
+    """
+    Last `size` ticks in a preallocated array; older ticks are overwritten.
+
+    Args:
+        size (int): Capacity in ticks
+    """
+    __slots__ = ('data', 'head', 'count')
+
+    def __init__(self, size=65536):
+        self.data = np.zeros(size, dtype=TICK_DTYPE)
+        self.head = 0   # next write position
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def last_time(self):
+        return int(self.data['time_msc'][self.head - 1]) if self.count else 0
+
+    def extend(self, time_msc, bid, ask):
+        """Append ticks; only the newest `size` are kept when the batch is larger than the buffer."""
+        size = len(self.data)
+        n = len(time_msc)
+        if n == 0:
+            return
+        if n > size:
+            time_msc, bid, ask = time_msc[-size:], bid[-size:], ask[-size:]
+            n = size
+        idx = (self.head + np.arange(n)) % size
+        self.data['time_msc'][idx] = time_msc
+        self.data['bid'][idx] = bid
+        self.data['ask'][idx] = ask
+        self.head = (self.head + n) % size
+        self.count = min(size, self.count + n)
+
+    def last(self, n=None):
+        """Newest n ticks (all if None), oldest first, as a copy."""
+        n = self.count if n is None else min(n, self.count)
+        idx = (self.head - n + np.arange(n)) % len(self.data)
+        return self.data[idx]
+
+
+class TickMonitor:
+    """
+    Break and retest levels for several timeframes, checked tick by tick.
+
+    Levels mirror structure.detect_break: a bull break is a price above
+    last_lh + buffer in a downtrend. A bear break is below last_hl - buffer
+    in an uptrend. A retest is a price within buffer of retest_level on the
+    right side of the current bar's open.
+
+    Args:
+        names (list): Timeframe names, in the order events are reported
+    """
+
+    def __init__(self, names):
+        k = len(names)
+        self.names = list(names)
+        self.index = {name: i for i, name in enumerate(self.names)}
+        self.up = np.full(k, np.inf)
+        self.down = np.full(k, -np.inf)
+        self.retest_level = np.zeros(k)
+        self.retest_dir = np.zeros(k, dtype=np.int8)
+        self.band = np.zeros(k)
+        self.bar_ms = np.full(k, 60000, dtype=np.int64)
+        self.bar_start = np.zeros(k, dtype=np.int64)
+        self.bar_open = np.zeros(k)
+        self._levels = [None] * k
+        self.refreshes = 0
+        self.ticks = 0
+        self.events = 0
+        self.elapsed = 0.0
+        self.min_up = np.inf
+        self.max_down = -np.inf
+
+    def set_levels(self, name, ms, buffer, bar_time, bar_open):
+        """
+        Derive a timeframe's levels from its MarketStructure.
+
+        Returns:
+            bool: True if the levels changed and were rebuilt
+        """
+        i = self.index[name]
+        self.bar_ms[i] = TIMEFRAME_SECONDS.get(name, 60) * 1000
+        # The newest bar seen by analysis seeds the open used by retest checks
+        if int(bar_time) * 1000 > self.bar_start[i]:
+            self.bar_start[i] = int(bar_time) * 1000
+            self.bar_open[i] = bar_open
+
+        up = ms.last_lh + buffer if ms.last_trend == 'downtrend' and ms.last_lh else np.inf
+        down = ms.last_hl - buffer if ms.last_trend == 'uptrend' and ms.last_hl else -np.inf
+        retest = NO_RETEST
+        if ms.waiting_for_retest and ms.retest_level:
+            retest = RETEST_BULL if ms.retest_direction == 'bull' else RETEST_BEAR if ms.retest_direction == 'bear' else NO_RETEST
+            # The break already happened; until the retest only a new pivot can move the levels
+            up, down = np.inf, -np.inf
+        levels = (up, down, retest, ms.retest_level or 0.0, buffer)
+        if levels == self._levels[i]:
+            return False
+        self._levels[i] = levels
+        self.up[i], self.down[i], self.retest_dir[i], self.retest_level[i], self.band[i] = levels
+        self._bounds()
+        self.refreshes += 1
+        return True
+
+    def disarm(self, name):
+        """Stop reporting a break that already fired; the levels re-arm when the structure changes."""
+        i = self.index[name]
+        self.up[i], self.down[i] = np.inf, -np.inf
+        self._bounds()
+
+    def _bounds(self):
+        # Batch-wide early exit: no tick above min_up or below max_down means no break
+        self.min_up = float(self.up.min())
+        self.max_down = float(self.down.max())
+
+    def _opens(self, i, times, prices, js):
+        """Open of timeframe i's bar containing each tick in js."""
+        starts = times[js] - times[js] % self.bar_ms[i]
+        # A bar that started inside this batch opened at its first tick
+        return np.where(starts <= self.bar_start[i], self.bar_open[i], prices[np.searchsorted(times, starts)])
+
+    def roll_bars(self, times, prices):
+        """Track the open of each timeframe's current bar after a batch was processed."""
+        if len(times) == 0:
+            return
+        last = times[-1]
+        starts = last - last % self.bar_ms
+        for i in np.flatnonzero(starts > self.bar_start):
+            first = np.searchsorted(times, starts[i])
+            self.bar_start[i] = starts[i]
+            self.bar_open[i] = prices[first] if first < len(times) else prices[-1]
+
+    def first_event(self, times, prices):
+        """
+        Earliest tick in the batch that crosses any level.
+
+        Returns:
+            tuple: (tick index, [timeframe names]) or None
+        """
+        if len(prices) == 0:
+            return None
+        active = np.flatnonzero(self.retest_dir)
+        if prices.max() <= self.min_up and prices.min() >= self.max_down and len(active) == 0:
+            return None
+
+        n = len(prices)
+        first = np.full(len(self.names), n)
+        up_hits = prices[:, None] > self.up
+        down_hits = prices[:, None] < self.down
+        hits = up_hits | down_hits
+        any_hit = hits.any(axis=0)
+        first[any_hit] = hits.argmax(axis=0)[any_hit]
+
+        for i in active:
+            js = np.flatnonzero(np.abs(prices[:first[i]] - self.retest_level[i]) < self.band[i])
+            if len(js) == 0:
+                continue
+            opens = self._opens(i, times, prices, js)
+            ok = prices[js] > opens if self.retest_dir[i] == RETEST_BULL else prices[js] < opens
+            if ok.any():
+                first[i] = js[ok.argmax()]
+
+        j = int(first.min())
+        if j >= n:
+            return None
+        return j, [self.names[i] for i in np.flatnonzero(first == j)]
+
+    def bar_at(self, name, times, prices, j):
+        """One-row rates-like array (open, close) for feeding tick j to structure.detect_break."""
+        i = self.index[name]
+        bar = np.zeros(1, dtype=[('time', '<i8'), ('open', '<f8'), ('close', '<f8')])
+        bar['time'] = times[j] // 1000
+        bar['open'] = self._opens(i, times, prices, np.array([j]))[0]
+        bar['close'] = prices[j]
+        return bar
+
+    def scan(self, times, prices):
+        """
+        Yield (tick index, [timeframe names]) for every level crossing in the batch, in order.
+
+        The caller may update levels between events; scanning resumes after
+        the reported tick with the new levels.
+        """
+        n = len(prices)
+        self.ticks += n
+        start = 0
+        while start < n:
+            t0 = time.perf_counter()
+            event = self.first_event(times[start:], prices[start:])
+            if event is not None:
+                j = start + event[0]
+                self.roll_bars(times[:j + 1], prices[:j + 1])
+            self.elapsed += time.perf_counter() - t0
+            if event is None:
+                break
+            self.events += 1
+            yield j, event[1]
+            start = j + 1
+        self.roll_bars(times, prices)
+
+    def stats(self):
+        return {
+            'ticks': self.ticks,
+            'events': self.events,
+            'level_refreshes': self.refreshes,
+            'us_per_tick': self.elapsed / self.ticks * 1e6 if self.ticks else 0.0,
+        }